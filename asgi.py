@@ -0,0 +1,36 @@
+# File: asgi.py
+# ASGI entry point: uvicorn asgi:app --workers 4 --host 0.0.0.0 --port 5000
+
+import asyncio
+import os
+
+from a2wsgi import WSGIMiddleware
+
+import server
+
+# Request threads per worker process; they mostly wait on the module executors
+ASGI_THREADS = int(os.environ.get("CHATMATE_ASGI_THREADS", 32))
+
+_http_app = WSGIMiddleware(server.app, workers=ASGI_THREADS)
+
+async def app(scope, receive, send):
+    """
+    Serve HTTP through the Flask app and load the models on lifespan startup,
+    so each uvicorn worker is ready before it accepts connections.
+    """
+    if scope["type"] != "lifespan":
+        await _http_app(scope, receive, send)
+        return
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.to_thread(server.init_services)
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(server.shutdown_services)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
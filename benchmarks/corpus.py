@@ -0,0 +1,110 @@
+# File: benchmarks/corpus.py
+
+import importlib.util
+import os
+import random
+from typing import List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_PATH = os.path.join(REPO_ROOT, "data", "raw", "train_data_large.py")
+
+CONVERSION_PAIRS = [
+    ("km", "miles"), ("kg", "pounds"), ("celsius", "fahrenheit"), ("hours", "minutes"),
+    ("km per hour", "meters per second"), ("square feet", "square meters"), ("liters", "gallons"),
+    ("inches", "cm"), ("grams", "ounces"), ("days", "seconds"),
+]
+
+PDF_QUESTIONS = [
+    "Summarize this PDF", "Extract text from the PDF", "Analyze the PDF content",
+    "What does the document say about energy?", "Which page mentions the water cycle?",
+]
+
+_WORDS = (
+    "energy gravity photosynthesis democracy electricity planet orbit molecule reaction "
+    "equation theory experiment result analysis student chapter section figure table model "
+    "water cycle light speed pressure temperature history culture economy language system"
+).split()
+
+def load_templates():
+    """
+    Import data/raw/train_data_large.py (the router's training templates).
+    """
+    spec = importlib.util.spec_from_file_location("train_data_large", TEMPLATES_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def ask_queries(count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    (text, label) pairs drawn from the training templates plus unit conversions.
+    """
+    rng = random.Random(seed)
+    rows = load_templates().generate_rows(num_samples=max(1, count // 3), rng=rng)
+    rows = [(text, label) for text, label in rows]
+    rows += [(q, "math") for q in conversion_queries(max(1, count // 6), seed)]
+    rng.shuffle(rows)
+    return rows[:count]
+
+def math_queries() -> List[str]:
+    """
+    Every math template applied to every expression.
+    """
+    templates = load_templates()
+    return [t.format(e) for t in templates.math_templates for e in templates.math_expressions]
+
+def math_expressions() -> List[str]:
+    return list(load_templates().math_expressions)
+
+def conversion_queries(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        src, dst = rng.choice(CONVERSION_PAIRS)
+        queries.append(f"convert {rng.randint(1, 500)} {src} to {dst}")
+    return queries
+
+# ===== Synthetic PDFs =====
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _page_lines(rng: random.Random, page_no: int, lines: int) -> List[str]:
+    result = [f"Page {page_no}: notes on {rng.choice(_WORDS)} and {rng.choice(_WORDS)}."]
+    for _ in range(lines - 1):
+        result.append(" ".join(rng.choice(_WORDS) for _ in range(12)).capitalize() + ".")
+    return result
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0) -> str:
+    """
+    Write a deterministic text-only PDF (Helvetica, one content stream per page).
+    """
+    rng = random.Random(seed * 100003 + pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page_no in range(1, pages + 1):
+        text = " T* ".join(f"({_pdf_escape(line)}) Tj" for line in _page_lines(rng, page_no, lines_per_page))
+        stream = f"BT /F1 10 Tf 12 TL 50 760 Td {text} ET".encode("latin-1")
+        page_id, content_id = len(objects) + 1, len(objects) + 2
+        kids.append(f"{page_id} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
@@ -0,0 +1,121 @@
+# File: benchmarks/harness.py
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from benchmarks.corpus import REPO_ROOT
+
+def isolate(workdir: str):
+    """
+    Point every database at workdir and lift the login rate limits.
+    Must run before any `modules.*` import.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["CHATMATE_DB"] = os.path.join(workdir, "bench_chatmate.db")
+    os.environ["CHATMATE_PDF_CACHE_DB"] = os.path.join(workdir, "bench_pdf_cache.db")
+    os.environ.setdefault("CHATMATE_LOGIN_USER_CAPACITY", "1000000")
+    os.environ.setdefault("CHATMATE_LOGIN_IP_CAPACITY", "1000000")
+    os.environ.setdefault("CHATMATE_METRICS", "0")
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+# ===== Timing =====
+def summarize(samples: List[float], wall: Optional[float] = None, errors: int = 0) -> Dict:
+    """
+    Latency stats in milliseconds for a list of durations in seconds.
+    """
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pct(q):
+        return ordered[min(n - 1, int(q * n))] * 1000 if n else 0.0
+
+    total = wall if wall is not None else sum(ordered)
+    return {
+        "n": n,
+        "errors": errors,
+        "mean_ms": sum(ordered) / n * 1000 if n else 0.0,
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "ops_per_sec": n / total if total else 0.0,
+    }
+
+def bench(fn: Callable, inputs: Iterable, repeat: int = 1, warmup: int = 1,
+          setup: Optional[Callable] = None) -> Dict:
+    """
+    Time fn(x) for every input, `repeat` times over. setup() runs before each
+    call and is not timed (e.g. clearing a cache for cold measurements).
+    """
+    inputs = list(inputs)
+    for x in inputs[:warmup]:
+        fn(x)
+    samples, errors = [], 0
+    for _ in range(repeat):
+        for x in inputs:
+            if setup:
+                setup()
+            start = time.perf_counter()
+            try:
+                fn(x)
+            except Exception:
+                errors += 1
+            samples.append(time.perf_counter() - start)
+    return summarize(samples, errors=errors)
+
+# ===== Results =====
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def save(results: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+def load(path: str) -> Optional[Dict]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def compare(current: Dict, baseline: Dict, metric: str = "p50_ms", threshold: float = 0.10) -> List[Dict]:
+    """
+    Compare every benchmark present in both runs. A ratio above 1 + threshold
+    is a regression, below 1 - threshold an improvement.
+    """
+    rows = []
+    base_benchmarks = baseline.get("benchmarks", {})
+    for name, stats in sorted(current.get("benchmarks", {}).items()):
+        base = base_benchmarks.get(name)
+        if not base or not base.get(metric):
+            continue
+        ratio = stats[metric] / base[metric]
+        status = "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 - threshold else "same"
+        rows.append({"name": name, "baseline": base[metric], "current": stats[metric],
+                     "ratio": ratio, "status": status})
+    return rows
+
+def print_table(results: Dict, comparison: Optional[List[Dict]] = None):
+    by_name = {row["name"]: row for row in comparison or []}
+    print(f"{'benchmark':44} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>10}  vs baseline")
+    for name, s in sorted(results["benchmarks"].items()):
+        row = by_name.get(name)
+        delta = f"{(row['ratio'] - 1) * 100:+.1f}% {row['status']}" if row else ""
+        print(f"{name:44} {s['n']:>6} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} "
+              f"{s['p99_ms']:>10.3f} {s['ops_per_sec']:>10.1f}  {delta}")
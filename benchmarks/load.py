@@ -0,0 +1,195 @@
+# File: benchmarks/load.py
+# Call harness.isolate() before importing this module (in-process mode).
+
+import http.cookiejar
+import io
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Dict, Optional, Tuple
+
+from benchmarks import corpus
+from benchmarks.harness import summarize
+from benchmarks.micro import BENCH_USER
+
+DEFAULT_MIX = {"ask": 0.7, "ask_pdf": 0.2, "login": 0.1}
+LOAD_PDF_PAGES = 50
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    """
+    "ask=0.7,ask_pdf=0.2,login=0.1" -> weights per operation.
+    """
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+# ===== Clients =====
+class TestClient:
+    """
+    Drives the app in-process through Flask's test client.
+    """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def post_json(self, path: str, payload: Dict) -> Tuple[int, Dict]:
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.get_json(silent=True) or {}
+
+    def post_form(self, path: str, fields: Dict, file_path: Optional[str] = None) -> Tuple[int, Dict]:
+        data = dict(fields)
+        if file_path:
+            with open(file_path, "rb") as f:
+                data["pdf_file"] = (io.BytesIO(f.read()), os.path.basename(file_path))
+        response = self.client.post(path, data=data, content_type="multipart/form-data")
+        return response.status_code, response.get_json(silent=True) or {}
+
+class HttpClient:
+    """
+    Drives a running server over a local socket, keeping its session cookie.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def _send(self, request) -> Tuple[int, Dict]:
+        try:
+            with self.opener.open(request, timeout=120) as response:
+                return response.status, json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            return e.code, {}
+
+    def post_json(self, path: str, payload: Dict) -> Tuple[int, Dict]:
+        request = urllib.request.Request(self.base_url + path, json.dumps(payload).encode(),
+                                         {"Content-Type": "application/json"})
+        return self._send(request)
+
+    def post_form(self, path: str, fields: Dict, file_path: Optional[str] = None) -> Tuple[int, Dict]:
+        boundary = uuid.uuid4().hex
+        body = bytearray()
+        for name, value in fields.items():
+            body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                     f"{value}\r\n").encode()
+        if file_path:
+            with open(file_path, "rb") as f:
+                content = f.read()
+            body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"pdf_file\"; "
+                     f"filename=\"{os.path.basename(file_path)}\"\r\n"
+                     f"Content-Type: application/pdf\r\n\r\n").encode() + content + b"\r\n"
+        body += f"--{boundary}--\r\n".encode()
+        request = urllib.request.Request(self.base_url + path, bytes(body),
+                                         {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        return self._send(request)
+
+# ===== Load loop =====
+def _login(client) -> Tuple[int, Dict]:
+    username, _, password = BENCH_USER
+    return client.post_form("/login", {"username_email": username, "password": password})
+
+def run(client_factory, workdir: str, mix: Dict[str, float], concurrency: int = 8,
+        total_requests: int = 400, seed: int = 0) -> Dict:
+    """
+    Run total_requests operations spread over `concurrency` client threads.
+    Each client logs in and uploads a synthetic PDF before the timed loop;
+    that setup is reported as load.setup and is not part of the wall clock.
+    """
+    queries = [text for text, label in corpus.ask_queries(500, seed) if label != "pdf"]
+    username, email, password = BENCH_USER
+    client_factory().post_form("/signup", {"username": username, "email": email, "password": password})
+
+    ops = list(mix)
+    weights = [mix[op] for op in ops]
+    samples = {op: [] for op in ops}
+    errors = {op: 0 for op in ops}
+    setup_samples, setup_errors = [], [0]
+    lock = threading.Lock()
+    remaining = [total_requests]
+    # every client finishes its setup, then the main thread starts the clock
+    ready = threading.Barrier(concurrency + 1)
+
+    def setup(worker_id: int):
+        start = time.perf_counter()
+        client = None
+        try:
+            client = client_factory()
+            ok = bool(_login(client)[1].get("success"))
+            if ok:
+                # One file name per client: concurrent uploads to one path would overwrite each other
+                pdf_path = corpus.make_pdf(os.path.join(workdir, f"load_{LOAD_PDF_PAGES}p_{worker_id}.pdf"),
+                                           LOAD_PDF_PAGES)
+                client.post_form("/ask_pdf", {"message": "Summarize this PDF"}, file_path=pdf_path)
+        except Exception:
+            ok = False
+        with lock:
+            setup_samples.append(time.perf_counter() - start)
+            setup_errors[0] += int(not ok)
+        return client if ok else None
+
+    def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        client = setup(worker_id)
+        ready.wait()
+        if client is None:
+            return  # counted in load.setup; the other clients take its share
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            op = rng.choices(ops, weights)[0]
+            start = time.perf_counter()
+            try:
+                if op == "login":
+                    status, body = _login(client)
+                elif op == "ask":
+                    status, body = client.post_json("/ask", {"message": rng.choice(queries),
+                                                             "conversation_id": f"bench-{worker_id}"})
+                else:
+                    status, body = client.post_form("/ask_pdf", {"message": rng.choice(corpus.PDF_QUESTIONS)})
+                failed = status >= 400 or not body.get("success")
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples[op].append(elapsed)
+                errors[op] += int(failed)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    if setup_errors[0]:
+        print(f"[WARNING] {setup_errors[0]} of {concurrency} load clients failed to log in or upload")
+
+    results = {f"load.{op}": summarize(samples[op], wall=wall, errors=errors[op]) for op in ops}
+    everything = [s for op in ops for s in samples[op]]
+    results["load.total"] = summarize(everything, wall=wall, errors=sum(errors.values()))
+    results["load.setup"] = summarize(setup_samples, errors=setup_errors[0])
+    return results
+
+def in_process_factory(workdir: str):
+    import server
+    server.init_services()
+    # uploads (and their .index/) go to the scratch directory, not the repo's uploads/
+    server.app.config['UPLOAD_FOLDER'] = os.path.join(workdir, "uploads")
+    os.makedirs(server.app.config['UPLOAD_FOLDER'], exist_ok=True)
+    return lambda: TestClient(server.app)
+
+def http_factory(base_url: str):
+    return lambda: HttpClient(base_url)
@@ -0,0 +1,91 @@
+# File: benchmarks/micro.py
+# Call harness.isolate() before importing this module.
+
+import os
+from typing import Dict
+
+from benchmarks import corpus
+from benchmarks.harness import bench
+
+PDF_SIZES = (1, 50, 500)
+BENCH_USER = ("bench_user", "bench_user@example.com", "Bench@Pass123")
+
+def bench_nlp(results: Dict, scale: int):
+    from modules.nlp_manager import NLPManager
+    manager = NLPManager()
+    texts = [text for text, _ in corpus.ask_queries(200 * scale)]
+    results["nlp.predict"] = bench(manager.predict, texts)
+    batches = [texts[i:i + 32] for i in range(0, len(texts), 32)]
+    results["nlp.predict_batch32"] = bench(manager.predict_batch, batches)
+    from modules.pre_router import pre_router
+    results["nlp.pre_router.classify"] = bench(pre_router.classify, texts)
+
+def bench_math(results: Dict, scale: int):
+    from modules import math_helper, math_cache
+
+    def clear():
+        math_cache.parse_cache.clear()
+        math_cache.answer_cache.clear()
+
+    expressions = corpus.math_expressions()
+    queries = corpus.math_queries()
+    results["math.safe_parse.cold"] = bench(math_helper.safe_parse, expressions, repeat=5 * scale, setup=clear)
+    results["math.safe_parse.warm"] = bench(math_helper.safe_parse, expressions, repeat=50 * scale)
+    results["math.solve_math.cold"] = bench(math_helper.solve_math, queries, repeat=scale, setup=clear)
+    results["math.solve_math.warm"] = bench(math_helper.solve_math, queries, repeat=5 * scale)
+    results["math.handle_conversion"] = bench(math_helper.handle_conversion,
+                                              corpus.conversion_queries(500 * scale))
+
+def bench_pdf(results: Dict, scale: int, workdir: str, sizes=PDF_SIZES):
+    from modules import pdf_helper, pdf_cache
+
+    def clear():
+        with pdf_cache.cache_db.transaction() as conn:
+            conn.execute("DELETE FROM pdf_pages")
+            conn.execute("DELETE FROM pdf_documents")
+
+    for pages in sizes:
+        path = corpus.make_pdf(os.path.join(workdir, f"synthetic_{pages}p.pdf"), pages)
+        repeat = max(1, (20 if pages < 100 else 3) * scale)
+        results[f"pdf.extract_text_from_pdf.{pages}p.cold"] = bench(
+            pdf_helper.extract_text_from_pdf, [path], repeat=repeat, warmup=0, setup=clear)
+        pdf_helper.get_pdf_pages(path)  # a full pass fills the page cache
+        results[f"pdf.extract_text_from_pdf.{pages}p.warm"] = bench(
+            pdf_helper.extract_text_from_pdf, [path], repeat=repeat)
+        results[f"pdf.summarize_pdf.{pages}p.warm"] = bench(
+            pdf_helper.summarize_pdf, [path], repeat=max(1, repeat // 2))
+        results[f"pdf.get_pdf_pages.{pages}p.cold"] = bench(
+            pdf_helper.get_pdf_pages, [path], repeat=repeat, warmup=0, setup=clear)
+
+def bench_login(results: Dict, scale: int):
+    from modules import db, user_manager
+    db.migrate()
+    username, email, password = BENCH_USER
+    user_manager.signup_user(username, email, password)
+    if not user_manager.login_user(username, password)[0]:
+        raise RuntimeError("Benchmark user cannot log in")
+    results["user_manager.login_user.ok"] = bench(
+        lambda _: user_manager.login_user(username, password, ip="127.0.0.1"), range(10 * scale))
+    results["user_manager.login_user.bad_password"] = bench(
+        lambda _: user_manager.login_user(username, "Wrong@Pass123", ip="127.0.0.1"), range(10 * scale))
+    results["user_manager.login_user.unknown_user"] = bench(
+        lambda _: user_manager.login_user("nobody_here", password, ip="127.0.0.1"), range(50 * scale))
+
+SUITES = {
+    "nlp": bench_nlp,
+    "math": bench_math,
+    "pdf": bench_pdf,
+    "login": bench_login,
+}
+
+def run(workdir: str, scale: int = 1, only=None) -> Dict:
+    results = {}
+    for name, suite in SUITES.items():
+        if only and name not in only:
+            continue
+        print(f"[INFO] Running {name} micro-benchmarks")
+        if name == "pdf":
+            suite(results, scale, workdir)
+        else:
+            suite(results, scale)
+    return results
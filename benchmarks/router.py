@@ -0,0 +1,95 @@
+# File: benchmarks/router.py
+"""
+Router backends side by side: latency and accuracy.
+
+    python -m benchmarks.router                              # tfidf vs distilbert (int8)
+    python -m benchmarks.router --backends tfidf,distilbert,distilbert-fp32,online
+
+Every backend classifies the same labeled queries (generated from the
+training templates with a different seed, plus unit conversions). One
+message at a time, batches of 32 and the same messages again, which hits
+the DistilBERT tokenizer cache. Backends whose model or packages are
+missing are skipped.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import corpus
+from benchmarks.harness import bench
+
+BACKENDS = ("tfidf", "distilbert", "distilbert-fp32", "online")
+
+def load_manager(backend: str):
+    """
+    NLPManager for a backend name; "distilbert-fp32" is the checkpoint without quantization.
+    """
+    from modules.nlp_manager import NLPManager
+    if backend != "distilbert-fp32":
+        return NLPManager(backend=backend)
+    from modules import bert_router
+    manager = NLPManager(backend="tfidf")
+    manager.backend = "distilbert"
+    manager.swap_router(*bert_router.load_router(quantize=False))
+    return manager
+
+def accuracy(manager, rows) -> float:
+    predicted = manager.predict_batch([text for text, _ in rows])
+    return sum(label == expected for (label, _), (_, expected) in zip(predicted, rows)) / len(rows)
+
+def run(scale: int = 1, backends: Optional[List[str]] = None, seed: int = 1) -> Dict:
+    """
+    Router benchmarks in the harness result format, with load time and
+    accuracy per backend under "details".
+    """
+    rows = corpus.ask_queries(300 * scale, seed=seed)
+    texts = [text for text, _ in rows]
+    batches = [texts[i:i + 32] for i in range(0, len(texts), 32)]
+    results, details = {}, {}
+    for backend in backends or ["tfidf", "distilbert"]:
+        start = time.perf_counter()
+        try:
+            manager = load_manager(backend)
+        except Exception as e:
+            print(f"[WARNING] Skipping router backend {backend}: {e}")
+            continue
+        if manager.model is None:
+            print(f"[WARNING] Skipping router backend {backend}: model not loaded")
+            continue
+        load_seconds = time.perf_counter() - start
+        clear = getattr(manager.vectorizer, "_cache", None)
+        if clear is not None:
+            clear.clear()  # first pass below is tokenizer-cold
+        results[f"router.{backend}.predict"] = bench(manager.predict, texts)
+        results[f"router.{backend}.predict_batch32"] = bench(manager.predict_batch, batches)
+        results[f"router.{backend}.predict.repeat"] = bench(manager.predict, texts)
+        details[backend] = {"load_seconds": load_seconds, "accuracy": accuracy(manager, rows),
+                            "samples": len(rows)}
+    return {"benchmarks": results, "details": details}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare router backends")
+    parser.add_argument("--backends", default="tfidf,distilbert",
+                        help="comma-separated: " + ",".join(BACKENDS))
+    parser.add_argument("--scale", type=int, default=1, help="multiply the number of queries")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    result = run(args.scale, [b.strip() for b in args.backends.split(",") if b.strip()], args.seed)
+    print(f"{'backend':18} {'load s':>8} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'batch32 p50 ms':>15} {'repeat p50 ms':>14}")
+    for backend, info in result["details"].items():
+        single = result["benchmarks"][f"router.{backend}.predict"]
+        batch = result["benchmarks"][f"router.{backend}.predict_batch32"]
+        repeat = result["benchmarks"][f"router.{backend}.predict.repeat"]
+        print(f"{backend:18} {info['load_seconds']:8.2f} {info['accuracy']:9.1%} {single['p50_ms']:8.2f} "
+              f"{single['p95_ms']:8.2f} {batch['p50_ms']:15.2f} {repeat['p50_ms']:14.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# File: benchmarks/run.py
+"""
+ChatMate benchmark suite.
+
+    python -m benchmarks.run                          # micro + in-process load
+    python -m benchmarks.run --suite micro --only math,pdf
+    python -m benchmarks.run --suite load --url http://127.0.0.1:5000 --concurrency 32
+    python -m benchmarks.run --suite startup          # fresh-process cold start
+    python -m benchmarks.run --suite router           # tfidf vs DistilBERT latency and accuracy
+    python -m benchmarks.run --save-baseline          # record benchmarks/baseline.json
+
+Results are written as JSON (--out) and compared with --baseline when it exists.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import harness
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ChatMate benchmarks")
+    parser.add_argument("--suite", choices=["micro", "load", "startup", "router", "all"], default="all")
+    parser.add_argument("--only", help="comma-separated micro suites: nlp,math,pdf,login")
+    parser.add_argument("--backends", default="tfidf,distilbert", help="router suite backends")
+    parser.add_argument("--scale", type=int, default=1, help="multiply iteration counts")
+    parser.add_argument("--url", help="load-test a running server instead of the in-process app")
+    parser.add_argument("--mix", help='operation weights, e.g. "ask=0.7,ask_pdf=0.2,login=0.1"')
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results to --baseline")
+    parser.add_argument("--metric", default="p50_ms", help="stat compared against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--workdir", help="scratch directory for databases and PDFs (default: temporary)")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="chatmate-bench-")
+    harness.isolate(workdir)
+    from benchmarks import micro, load
+
+    benchmarks = {}
+    if args.suite in ("micro", "all"):
+        only = set(args.only.split(",")) if args.only else None
+        benchmarks.update(micro.run(workdir, scale=args.scale, only=only))
+    if args.suite in ("load", "all"):
+        print(f"[INFO] Running load test ({args.requests} requests, concurrency {args.concurrency})")
+        factory = load.http_factory(args.url) if args.url else load.in_process_factory(workdir)
+        benchmarks.update(load.run(factory, workdir, load.parse_mix(args.mix), concurrency=args.concurrency,
+                                   total_requests=args.requests, seed=args.seed))
+    if args.suite in ("startup", "all"):
+        from benchmarks import startup
+        print("[INFO] Running startup probe")
+        benchmarks.update(startup.run(workdir=workdir)["benchmarks"])
+    if args.suite == "router":
+        from benchmarks import router
+        print(f"[INFO] Comparing router backends: {args.backends}")
+        routers = router.run(args.scale, args.backends.split(","), seed=args.seed + 1)
+        benchmarks.update(routers["benchmarks"])
+        for backend, info in routers["details"].items():
+            print(f"[INFO] {backend}: accuracy {info['accuracy']:.1%}, loaded in {info['load_seconds']:.2f}s")
+
+    results = {
+        "environment": harness.environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "workdir")},
+        "benchmarks": benchmarks,
+    }
+    baseline = harness.load(args.baseline)
+    comparison = harness.compare(results, baseline, args.metric, args.threshold) if baseline else []
+    results["comparison"] = comparison
+
+    harness.print_table(results, comparison)
+    harness.save(results, args.out)
+    print(f"[INFO] Results written to {args.out}")
+    if args.save_baseline:
+        harness.save(results, args.baseline)
+        print(f"[INFO] Baseline written to {args.baseline}")
+
+    regressions = [row["name"] for row in comparison if row["status"] == "regression"]
+    if regressions:
+        print(f"[WARNING] {len(regressions)} regression(s) vs baseline: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
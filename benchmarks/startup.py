@@ -0,0 +1,123 @@
+# File: benchmarks/startup.py
+"""
+Where does worker start-up time go?
+
+    python -m benchmarks.startup                  # lazy start (default)
+    python -m benchmarks.startup --preload all    # with CHATMATE_PRELOAD=all
+
+Runs `import server; server.init_services()` in fresh interpreters under
+`python -X importtime` and reports import time per top-level package, the
+slowest modules, the startup phases and the time to the first /ask answer.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import REPO_ROOT
+from benchmarks.harness import summarize
+
+# Runs in the child interpreter; prints one JSON line at the end
+_CHILD = r"""
+import json, time
+start = time.perf_counter()
+import server
+imported = time.perf_counter()
+server.init_services()
+ready = time.perf_counter()
+client = server.app.test_client()
+with client.session_transaction() as s:
+    s["user_id"] = 0
+    s["username"] = "startup"
+client.post("/ask", json={"message": %r})
+answered = time.perf_counter()
+from modules import metrics
+print("STARTUP " + json.dumps({
+    "import_server": imported - start, "init_services": ready - imported,
+    "first_ask": answered - ready, "phases": metrics._startup_phases,
+}))
+"""
+
+def _run_child(question: str, env: Dict) -> Tuple[Dict, str]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD % question],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=600)
+    report = next((line[len("STARTUP "):] for line in result.stdout.splitlines() if line.startswith("STARTUP ")), None)
+    if report is None:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+    return json.loads(report), result.stderr
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float, float]]:
+    """
+    (module, self seconds, cumulative seconds) for every line of -X importtime output.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():  # skip the header line
+            rows.append((name, int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return rows
+
+def by_package(rows) -> Dict[str, float]:
+    totals = defaultdict(float)
+    for name, self_seconds, _ in rows:
+        totals[name.split(".")[0]] += self_seconds
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+def run(runs: int = 3, question: str = "integrate x^2", preload: str = "", workdir: str = None) -> Dict:
+    """
+    Startup benchmarks in the harness result format, plus the import breakdown
+    of the last run under "details".
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="chatmate-startup-")
+    env = dict(os.environ, CHATMATE_PRELOAD=preload, CHATMATE_METRICS="1",
+               CHATMATE_DB=os.path.join(workdir, "startup_chatmate.db"),
+               CHATMATE_PDF_CACHE_DB=os.path.join(workdir, "startup_pdf_cache.db"))
+    samples = defaultdict(list)
+    for _ in range(runs):
+        report, stderr = _run_child(question, env)
+        for key in ("import_server", "init_services", "first_ask"):
+            samples[key].append(report[key])
+        samples["ready_to_first_answer"].append(sum(report[k] for k in ("import_server", "init_services", "first_ask")))
+    rows = parse_importtime(stderr)
+    return {
+        "benchmarks": {f"startup.{key}": summarize(values) for key, values in samples.items()},
+        "details": {
+            "phases": report["phases"],
+            "packages": by_package(rows),
+            "slowest_modules": sorted(rows, key=lambda row: -row[1])[:15],
+        },
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ChatMate startup timing report")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--preload", default="", help='CHATMATE_PRELOAD for the probe, e.g. "all"')
+    parser.add_argument("--question", default="integrate x^2")
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args(argv)
+
+    result = run(args.runs, args.question, args.preload)
+    for name, stats in result["benchmarks"].items():
+        print(f"{name:32} p50 {stats['p50_ms']:9.1f} ms")
+    print("\nStartup phases (last run):")
+    for phase, seconds in result["details"]["phases"].items():
+        print(f"  {phase:24} {seconds * 1000:9.1f} ms")
+    print("\nImport time by top-level package (self time, last run):")
+    for package, seconds in list(result["details"]["packages"].items())[:args.top]:
+        print(f"  {package:24} {seconds * 1000:9.1f} ms")
+    print("\nSlowest individual modules:")
+    for name, self_seconds, cumulative in result["details"]["slowest_modules"][:args.top]:
+        print(f"  {name:48} {self_seconds * 1000:8.1f} ms self {cumulative * 1000:9.1f} ms cumulative")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
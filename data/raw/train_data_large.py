@@ -66,32 +66,38 @@ pdf_templates = [
 ]
 
 num_samples = 1000  # generate 1000 samples per label
-rows = []
 
-# Generate Math examples
-for _ in range(num_samples):
-    expr = random.choice(math_expressions)
-    template = random.choice(math_templates)
-    rows.append([template.format(expr), "math"])
+def generate_rows(num_samples=num_samples, rng=random):
+    rows = []
 
-# Generate GK examples
-for _ in range(num_samples):
-    topic = random.choice(gk_topics)
-    template = random.choice(gk_templates)
-    rows.append([template.format(topic), "gk"])
+    # Generate Math examples
+    for _ in range(num_samples):
+        expr = rng.choice(math_expressions)
+        template = rng.choice(math_templates)
+        rows.append([template.format(expr), "math"])
 
-# Generate PDF examples
-for _ in range(num_samples):
-    template = random.choice(pdf_templates)
-    rows.append([template, "pdf"])
+    # Generate GK examples
+    for _ in range(num_samples):
+        topic = rng.choice(gk_topics)
+        template = rng.choice(gk_templates)
+        rows.append([template.format(topic), "gk"])
 
-# Shuffle rows for variety
-random.shuffle(rows)
+    # Generate PDF examples
+    for _ in range(num_samples):
+        template = rng.choice(pdf_templates)
+        rows.append([template, "pdf"])
 
-# Save to CSV
-with open("train_data_large.csv", "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(["text", "label"])
-    writer.writerows(rows)
+    # Shuffle rows for variety
+    rng.shuffle(rows)
+    return rows
 
-print("Large synthetic dataset created: train_data_large.csv")
+if __name__ == "__main__":
+    rows = generate_rows()
+
+    # Save to CSV
+    with open("train_data_large.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["text", "label"])
+        writer.writerows(rows)
+
+    print("Large synthetic dataset created: train_data_large.csv")
@@ -39,3 +39,4 @@ joblib.dump(vectorizer, "chatmate_vectorizer.pkl")
 joblib.dump(le, "chatmate_label_encoder.pkl")
 
 print("✅ NLP model, vectorizer & label encoder saved successfully!")
+print("Run `python -m modules.model_artifacts` to export the memory-mapped copy the server loads at startup.")
@@ -0,0 +1,23 @@
+# File: gunicorn.conf.py
+# Multi-worker WSGI launcher (Linux/macOS): gunicorn -c gunicorn.conf.py server:app
+
+import multiprocessing
+import os
+
+bind = os.environ.get("CHATMATE_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("CHATMATE_WORKERS", max(2, multiprocessing.cpu_count() // 2)))
+# Threaded workers: request threads wait on the per-module executors
+worker_class = "gthread"
+threads = int(os.environ.get("CHATMATE_THREADS", 16))
+timeout = int(os.environ.get("CHATMATE_WORKER_TIMEOUT", 120))
+
+# Each worker loads its own models; batcher and writer threads do not survive a fork
+preload_app = False
+
+def post_worker_init(worker):
+    import server
+    server.init_services()
+
+def worker_exit(server_, worker):
+    import server
+    server.shutdown_services()
@@ -0,0 +1,214 @@
+# File: modules/answer_cache.py
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, HashingVectorizer
+
+from modules.db import chatmate_db
+
+# ===== CACHE CONFIG =====
+GK_CACHE_SIZE = int(os.environ.get("CHATMATE_GK_CACHE_SIZE", 2048))
+GK_CACHE_TTL = float(os.environ.get("CHATMATE_GK_CACHE_TTL", 7 * 24 * 3600))  # seconds
+GK_CACHE_SIMILARITY = float(os.environ.get("CHATMATE_GK_CACHE_SIMILARITY", 0.9))
+GK_CACHE_PERSIST = os.environ.get("CHATMATE_GK_CACHE_PERSIST", "0") == "1"
+# Share of content terms two questions must have in common for a near-duplicate match
+GK_CACHE_MIN_COVERAGE = float(os.environ.get("CHATMATE_GK_CACHE_MIN_COVERAGE", 0.8))
+
+# Question words that do not change what is being asked
+_QUESTION_WORDS = {"explain", "define", "describe", "tell", "meant", "meaning", "definition", "please",
+                   "does", "do", "did"}
+# Negations change the answer, so they stay in the key
+_NEGATIONS = {"not", "no", "nor", "never", "none", "nothing", "without", "cannot"}
+_STOP_WORDS = (ENGLISH_STOP_WORDS - _NEGATIONS) | _QUESTION_WORDS
+_PUNCT_RE = re.compile(r"[^\w\s]")
+# Stateless, so each key is vectorized once when it is stored, never refit
+_VECTORIZER = HashingVectorizer(analyzer="char_wb", ngram_range=(3, 4), n_features=2 ** 18,
+                                alternate_sign=False, norm="l2")
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase, drop punctuation and stopwords, e.g.
+    "What is photosynthesis?" and "Explain photosynthesis" -> "photosynthesis".
+    """
+    text = _PUNCT_RE.sub(" ", (question or "").lower())
+    return " ".join(t for t in text.split() if t not in _STOP_WORDS)
+
+def _terms(key: str) -> set:
+    # crude plural folding: "works" and "work" are the same term
+    return {t[:-1] if len(t) > 3 and t.endswith("s") else t for t in key.split()}
+
+def term_coverage(query_key: str, key: str) -> float:
+    """
+    Share of the terms of either key that the other one also contains (the lower of the two).
+    """
+    a, b = _terms(query_key), _terms(key)
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return min(common / len(a), common / len(b))
+
+class AnswerCache:
+    """
+    Bounded LRU/TTL cache of generated answers keyed by normalized question.
+    Misses on the exact key fall back to the nearest cached question by
+    cosine similarity of hashed character n-gram vectors, accepted only
+    when the two questions share most content terms.
+    """
+
+    def __init__(self, max_size=GK_CACHE_SIZE, ttl=GK_CACHE_TTL, similarity=GK_CACHE_SIMILARITY,
+                 persist=GK_CACHE_PERSIST, database=chatmate_db, min_coverage=GK_CACHE_MIN_COVERAGE):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.min_coverage = min_coverage
+        self.persist = persist
+        self.database = database
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (answer, created_at, n-gram vector)
+        # near-duplicate index: one row per key, new keys appended on the next
+        # lookup, dropped keys blanked and compacted once they are half the rows
+        self._matrix = None
+        self._matrix_keys = []         # row -> key, None once dropped
+        self._rows = {}                # key -> row
+        self._unindexed = {}           # keys stored since the last append, in order
+        self._dead = 0
+        self._lock = threading.Lock()
+        if self.persist:
+            self._load()
+
+    # ===== Lookup =====
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        if not key:
+            return None
+        with self._lock:
+            answer = self._get_fresh(key)
+            if answer is not None:
+                self.hits += 1
+                return answer
+            near_key = self._nearest(key)
+            answer = self._get_fresh(near_key) if near_key else None
+            if answer is not None:
+                self.near_hits += 1
+                return answer
+            self.misses += 1
+            return None
+
+    def put(self, question: str, answer: str):
+        key = normalize_question(question)
+        if not key or not answer:
+            return
+        created_at = time.time()
+        vector = _VECTORIZER.transform([key])
+        with self._lock:
+            self._store(key, answer, created_at, vector)
+        if self.persist:
+            self._save(key, answer, created_at)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            }
+
+    # ===== Internals (caller holds the lock) =====
+    def _get_fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        answer, created_at, _ = entry
+        if time.time() - created_at > self.ttl:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def _store(self, key, answer, created_at, vector):
+        self._unindex(key)
+        self._entries[key] = (answer, created_at, vector)
+        self._entries.move_to_end(key)
+        self._unindexed[key] = None
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        if self._entries.pop(key, None) is not None:
+            self._unindex(key)
+
+    def _unindex(self, key):
+        self._unindexed.pop(key, None)
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._matrix_keys[row] = None
+            self._dead += 1
+
+    def _update_index(self):
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = _VECTORIZER.transform(self._matrix_keys)
+            self._rows = {key: row for row, key in enumerate(self._matrix_keys)}
+            self._unindexed.clear()
+            self._dead = 0
+        elif self._dead > len(self._matrix_keys) // 2:
+            live = [row for row, key in enumerate(self._matrix_keys) if key is not None]
+            self._matrix = self._matrix[live]
+            self._matrix_keys = [self._matrix_keys[row] for row in live]
+            self._rows = {key: row for row, key in enumerate(self._matrix_keys)}
+            self._dead = 0
+        if self._unindexed:
+            new_keys = list(self._unindexed)
+            self._rows.update((key, len(self._matrix_keys) + i) for i, key in enumerate(new_keys))
+            self._matrix_keys.extend(new_keys)
+            self._matrix = sp.vstack([self._matrix] + [self._entries[key][2] for key in new_keys], format="csr")
+            self._unindexed.clear()
+
+    def _nearest(self, key):
+        if not self._entries:
+            return None
+        self._update_index()
+        query_vec = _VECTORIZER.transform([key])
+        if not query_vec.nnz:
+            return None
+        scores = (self._matrix @ query_vec.T).toarray().ravel()
+        for best in scores.argsort()[::-1]:
+            if scores[best] < self.similarity:
+                break
+            candidate = self._matrix_keys[best]
+            # similar spelling is not enough: "capital germany" vs "capital france",
+            # and "water boil" vs "water not boil"
+            if candidate is not None and term_coverage(key, candidate) >= self.min_coverage \
+                    and _terms(key) & _NEGATIONS == _terms(candidate) & _NEGATIONS:
+                return candidate
+        return None
+
+    # ===== SQLite persistence (gk_answer_cache, see modules/db.py) =====
+    def _load(self):
+        rows = self.database.query_all(
+            "SELECT question_key, answer, created_at FROM gk_answer_cache WHERE created_at > ? "
+            "ORDER BY created_at DESC LIMIT ?",
+            (time.time() - self.ttl, self.max_size)
+        )
+        vectors = _VECTORIZER.transform([key for key, _, _ in rows]) if rows else None
+        with self._lock:
+            for i in reversed(range(len(rows))):
+                key, answer, created_at = rows[i]
+                self._store(key, answer, created_at, vectors[i])
+
+    def _save(self, key, answer, created_at):
+        self.database.execute(
+            "INSERT OR REPLACE INTO gk_answer_cache (question_key, answer, created_at) VALUES (?, ?, ?)",
+            (key, answer, created_at)
+        )
@@ -0,0 +1,172 @@
+# File: modules/bert_router.py
+
+import importlib.util
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Optional: the fine-tuned DistilBERT router needs transformers and torch,
+# imported when the checkpoint is loaded, not when this module is imported
+_BERT_AVAILABLE = all(importlib.util.find_spec(m) is not None for m in ("transformers", "torch"))
+
+# ===== DISTILBERT ROUTER CONFIG =====
+# Written by nlp/save_model.py
+MODEL_DIR = os.environ.get("CHATMATE_BERT_MODEL_DIR", "chatmate_router_model")
+QUANTIZE = os.environ.get("CHATMATE_BERT_QUANTIZE", "1") == "1"       # dynamic int8 Linear layers
+THREADS = int(os.environ.get("CHATMATE_BERT_THREADS", min(4, os.cpu_count() or 1)))
+MAX_LENGTH = int(os.environ.get("CHATMATE_BERT_MAX_LENGTH", 64))       # router inputs are short questions
+MAX_BATCH_TOKENS = int(os.environ.get("CHATMATE_BERT_MAX_BATCH_TOKENS", 2048))  # padded tokens per forward pass
+TOKEN_CACHE_SIZE = int(os.environ.get("CHATMATE_BERT_TOKEN_CACHE", 4096))
+BUCKET_WIDTH = 8               # sequences whose lengths round up to the same multiple share a batch
+# label2id used by nlp/preprocess.py, for checkpoints saved without id2label
+TRAINING_LABELS = ("math", "gk", "pdf")
+
+def is_available() -> bool:
+    return _BERT_AVAILABLE and os.path.isdir(MODEL_DIR)
+
+def bound_threads(threads: int = THREADS):
+    """
+    Cap torch's intra-op pool (and the inter-op pool, when it has not started
+    yet) so each worker process uses a fixed number of cores.
+    """
+    import torch
+    torch.set_num_threads(max(1, threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set, or parallel work has already run in this process
+
+# ===== Tokenizer with cache =====
+class CachedTokenizer:
+    """
+    Token ids per message, without padding, kept in an LRU cache so repeated
+    questions skip tokenization. Takes the vectorizer's place in NLPManager.
+    """
+
+    def __init__(self, tokenizer, max_length: int = MAX_LENGTH, cache_size: int = TOKEN_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0}
+
+    def transform(self, texts: Sequence[str]) -> List[Tuple[int, ...]]:
+        ids = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    ids[i] = cached
+                else:
+                    missing.setdefault(text, []).append(i)
+            self._counts["hits"] += len(texts) - sum(len(v) for v in missing.values())
+            self._counts["misses"] += sum(len(v) for v in missing.values())
+        if missing:
+            encoded = self.tokenizer(list(missing), truncation=True, max_length=self.max_length,
+                                     padding=False)["input_ids"]
+            with self._lock:
+                for (text, positions), token_ids in zip(missing.items(), encoded):
+                    token_ids = tuple(token_ids)
+                    for i in positions:
+                        ids[i] = token_ids
+                    self._cache[text] = token_ids
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return ids
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses = self._counts["hits"], self._counts["misses"]
+        lookups = hits + misses
+        return {"hits": hits, "misses": misses, "hit_ratio": hits / lookups if lookups else 0.0}
+
+# ===== Length-bucketed classifier =====
+def length_buckets(lengths: Sequence[int], max_batch_tokens: int = MAX_BATCH_TOKENS,
+                   bucket_width: int = BUCKET_WIDTH) -> List[List[int]]:
+    """
+    Group input positions into batches of similar length: sorted by length,
+    split whenever the rounded length changes or the padded batch would
+    exceed max_batch_tokens. Each batch is padded to its own longest input.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, current, bucket = [], [], None
+    for i in order:
+        rounded = -(-lengths[i] // bucket_width) * bucket_width
+        if current and (rounded != bucket or (len(current) + 1) * lengths[i] > max_batch_tokens):
+            batches.append(current)
+            current = []
+        current.append(i)
+        bucket = rounded
+    if current:
+        batches.append(current)
+    return batches
+
+class BertClassifier:
+    """
+    DistilBertForSequenceClassification behind the predict_proba interface
+    NLPManager uses: token ids in, class probabilities out.
+    """
+
+    def __init__(self, model, pad_token_id: int, max_batch_tokens: int = MAX_BATCH_TOKENS):
+        self.model = model
+        self.pad_token_id = pad_token_id
+        self.max_batch_tokens = max_batch_tokens
+
+    def predict_proba(self, token_ids: Sequence[Tuple[int, ...]]) -> np.ndarray:
+        import torch
+        probs = np.zeros((len(token_ids), self.model.config.num_labels), dtype=np.float32)
+        for batch in length_buckets([len(ids) for ids in token_ids], self.max_batch_tokens):
+            width = max(len(token_ids[i]) for i in batch)
+            input_ids = torch.full((len(batch), width), self.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+            for row, i in enumerate(batch):
+                input_ids[row, :len(token_ids[i])] = torch.tensor(token_ids[i], dtype=torch.long)
+                attention_mask[row, :len(token_ids[i])] = 1
+            with torch.inference_mode():
+                logits = self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+            probs[batch] = torch.softmax(logits.float(), dim=-1).numpy()
+        return probs
+
+class LabelNames:
+    """
+    inverse_transform for class indices, like sklearn's LabelEncoder.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.classes_ = np.asarray(names)
+
+    def inverse_transform(self, idx) -> np.ndarray:
+        return self.classes_[np.asarray(idx)]
+
+def _label_names(config) -> List[str]:
+    names = [config.id2label[i] for i in range(config.num_labels)]
+    if all(name.startswith("LABEL_") for name in names) and len(names) == len(TRAINING_LABELS):
+        return list(TRAINING_LABELS)
+    return names
+
+# ===== Loading =====
+def load_router(model_dir: str = MODEL_DIR, quantize: bool = QUANTIZE, threads: int = THREADS):
+    """
+    (model, vectorizer, label_encoder) stand-ins for NLPManager.swap_router,
+    built from a saved DistilBERT checkpoint, int8-quantized unless quantize=False.
+    """
+    if not _BERT_AVAILABLE:
+        raise ImportError("the distilbert router needs transformers and torch")
+    if not os.path.isdir(model_dir):
+        raise FileNotFoundError(f"no checkpoint in {model_dir} (see nlp/save_model.py)")
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    bound_threads(threads)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir).eval()
+    if quantize:
+        quantization = getattr(torch, "ao", torch).quantization
+        model = quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    classifier = BertClassifier(model, tokenizer.pad_token_id or 0)
+    return classifier, CachedTokenizer(tokenizer), LabelNames(_label_names(model.config))
@@ -0,0 +1,137 @@
+# File: modules/chat_store.py
+
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from modules.db import chatmate_db, BatchWriter
+
+# ===== RETENTION CONFIG =====
+MAX_CONVERSATIONS_PER_USER = int(os.environ.get("CHATMATE_MAX_CONVERSATIONS_PER_USER", 100))
+MAX_MESSAGES_PER_CONVERSATION = int(os.environ.get("CHATMATE_MAX_MESSAGES_PER_CONVERSATION", 500))
+CHAT_RETENTION_DAYS = int(os.environ.get("CHATMATE_CHAT_RETENTION_DAYS", 0))  # 0 keeps chats forever
+COMPACT_EVERY = 50  # appends per user between compaction passes
+
+CONVERSATION_PAGE_SIZE = 20
+MESSAGE_PAGE_SIZE = 50
+TITLE_LENGTH = 40
+
+# /ask never waits on these inserts; reads wait only for the same user's rows
+chat_writer = BatchWriter(chatmate_db, name="chat-history")
+
+_appends_since_compact = defaultdict(int)
+_lock = threading.Lock()
+
+_UPSERT_CONVERSATION = '''
+    INSERT INTO conversations (user_id, id, title, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, id) DO UPDATE SET updated_at = excluded.updated_at
+'''
+_INSERT_MESSAGE = '''
+    INSERT INTO messages (user_id, conversation_id, sender, text, confidence, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# ===== Writes =====
+def append_exchange(user_id, conversation_id: str, user_text: str, reply_text: str,
+                    confidence: Optional[float] = None):
+    """
+    Queue one question/answer pair for a conversation (created on first use).
+    """
+    if not conversation_id:
+        return
+    now = time.time()
+    title = user_text[:TITLE_LENGTH] + ("..." if len(user_text) > TITLE_LENGTH else "")
+    chat_writer.submit(_UPSERT_CONVERSATION, (user_id, conversation_id, title, now, now), key=user_id)
+    if user_text:
+        chat_writer.submit(_INSERT_MESSAGE, (user_id, conversation_id, "user", user_text, None, now), key=user_id)
+    chat_writer.submit(_INSERT_MESSAGE, (user_id, conversation_id, "assistant", reply_text, confidence, now),
+                       key=user_id)
+
+    with _lock:
+        _appends_since_compact[user_id] += 1
+        due = _appends_since_compact[user_id] >= COMPACT_EVERY
+        if due:
+            _appends_since_compact[user_id] = 0
+    if due:
+        compact_user(user_id)
+
+def delete_conversation(user_id, conversation_id: str):
+    chat_writer.flush_key(user_id)
+    with chatmate_db.transaction() as conn:
+        conn.execute("DELETE FROM messages WHERE user_id=? AND conversation_id=?", (user_id, conversation_id))
+        conn.execute("DELETE FROM conversations WHERE user_id=? AND id=?", (user_id, conversation_id))
+
+def compact_user(user_id):
+    """
+    Queue retention for one user: keep the newest MAX_CONVERSATIONS_PER_USER
+    conversations, the last MAX_MESSAGES_PER_CONVERSATION messages of each,
+    and drop conversations idle for more than CHAT_RETENTION_DAYS.
+    """
+    stale = '''
+        SELECT id FROM conversations WHERE user_id=?
+        ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+    '''
+    params = (user_id, user_id, MAX_CONVERSATIONS_PER_USER)
+    chat_writer.submit(f"DELETE FROM messages WHERE user_id=? AND conversation_id IN ({stale})", params, key=user_id)
+    chat_writer.submit(f"DELETE FROM conversations WHERE user_id=? AND id IN ({stale})", params, key=user_id)
+    if CHAT_RETENTION_DAYS > 0:
+        cutoff = time.time() - CHAT_RETENTION_DAYS * 86400
+        chat_writer.submit(
+            "DELETE FROM messages WHERE user_id=? AND conversation_id IN "
+            "(SELECT id FROM conversations WHERE user_id=? AND updated_at < ?)",
+            (user_id, user_id, cutoff), key=user_id
+        )
+        chat_writer.submit("DELETE FROM conversations WHERE user_id=? AND updated_at < ?", (user_id, cutoff),
+                           key=user_id)
+    chat_writer.submit(
+        '''
+        DELETE FROM messages WHERE user_id=? AND id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY id DESC) AS rank
+                FROM messages WHERE user_id=?
+            ) WHERE rank > ?
+        )
+        ''',
+        (user_id, user_id, MAX_MESSAGES_PER_CONVERSATION), key=user_id
+    )
+
+# ===== Reads =====
+def list_conversations(user_id, limit: int = CONVERSATION_PAGE_SIZE,
+                       before: Optional[Tuple[float, str]] = None) -> Tuple[List[Dict], Optional[Tuple[float, str]]]:
+    """
+    Newest conversations first, keyset-paginated by (updated_at, id).
+    Returns (conversations, next_cursor).
+    """
+    chat_writer.flush_key(user_id)
+    sql = "SELECT id, title, updated_at FROM conversations WHERE user_id=?"
+    params = [user_id]
+    if before:
+        sql += " AND (updated_at < ? OR (updated_at = ? AND id < ?))"
+        params.extend([before[0], before[0], before[1]])
+    sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = chatmate_db.query_all(sql, params)
+    next_cursor = (rows[limit - 1][2], rows[limit - 1][0]) if len(rows) > limit else None
+    return [{"id": cid, "title": title, "updated_at": updated_at} for cid, title, updated_at in rows[:limit]], next_cursor
+
+def get_messages(user_id, conversation_id: str, limit: int = MESSAGE_PAGE_SIZE,
+                 before_id: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+    """
+    The latest `limit` messages before before_id, returned oldest first.
+    Returns (messages, next_before_id) for loading earlier messages.
+    """
+    chat_writer.flush_key(user_id)
+    sql = "SELECT id, sender, text, confidence, created_at FROM messages WHERE user_id=? AND conversation_id=?"
+    params = [user_id, conversation_id]
+    if before_id:
+        sql += " AND id < ?"
+        params.append(before_id)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = chatmate_db.query_all(sql, params)
+    next_before_id = rows[limit - 1][0] if len(rows) > limit else None
+    messages = [{"id": mid, "sender": sender, "text": text, "confidence": confidence, "created_at": created_at}
+                for mid, sender, text, confidence, created_at in reversed(rows[:limit])]
+    return messages, next_before_id
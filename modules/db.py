@@ -0,0 +1,336 @@
+# File: modules/db.py
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Sequence
+
+DB_PATH = os.environ.get("CHATMATE_DB", "chatmate.db")
+DB_POOL_SIZE = int(os.environ.get("CHATMATE_DB_POOL_SIZE", 8))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("CHATMATE_DB_BUSY_TIMEOUT_MS", 5000))
+
+# Applied to every new connection
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",          # readers no longer block on the login writer
+    "PRAGMA synchronous=NORMAL",        # safe with WAL, one fsync per checkpoint
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",          # ~8 MB page cache per connection
+]
+
+# ===== SCHEMA MIGRATIONS (chatmate.db) =====
+# Append only; each entry runs once and bumps PRAGMA user_version.
+MIGRATIONS: List[Sequence[str]] = [
+    # 1: users and login audit
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS logins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            success INTEGER
+        )
+        ''',
+    ],
+    # 2: persisted answer caches
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS gk_answer_cache (
+            question_key TEXT PRIMARY KEY,
+            answer TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS math_answer_cache (
+            answer_key TEXT PRIMARY KEY,
+            answer TEXT NOT NULL
+        )
+        ''',
+    ],
+    # 3: login history indexes for paging and per-user filters
+    [
+        "CREATE INDEX IF NOT EXISTS idx_logins_timestamp ON logins(timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_logins_username_timestamp ON logins(username, timestamp)",
+    ],
+    # 4: server-side chat history; conversation ids are generated by the client
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS conversations (
+            user_id INTEGER NOT NULL,
+            id TEXT NOT NULL,
+            title TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (user_id, id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            conversation_id TEXT NOT NULL,
+            sender TEXT NOT NULL,
+            text TEXT NOT NULL,
+            confidence REAL,
+            created_at REAL NOT NULL
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_conversations_user_updated ON conversations(user_id, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(user_id, conversation_id, id)",
+    ],
+    # 5: corrected router labels waiting for the online router's partial_fit
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS route_feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            text TEXT NOT NULL,
+            predicted TEXT,
+            label TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            applied INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_route_feedback_pending ON route_feedback(applied, id)",
+    ],
+    # 6: background PDF ingest jobs, visible to every worker process
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS pdf_jobs (
+            job_id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            file_path TEXT NOT NULL,
+            status TEXT NOT NULL,
+            pages_done INTEGER NOT NULL DEFAULT 0,
+            total_pages INTEGER,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_pdf_jobs_created ON pdf_jobs(created_at)",
+    ],
+]
+
+class Database:
+    """
+    Pool of SQLite connections to one database file.
+    Connections are shared across threads but used by one thread at a time;
+    sqlite3 keeps a per-connection cache of prepared statements.
+    """
+
+    def __init__(self, path: str, migrations: Optional[List[Sequence[str]]] = None, pool_size: int = DB_POOL_SIZE):
+        self.path = path
+        self.migrations = migrations or []
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False, cached_statements=256)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if not self._migrated:
+            self.migrate()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                return self._connect()
+        return self._idle.get()
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection for reads (or manual transactions).
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Borrow a connection and commit on success, roll back on error.
+        """
+        with self.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def query_all(self, sql: str, params: Sequence = ()) -> list:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Sequence = ()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql: str, params: Sequence = ()) -> int:
+        """
+        Run one write statement in its own transaction; returns the number of
+        rows it changed. The cursor is not returned: its connection goes back
+        to the pool (and to other threads) when this returns.
+        """
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def migrate(self):
+        """
+        Bring the schema up to date. Safe to call from several workers.
+        """
+        with self._lock:
+            if self._migrated:
+                return
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                for number, statements in enumerate(self.migrations[version:], start=version + 1):
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version={number}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            self._migrated = True
+
+# ===== BATCHED BACKGROUND WRITES =====
+class BatchWriter:
+    """
+    Background writer for inserts nobody waits on (audit rows, chat logs).
+    Rows are queued and committed in one transaction every flush_ms or once
+    max_batch rows are waiting. Pending rows are flushed at interpreter exit.
+    Rows submitted with a key (e.g. a user id) can be waited for on their own.
+    """
+
+    def __init__(self, database: "Database", max_batch: int = 256, flush_ms: int = 200, name: str = "db-writer"):
+        self.database = database
+        self.max_batch = max_batch
+        self.flush_interval = flush_ms / 1000.0
+        self.written = 0
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._done = threading.Condition()
+        self._submitted = 0            # sequence number of the last queued row
+        self._finished = 0             # every row up to this number is written (or failed)
+        self._last_by_key = {}         # key -> sequence number of its last queued row
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+        atexit.register(self.flush)
+
+    def submit(self, sql: str, params: Sequence = (), key=None):
+        with self._done:
+            self._submitted += 1
+            if key is not None:
+                self._last_by_key[key] = self._submitted
+            self._queue.put((sql, tuple(params), self._submitted))
+
+    def flush(self, timeout: Optional[float] = 5.0):
+        """
+        Block until every row submitted so far is committed.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def flush_key(self, key, timeout: Optional[float] = 5.0):
+        """
+        Block until the rows submitted with `key` are committed; returns at
+        once when none are pending, whatever other keys have queued.
+        """
+        with self._done:
+            target = self._last_by_key.get(key)
+            if target is None:
+                return
+            self._queue.put(threading.Event())  # commit now instead of after flush_ms
+            self._done.wait_for(lambda: self._finished >= target, timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch and not isinstance(batch[-1], threading.Event):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            rows = [item for item in batch if not isinstance(item, threading.Event)]
+            if rows:
+                self._write(rows)
+                with self._done:
+                    self._finished = rows[-1][2]
+                    self._last_by_key = {key: seq for key, seq in self._last_by_key.items()
+                                         if seq > self._finished}
+                    self._done.notify_all()
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, rows):
+        # Group consecutive rows by statement so each group is one executemany
+        try:
+            with self.database.transaction() as conn:
+                start = 0
+                for i in range(1, len(rows) + 1):
+                    if i == len(rows) or rows[i][0] != rows[start][0]:
+                        conn.executemany(rows[start][0], [row[1] for row in rows[start:i]])
+                        start = i
+            self.written += len(rows)
+        except Exception as e:
+            self.errors += len(rows)
+            print(f"[WARNING] Failed to write {len(rows)} queued rows: {e}")
+
+# Shared handle for chatmate.db
+chatmate_db = Database(DB_PATH, MIGRATIONS)
+
+def migrate():
+    """
+    Single schema entry point for chatmate.db (replaces create_tables).
+    """
+    chatmate_db.migrate()
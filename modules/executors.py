@@ -0,0 +1,47 @@
+# File: modules/executors.py
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ===== EXECUTOR CONFIG =====
+# One bounded pool per helper module, so slow generations cannot starve
+# math or PDF requests. SymPy and PyPDF2 hold the GIL (math_pool and
+# pdf_helper fan out to processes for the heavy cases); torch and hashlib
+# release it, so threads are enough here.
+_CPUS = os.cpu_count() or 2
+EXECUTOR_WORKERS = {
+    "math": int(os.environ.get("CHATMATE_MATH_EXECUTOR_WORKERS", _CPUS)),
+    "gk": int(os.environ.get("CHATMATE_GK_EXECUTOR_WORKERS", 4)),
+    "pdf": int(os.environ.get("CHATMATE_PDF_EXECUTOR_WORKERS", max(2, _CPUS // 2))),
+}
+
+_executors = {}
+_lock = threading.Lock()
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    with _lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=max(1, EXECUTOR_WORKERS.get(name, 2)), thread_name_prefix=f"{name}-exec"
+            )
+        return _executors[name]
+
+async def run(name: str, fn, *args, **kwargs):
+    """
+    Await fn(*args, **kwargs) on the named module's executor. The caller's
+    context variables (e.g. the request's stage timings) carry over.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(name), functools.partial(context.run, fn, *args, **kwargs))
+
+def shutdown(wait: bool = True):
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,194 @@
+# File: modules/faq_engine.py
+
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+# ===== FAQ CONFIG =====
+# CSV with question,answer columns, or a SQLite file with a faq(question, answer) table
+FAQ_SOURCE = os.environ.get(
+    "CHATMATE_FAQ_SOURCE", os.path.join(os.path.dirname(__file__), "../data/faq.csv")
+)
+FAQ_SIMILARITY = float(os.environ.get("CHATMATE_FAQ_SIMILARITY", 0.75))
+# Share of the query's content words the matched FAQ question must contain
+FAQ_MIN_COVERAGE = float(os.environ.get("CHATMATE_FAQ_MIN_COVERAGE", 0.5))
+FAQ_RELOAD_INTERVAL = float(os.environ.get("CHATMATE_FAQ_RELOAD_INTERVAL", 5))  # seconds between mtime checks
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+def _content_terms(text: str) -> set:
+    # stopwords dropped, crude plural folding ("planets" == "planet")
+    return {t[:-1] if len(t) > 3 and t.endswith("s") else t
+            for t in _tokenize(text) if t not in ENGLISH_STOP_WORDS}
+
+def covers(query: str, faq_question: str, min_coverage: float = FAQ_MIN_COVERAGE) -> bool:
+    """
+    True when every content word of the FAQ question is in the query and the
+    FAQ question accounts for at least min_coverage of the query's content
+    words: "who wrote macbeth" is not covered by "who wrote hamlet".
+    """
+    query_terms, faq_terms = _content_terms(query), _content_terms(faq_question)
+    if not query_terms or not faq_terms or not faq_terms <= query_terms:
+        return False
+    return len(faq_terms) / len(query_terms) >= min_coverage
+
+# ===== PHRASE AUTOMATON =====
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over word tokens. One pass over the query finds
+    every FAQ question that appears in it as a phrase.
+    """
+
+    def __init__(self, phrases: List[List[str]]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [-1]  # longest phrase ending at this state, via suffix links
+        self.lengths = [len(p) for p in phrases]
+        for idx, tokens in enumerate(phrases):
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                nxt = self.goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(-1)
+                    self.goto[state][token] = nxt
+                state = nxt
+            if self.out[state] == -1:
+                self.out[state] = idx
+
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for token, nxt in self.goto[state].items():
+                pending.append(nxt)
+                f = self.fail[state]
+                while f and token not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(token, 0)
+                if self.out[nxt] == -1:
+                    self.out[nxt] = self.out[self.fail[nxt]]
+
+    def longest_match(self, tokens: List[str]) -> int:
+        """
+        Index of the longest phrase found in tokens, or -1.
+        """
+        state, best = 0, -1
+        for token in tokens:
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            match = self.out[state]
+            if match != -1 and (best == -1 or self.lengths[match] > self.lengths[best]):
+                best = match
+        return best
+
+# ===== FAQ INDEX =====
+class _FAQIndex:
+    def __init__(self, pairs: List[Tuple[str, str]]):
+        self.questions = [question for question, _ in pairs]
+        self.answers = [answer for _, answer in pairs]
+        self.automaton = PhraseAutomaton([_tokenize(q) for q, _ in pairs])
+        self.vectorizer = None
+        self.postings = None
+        if pairs:
+            try:
+                self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, stop_words="english")
+                # features x questions, so a query only touches the postings of its own terms
+                self.postings = self.vectorizer.fit_transform([q for q, _ in pairs]).T.tocsr()
+            except ValueError:
+                self.vectorizer = None
+
+    def lookup(self, question: str, similarity: float) -> Optional[str]:
+        match = self.automaton.longest_match(_tokenize(question))
+        if match != -1:
+            return self.answers[match]
+        if self.vectorizer is None:
+            return None
+        query_vec = self.vectorizer.transform([question])
+        if not query_vec.nnz:
+            return None
+        # Sparse: only questions sharing a term with the query have a score
+        scores = (query_vec @ self.postings).tocsr()
+        if not scores.nnz:
+            return None
+        top = scores.data.max()
+        best = int(scores.indices[scores.data == top].min())  # first question on a tie, like argmax
+        if top < similarity or not covers(question, self.questions[best]):
+            return None
+        return self.answers[best]
+
+def load_faq_pairs(source: str) -> List[Tuple[str, str]]:
+    """
+    Read (question, answer) pairs from a CSV file or a SQLite database.
+    """
+    if source.endswith((".db", ".sqlite", ".sqlite3")):
+        conn = sqlite3.connect(source)
+        rows = conn.execute("SELECT question, answer FROM faq").fetchall()
+        conn.close()
+        return [(q, a) for q, a in rows if q and a]
+    with open(source, newline="", encoding="utf-8") as f:
+        return [(row["question"], row["answer"]) for row in csv.DictReader(f)
+                if row.get("question") and row.get("answer")]
+
+class FAQEngine:
+    """
+    Curated question/answer lookup with exact phrase matching and a TF-IDF
+    nearest-neighbour fallback that only answers when the FAQ question covers
+    the query's content words. The source is re-read when its mtime changes.
+    """
+
+    def __init__(self, source=FAQ_SOURCE, similarity=FAQ_SIMILARITY, reload_interval=FAQ_RELOAD_INTERVAL):
+        self.source = source
+        self.similarity = similarity
+        self.reload_interval = reload_interval
+        self._index = _FAQIndex([])
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """
+        Rebuild the index from the source and swap it in.
+        """
+        try:
+            mtime = os.path.getmtime(self.source)
+            index = _FAQIndex(load_faq_pairs(self.source))
+        except Exception as e:
+            print(f"[WARNING] Failed to load FAQ source {self.source}: {e}")
+            return
+        self._index, self._mtime = index, mtime
+        print(f"[INFO] FAQ engine loaded {len(index.answers)} entries")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self.reload_interval:
+                return
+            self._last_check = now
+            try:
+                changed = os.path.getmtime(self.source) != self._mtime
+            except OSError:
+                changed = False
+            if changed:
+                self.reload()
+
+    def lookup(self, question: str) -> Optional[str]:
+        self._maybe_reload()
+        return self._index.lookup(question, self.similarity)
@@ -1,23 +1,24 @@
+import queue
 import re
-from typing import Dict
-
-# Optional Hugging Face LLM
-try:
-    from transformers import pipeline
-    _LLM_PIPELINE_AVAILABLE = True
-except Exception:
-    _LLM_PIPELINE_AVAILABLE = False
-
-_llm = None
-def _get_llm():
-    global _llm
-    if _llm is None and _LLM_PIPELINE_AVAILABLE:
-        try:
-            # Smaller local model suitable for CPU
-            _llm = pipeline("text2text-generation", model="google/flan-t5-small")
-        except Exception:
-            _llm = None
-    return _llm
+import time
+from typing import Dict, Iterator
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from modules.llm_service import GenerationService, LLM_WARMUP
+from modules.answer_cache import AnswerCache
+from modules.faq_engine import FAQEngine
+from modules import metrics
+
+# Shared flan-t5 generation service (pooled, batched, lazily loaded)
+_llm_service = GenerationService()
+
+# Generated answers keyed by normalized question; hits skip the LLM entirely
+answer_cache = AnswerCache()
+
+def warm_up():
+    """
+    Load the LLM instances now instead of inside the first GK request.
+    """
+    _llm_service.start(warm_up=True)
 
 def clean_llm_output(text: str) -> str:
     text = str(text).replace('\n',' ').strip()
@@ -26,46 +27,154 @@ def clean_llm_output(text: str) -> str:
     if len(text) > 1000: text = text[:1000].rstrip() + "..."
     return text
 
-# ===== Simple FAQ fallback =====
-_FAQ = {
-    "what is the capital of india": "The capital of India is New Delhi.",
-    "who is the president of usa": "As of 2025, the President of the USA is Joe Biden.",
-    "who discovered gravity": "Sir Isaac Newton is credited with discovering the laws of gravity.",
-    "what is the boiling point of water": "The boiling point of water is 100°C (212°F) at standard atmospheric pressure.",
-    "who wrote hamlet": "William Shakespeare wrote the play 'Hamlet'."
-}
+class StreamCleaner:
+    """
+    clean_llm_output applied to text that arrives in pieces: whitespace runs
+    become one space, a word repeating the previous one is dropped and the
+    output stops at max_chars. The last, possibly unfinished word is held
+    back until the next whitespace or flush().
+    """
+
+    def __init__(self, max_chars: int = 1000):
+        self.max_chars = max_chars
+        self._pending = ""
+        self._last = ""
+        self._length = 0
+        self._done = False
+
+    def feed(self, piece: str) -> str:
+        self._pending += str(piece)
+        tokens = re.split(r"\s+", self._pending)
+        self._pending = tokens.pop()
+        return self._emit(tokens)
+
+    def flush(self) -> str:
+        tokens, self._pending = [self._pending], ""
+        return self._emit(tokens)
+
+    def _emit(self, tokens) -> str:
+        out = []
+        for token in tokens:
+            if not token or self._done:
+                continue
+            separator = " " if self._length else ""
+            previous = re.search(r"\w+$", self._last)
+            repeated = re.match(r"\w+", token)
+            if previous and repeated and repeated.group().lower() == previous.group().lower():
+                # "is is." -> "is.": keep only what follows the repeated word
+                token, separator = token[repeated.end():], ""
+                if not token:
+                    continue
+            piece = separator + token
+            if self._length + len(piece) > self.max_chars:
+                piece = piece[:self.max_chars - self._length].rstrip() + "..."
+                self._done = True
+            out.append(piece)
+            self._length += len(piece)
+            self._last = token
+        return "".join(out)
+
+# ===== FAQ fallback =====
+# Curated Q&A pairs from data/faq.csv, reloaded when the file changes
+_faq_engine = FAQEngine()
 
 def _faq_fallback(question: str) -> str:
-    q = question.lower()
-    for key, answer in _FAQ.items():
-        if key in q:
-            return answer
-    return None
+    return _faq_engine.lookup(question)
+
+def _prompt(user_message: str) -> str:
+    return f"You are a helpful student tutor. Explain clearly to a high school student:\n\nQuestion: {user_message}\n\nAnswer:"
 
 def handle_gk_query(user_message: str) -> Dict:
     user_message = (user_message or "").strip()
     if not user_message:
         return {"handled": True, "reply": "Please enter a question."}
 
+    with metrics.timed("gk.cache"):
+        cached = answer_cache.get(user_message)
+    if cached is not None:
+        return {"handled": True, "reply": cached}
+
     # Try LLM if available
-    llm = _get_llm()
-    if llm:
-        try:
-            prompt = f"You are a helpful student tutor. Explain clearly to a high school student:\n\nQuestion: {user_message}\n\nAnswer:"
-            response = llm(prompt, max_length=256, do_sample=False)[0].get("generated_text", "")
-            reply = clean_llm_output(response)
-            return {"handled": True, "reply": reply}
-        except Exception as e:
-            reply = f"Error generating explanation: {e}"
-            return {"handled": True, "reply": reply}
+    try:
+        with metrics.timed("gk.llm"):
+            response = _llm_service.generate(_prompt(user_message))
+    except FutureTimeoutError:
+        response = None  # generation too slow, answer from the FAQ instead
+    except Exception as e:
+        reply = f"Error generating explanation: {e}"
+        return {"handled": True, "reply": reply}
+    if response is not None:
+        reply = clean_llm_output(response)
+        answer_cache.put(user_message, reply)
+        return {"handled": True, "reply": reply}
 
     # If LLM not available, fallback to FAQ
-    faq_answer = _faq_fallback(user_message)
+    return {"handled": True, "reply": _fallback_reply(user_message)}
+
+def _fallback_reply(user_message: str) -> str:
+    with metrics.timed("gk.faq"):
+        faq_answer = _faq_fallback(user_message)
     if faq_answer:
-        return {"handled": True, "reply": faq_answer}
+        return faq_answer
 
     # Default fallback
-    return {"handled": True, "reply": "Sorry, I cannot answer that question right now."}
+    return "Sorry, I cannot answer that question right now."
+
+def stream_gk_query(user_message: str) -> Iterator[str]:
+    """
+    handle_gk_query for streaming: yields the reply in pieces as flan-t5
+    decodes it, cleaned on the fly. Cached and FAQ answers come as one piece.
+    """
+    user_message = (user_message or "").strip()
+    if not user_message:
+        yield "Please enter a question."
+        return
+
+    with metrics.timed("gk.cache"):
+        cached = answer_cache.get(user_message)
+    if cached is not None:
+        yield cached
+        return
+
+    try:
+        pieces = _llm_service.stream(_prompt(user_message))
+    except FutureTimeoutError:
+        pieces = None  # no free model instance in time, answer from the FAQ instead
+    except Exception as e:
+        yield f"Error generating explanation: {e}"
+        return
+    if pieces is not None:
+        cleaner = StreamCleaner()
+        reply = []
+        start = time.perf_counter()
+        completed = False
+        try:
+            for piece in pieces:
+                text = cleaner.feed(piece)
+                if text:
+                    if not reply:
+                        metrics.record("gk.first_token", "", time.perf_counter() - start)
+                    reply.append(text)
+                    yield text
+            completed = pieces.error is None
+        except queue.Empty:
+            pass  # generation stalled; keep what was produced
+        finally:
+            if not completed:
+                # stalled, failed or the client went away: stop decoding into the void
+                pieces.cancel()
+        text = cleaner.flush()
+        if text:
+            reply.append(text)
+            yield text
+        metrics.record("gk.llm", "stream", time.perf_counter() - start)
+        if reply:
+            # a truncated answer must not become the cached answer to this question
+            if completed:
+                answer_cache.put(user_message, "".join(reply))
+            return
+
+    yield _fallback_reply(user_message)
 
 # ===== Standalone Test =====
 if __name__ == "__main__":
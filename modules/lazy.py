@@ -0,0 +1,37 @@
+# File: modules/lazy.py
+
+import importlib
+import threading
+import time
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access (or by
+    load() during warm-up). on_load(module) runs once, right after the import.
+    """
+
+    def __init__(self, name: str, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if self._on_load:
+                        self._on_load(module)
+                    self.load_seconds = time.perf_counter() - start
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
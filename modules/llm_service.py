@@ -0,0 +1,196 @@
+# File: modules/llm_service.py
+
+import importlib.util
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional
+
+# Optional Hugging Face LLM; transformers (and torch) are imported when the
+# first pipeline is built, not when this module is imported
+_LLM_PIPELINE_AVAILABLE = importlib.util.find_spec("transformers") is not None
+
+# ===== SERVICE CONFIG =====
+LLM_MODEL = os.environ.get("CHATMATE_LLM_MODEL", "google/flan-t5-small")  # small enough for CPU
+LLM_POOL_SIZE = int(os.environ.get("CHATMATE_LLM_POOL_SIZE", 1))
+LLM_MAX_BATCH = int(os.environ.get("CHATMATE_LLM_MAX_BATCH", 8))
+LLM_BATCH_WAIT_MS = int(os.environ.get("CHATMATE_LLM_BATCH_WAIT_MS", 20))
+LLM_TIMEOUT = float(os.environ.get("CHATMATE_LLM_TIMEOUT", 30))
+LLM_WARMUP = os.environ.get("CHATMATE_LLM_WARMUP", "0") == "1"
+MAX_LENGTH = 256
+
+class GenerationStream:
+    """
+    The text pieces of one streamed generation, in order. cancel() makes the
+    worker stop decoding at the next token; error is set if generation failed.
+    """
+
+    def __init__(self, streamer):
+        self.streamer = streamer
+        self.cancelled = threading.Event()
+        self.error = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self.streamer)
+
+    def cancel(self):
+        self.cancelled.set()
+
+class GenerationService:
+    """
+    A pool of text2text-generation pipelines behind one request queue.
+    Each worker thread owns one model instance and sends prompts that arrive
+    within a few milliseconds of each other through a single generate call.
+    """
+
+    def __init__(self, model_name=LLM_MODEL, pool_size=LLM_POOL_SIZE, max_batch=LLM_MAX_BATCH,
+                 max_wait_ms=LLM_BATCH_WAIT_MS, timeout=LLM_TIMEOUT):
+        self.model_name = model_name
+        self.pool_size = max(1, pool_size)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._load_error = None
+
+    @property
+    def available(self) -> bool:
+        return _LLM_PIPELINE_AVAILABLE and self._load_error is None
+
+    def _load_pipeline(self):
+        from transformers import pipeline
+        return pipeline("text2text-generation", model=self.model_name)
+
+    def start(self, warm_up: bool = False):
+        """
+        Start the worker threads. With warm_up=True every model instance is
+        loaded here instead of on the first request it serves.
+        """
+        with self._lock:
+            if self._workers or not self.available:
+                return
+            for i in range(self.pool_size):
+                llm = None
+                if warm_up:
+                    try:
+                        llm = self._load_pipeline()
+                    except Exception as e:
+                        print(f"[WARNING] Failed to load LLM '{self.model_name}': {e}")
+                        self._load_error = e
+                        return
+                worker = threading.Thread(target=self._run, args=(llm,), name=f"llm-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            if warm_up:
+                print(f"[INFO] LLM service warmed up with {self.pool_size} instance(s) of {self.model_name}")
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Generate text for one prompt. Returns None if no model can be loaded;
+        raises concurrent.futures.TimeoutError if the answer is not ready within the timeout.
+        """
+        if not self.available:
+            return None
+        self.start()
+        future = Future()
+        self._queue.put((prompt, future, False))
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # dropped by the worker if not started yet
+            raise
+        except Exception:
+            if self._load_error is not None:
+                return None  # the model could not be loaded: same as no LLM
+            raise
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Optional[GenerationStream]:
+        """
+        Generate text for one prompt as a GenerationStream of text pieces,
+        produced while the model decodes. Returns None if no model can be
+        loaded; raises concurrent.futures.TimeoutError if no worker picks the
+        prompt up in time, and queue.Empty while iterating if a piece takes
+        longer than the timeout. Callers that stop early should cancel() it.
+        """
+        if not self.available:
+            return None
+        self.start()
+        future = Future()
+        self._queue.put((prompt, future, True))
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+        except Exception:
+            if self._load_error is not None:
+                return None
+            raise
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Skip requests whose callers already timed out
+        return [item for item in batch if item[1].set_running_or_notify_cancel()]
+
+    def _stream_one(self, llm, prompt: str, future: Future):
+        # Decodes on this worker thread; the caller iterates the stream as tokens arrive
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+        stream = GenerationStream(TextIteratorStreamer(llm.tokenizer, skip_special_tokens=True,
+                                                       timeout=self.timeout))
+
+        class _Cancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return stream.cancelled.is_set()
+
+        future.set_result(stream)
+        try:
+            inputs = llm.tokenizer(prompt, return_tensors="pt", truncation=True)
+            llm.model.generate(**inputs, streamer=stream.streamer, max_length=MAX_LENGTH, do_sample=False,
+                               stopping_criteria=StoppingCriteriaList([_Cancelled()]))
+        except Exception as e:
+            print(f"[WARNING] Streaming generation failed: {e}")
+            stream.error = e
+            stream.streamer.end()
+
+    def _run(self, llm):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                if llm is None:
+                    llm = self._load_pipeline()
+                plain = [(prompt, future) for prompt, future, stream in batch if not stream]
+                outputs = llm([prompt for prompt, _ in plain], max_length=MAX_LENGTH,
+                              do_sample=False, batch_size=len(plain)) if plain else []
+            except Exception as e:
+                if llm is None:
+                    print(f"[WARNING] Failed to load LLM '{self.model_name}': {e}")
+                    self._load_error = e
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), output in zip(plain, outputs):
+                if isinstance(output, list):
+                    output = output[0]
+                future.set_result(output.get("generated_text", ""))
+            # Streamed prompts are decoded one at a time after the batch
+            for prompt, future, stream in batch:
+                if stream:
+                    self._stream_one(llm, prompt, future)
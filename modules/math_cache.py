@@ -0,0 +1,114 @@
+# File: modules/math_cache.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from sympy import srepr
+
+from modules.db import chatmate_db
+
+# ===== CACHE CONFIG =====
+PARSE_CACHE_SIZE = int(os.environ.get("CHATMATE_MATH_PARSE_CACHE_SIZE", 4096))
+ANSWER_CACHE_SIZE = int(os.environ.get("CHATMATE_MATH_ANSWER_CACHE_SIZE", 4096))
+MATH_CACHE_PERSIST = os.environ.get("CHATMATE_MATH_CACHE_PERSIST", "0") == "1"
+
+class LRUCache:
+    """
+    Small thread-safe LRU map with hit/miss counters.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+# Level 1: raw expression string -> parsed SymPy expression
+parse_cache = LRUCache(PARSE_CACHE_SIZE)
+# Level 2: operation + canonical form (srepr) -> formatted answer
+answer_cache = LRUCache(ANSWER_CACHE_SIZE)
+
+_MISSING = object()
+
+def cached_parse(expr_str: str, parser: Callable):
+    expr = parse_cache.get(expr_str, _MISSING)
+    if expr is _MISSING:
+        expr = parser(expr_str)
+        parse_cache.put(expr_str, expr)
+    return expr
+
+def answer_key(op: str, expr) -> str:
+    """
+    Key for an operation on an expression; equal expressions share a key
+    regardless of how they were typed.
+    """
+    return hashlib.sha256(f"{op}:{srepr(expr)}".encode("utf-8")).hexdigest()
+
+def query_key(query: str) -> str:
+    """
+    Key for a whole query as typed (case and spacing ignored). Used in the
+    server process when SymPy runs in the math pool, so no parsing is needed.
+    """
+    return hashlib.sha256(f"query:{' '.join(query.lower().split())}".encode("utf-8")).hexdigest()
+
+def lookup_answer(key: str):
+    answer = answer_cache.get(key)
+    if answer is None and MATH_CACHE_PERSIST:
+        answer = _load_answer(key)
+        if answer is not None:
+            answer_cache.put(key, answer)
+    return answer
+
+def store_answer(key: str, answer: str):
+    answer_cache.put(key, answer)
+    if MATH_CACHE_PERSIST:
+        _save_answer(key, answer)
+
+def cached_answer(op: str, expr, compute: Callable[[], str]) -> str:
+    """
+    Return the formatted answer for op(expr), computing it at most once.
+    """
+    key = answer_key(op, expr)
+    answer = lookup_answer(key)
+    if answer is None:
+        answer = compute()
+        store_answer(key, answer)
+    return answer
+
+# ===== SQLite persistence (math_answer_cache, see modules/db.py) =====
+def _load_answer(key: str):
+    row = chatmate_db.query_one("SELECT answer FROM math_answer_cache WHERE answer_key=?", (key,))
+    return row[0] if row else None
+
+def _save_answer(key: str, answer: str):
+    chatmate_db.execute("INSERT OR REPLACE INTO math_answer_cache (answer_key, answer) VALUES (?, ?)", (key, answer))
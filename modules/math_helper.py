@@ -1,10 +1,14 @@
 import re
-from typing import Dict
-from sympy import symbols, solve, diff, integrate, simplify, factor, expand, N
+from typing import Dict, Optional
+from sympy import symbols, solve, diff, integrate, simplify, factor, expand, N, Poly, nroots, nsolve
 from sympy.parsing.sympy_parser import (
     parse_expr, standard_transformations,
     implicit_multiplication_application, convert_xor
 )
+from modules import unit_converter
+from modules.math_cache import cached_parse, cached_answer
+from modules import math_pool
+from modules import metrics
 
 # ===== SYMBOLS & PARSING =====
 x, y, z = symbols('x y z')
@@ -13,41 +17,11 @@ _TRANSFORMATIONS = standard_transformations + (implicit_multiplication_applicati
 
 # ===== UNIT CONVERSIONS =====
 def handle_conversion(query: str) -> Dict:
-    q_lower = query.lower()
     try:
-        # Celsius to Fahrenheit
-        match = re.search(r'([0-9.]+)\s*°?\s*c\s*(to|in)\s*f', q_lower)
-        if match:
-            c = float(match.group(1))
-            f = c * 9/5 + 32
-            return {"handled": True, "reply": f"{c}°C = {f}°F"}
-
-        # Fahrenheit to Celsius
-        match = re.search(r'([0-9.]+)\s*°?\s*f\s*(to|in)\s*c', q_lower)
-        if match:
-            f = float(match.group(1))
-            c = (f - 32) * 5/9
-            return {"handled": True, "reply": f"{f}°F = {c}°C"}
-
-        # km to m
-        match = re.search(r'([0-9.]+)\s*km\s*(to|in)\s*m', q_lower)
-        if match:
-            km = float(match.group(1))
-            m = km * 1000
-            return {"handled": True, "reply": f"{km} km = {m} m"}
-
-        # m to km
-        match = re.search(r'([0-9.]+)\s*m\s*(to|in)\s*km', q_lower)
-        if match:
-            m = float(match.group(1))
-            km = m / 1000
-            return {"handled": True, "reply": f"{m} m = {km} km"}
-
+        return unit_converter.convert_query(query)
     except Exception as e:
         return {"handled": True, "reply": f"Error in conversion: {e}"}
 
-    return {"handled": False, "reply": None}
-
 # ===== MATH QUERY DETECTION =====
 def is_math_query(query: str) -> bool:
     math_keywords = ["solve", "equation", "derivative", "differentiate",
@@ -60,10 +34,14 @@ def is_math_query(query: str) -> bool:
     return False
 
 # ===== SYMPY SAFE PARSE =====
-def safe_parse(expr_str: str):
+def _parse(expr_str: str):
     s = expr_str.replace('^', '**').replace(',', '')
     return parse_expr(s, local_dict=_ALLOWED_LOCALS, transformations=_TRANSFORMATIONS, evaluate=True)
 
+def safe_parse(expr_str: str):
+    # Memoized: the same textbook expressions arrive again and again
+    return cached_parse(expr_str, _parse)
+
 def _extract_math_piece(query: str) -> str:
     candidates = re.findall(r'[0-9a-zA-Z\+\-\*\/\^\(\)\.\s,]+', query)
     if not candidates: return query
@@ -76,7 +54,9 @@ def solve_math(query: str) -> str:
     conv_result = handle_conversion(query)
     if conv_result["handled"]:
         return conv_result["reply"]
+    return _solve_expression(query)
 
+def _solve_expression(query: str) -> str:
     math_piece = _extract_math_piece(query)
 
     try:
@@ -85,60 +65,110 @@ def solve_math(query: str) -> str:
         if re.search(r'\b(derivative|differentiate|d/dx)\b', q_lower):
             expr_text = re.sub(r'\b(derivative|differentiate|d/dx|derivative of)\b', '', q_lower, flags=re.IGNORECASE).strip() or math_piece
             expr = safe_parse(expr_text)
-            deriv = diff(expr, x)
-            return f"Derivative (d/dx): {simplify(deriv)}"
+            return cached_answer("diff", expr, lambda: f"Derivative (d/dx): {simplify(diff(expr, x))}")
 
         if re.search(r'\b(integral|integrate|antiderivative)\b', q_lower):
             expr_text = re.sub(r'\b(integral of|integrate|antiderivative of)\b', '', q_lower, flags=re.IGNORECASE).strip() or math_piece
             expr = safe_parse(expr_text)
-            integ = integrate(expr, x)
-            return f"Indefinite integral: {simplify(integ)} + C"
+            return cached_answer("integrate", expr, lambda: f"Indefinite integral: {simplify(integrate(expr, x))} + C")
 
         # ALGEBRA
         if re.search(r'\b(simplify|simplification)\b', q_lower):
             expr_text = re.sub(r'\b(simplify|simplification of)\b', '', q_lower, flags=re.IGNORECASE).strip() or math_piece
             expr = safe_parse(expr_text)
-            return f"Simplified: {simplify(expr)}"
+            return cached_answer("simplify", expr, lambda: f"Simplified: {simplify(expr)}")
 
         if re.search(r'\b(factor|factorize)\b', q_lower):
             expr_text = re.sub(r'\b(factor|factorize)\b', '', q_lower, flags=re.IGNORECASE).strip() or math_piece
             expr = safe_parse(expr_text)
-            return f"Factored: {factor(expr)}"
+            return cached_answer("factor", expr, lambda: f"Factored: {factor(expr)}")
 
         if re.search(r'\b(expand)\b', q_lower):
             expr_text = re.sub(r'\b(expand)\b', '', q_lower, flags=re.IGNORECASE).strip() or math_piece
             expr = safe_parse(expr_text)
-            return f"Expanded: {expand(expr)}"
+            return cached_answer("expand", expr, lambda: f"Expanded: {expand(expr)}")
 
         # EQUATION SOLVE OR EVALUATE
         if '=' in math_piece:
             left, right = math_piece.split('=', 1)
             eq = safe_parse(left) - safe_parse(right)
-            symbols_in_eq = list(eq.free_symbols)
-            sols = solve(eq, symbols_in_eq) if symbols_in_eq else solve(eq)
-            return f"Solved: {sols}"
+            return cached_answer("solve", eq, lambda: _solve_equation(eq))
 
         expr = safe_parse(math_piece)
-        try:
-            numeric = N(expr)
-            return f"Result: {numeric}"
-        except Exception:
-            return f"Result: {simplify(expr)}"
+        return cached_answer("evaluate", expr, lambda: _evaluate(expr))
 
     except Exception as e:
         return f"Error parsing math expression: {e}"
 
+def _solve_equation(eq) -> str:
+    symbols_in_eq = list(eq.free_symbols)
+    sols = solve(eq, symbols_in_eq) if symbols_in_eq else solve(eq)
+    return f"Solved: {sols}"
+
+def _evaluate(expr) -> str:
+    try:
+        numeric = N(expr)
+        return f"Result: {numeric}"
+    except Exception:
+        return f"Result: {simplify(expr)}"
+
+_SYMBOLIC_OPERATIONS = re.compile(
+    r'\b(derivative|differentiate|d/dx|integral|integrate|antiderivative|simplify|simplification'
+    r'|factor|factorize|expand)\b'
+)
+_OPERATION_WORDS = re.compile(r'\b(solve|of|the|find|calculate)\b')
+
+def _numeric_roots(eq) -> Optional[str]:
+    var = next(iter(eq.free_symbols))
+    try:
+        roots = nroots(Poly(eq, var), n=10)
+    except Exception:
+        # not a polynomial: Newton's method from a few starting points
+        roots = []
+        for start in (0, 1, -1, 10, -10):
+            try:
+                root = nsolve(eq, var, start)
+            except Exception:
+                continue
+            if all(abs(root - r) > 1e-8 for r in roots):
+                roots.append(root)
+    return f"Numeric solutions for {var}: {[N(r, 10) for r in roots]}" if roots else None
+
+def numeric_answer(query: str) -> Optional[str]:
+    """
+    Cheap fallback when the symbolic operation ran out of budget: numeric
+    roots of a one-variable equation, or the value of a constant expression.
+    None when there is no numeric counterpart (indefinite integrals,
+    derivatives, simplification, symbolic expressions).
+    """
+    if _SYMBOLIC_OPERATIONS.search(query.lower()):
+        return None
+    expr_text = _OPERATION_WORDS.sub('', query.lower())
+    if '=' in expr_text:
+        left, right = expr_text.split('=', 1)
+        eq = safe_parse(_extract_math_piece(left)) - safe_parse(_extract_math_piece(right))
+        return _numeric_roots(eq) if len(eq.free_symbols) == 1 else None
+    expr = safe_parse(_extract_math_piece(expr_text))
+    if expr.free_symbols:
+        return None
+    return f"Numeric approximation: {N(expr, 10)}"
+
 # ===== MAIN HANDLER =====
 def handle_math_query(user_message: str) -> Dict:
     if not user_message.strip():
         return {"handled": True, "reply": "Please enter a math question."}
 
     # Conversion check first
-    conv_result = handle_conversion(user_message)
+    with metrics.timed("math.conversion"):
+        conv_result = handle_conversion(user_message)
     if conv_result["handled"]:
         return conv_result
 
     if is_math_query(user_message):
-        return {"handled": True, "reply": solve_math(user_message)}
+        # Conversion already ruled out above
+        with metrics.timed("math.solve"):
+            if math_pool.MATH_POOL_ENABLED:
+                return {"handled": True, "reply": math_pool.solve(user_message)}
+            return {"handled": True, "reply": _solve_expression(user_message)}
 
     return {"handled": False, "reply": "I cannot solve this math problem."}
@@ -0,0 +1,190 @@
+# File: modules/math_pool.py
+
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Optional, Tuple
+
+try:
+    import resource
+    _HAS_RLIMIT = True
+except ImportError:  # Windows
+    _HAS_RLIMIT = False
+
+# ===== POOL CONFIG =====
+MATH_POOL_ENABLED = os.environ.get("CHATMATE_MATH_POOL", "0") == "1"
+MATH_POOL_SIZE = int(os.environ.get("CHATMATE_MATH_POOL_SIZE", max(1, (os.cpu_count() or 2) // 2)))
+MATH_WALL_TIMEOUT = float(os.environ.get("CHATMATE_MATH_WALL_TIMEOUT", 5))      # seconds per query
+MATH_CPU_SECONDS = int(os.environ.get("CHATMATE_MATH_CPU_SECONDS", 5))          # CPU seconds per query
+MATH_MEMORY_MB = int(os.environ.get("CHATMATE_MATH_MEMORY_MB", 512))            # extra address space per worker
+MATH_FALLBACK_TIMEOUT = float(os.environ.get("CHATMATE_MATH_FALLBACK_TIMEOUT", 2))
+
+TIMEOUT_REPLY = "This problem is too complex to solve within the time limit."
+
+# Workers come from a forkserver that imported SymPy once, never from a
+# (multithreaded) server process, so they cannot inherit locks held mid-request
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _ctx = multiprocessing.get_context("forkserver")
+    _ctx.set_forkserver_preload(["modules.math_helper"])
+else:
+    _ctx = multiprocessing.get_context("spawn")
+
+# ===== WORKER PROCESS =====
+def _limit_memory(memory_mb: int):
+    if not _HAS_RLIMIT or memory_mb <= 0:
+        return
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current = 0
+    limit = current + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _limit_cpu(cpu_seconds: int):
+    """
+    Allow cpu_seconds more CPU time from now; the kernel kills the worker
+    with SIGXCPU beyond that.
+    """
+    if not _HAS_RLIMIT or cpu_seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def _worker_main(conn, memory_mb: int, cpu_seconds: int):
+    from modules import math_helper
+    tasks = {"solve": math_helper._solve_expression, "numeric": math_helper.numeric_answer}
+    _limit_memory(memory_mb)
+    while True:
+        try:
+            task, query = conn.recv()
+        except EOFError:
+            return
+        _limit_cpu(cpu_seconds)
+        try:
+            result = (True, tasks[task](query))
+        except MemoryError:
+            result = (False, None)  # over budget, like a timeout: try the numeric fallback
+        except Exception as e:
+            result = (False, str(e))
+        conn.send(result)
+
+class _Worker:
+    def __init__(self, memory_mb: int, cpu_seconds: int):
+        self.conn, child_conn = _ctx.Pipe()
+        self.process = _ctx.Process(target=_worker_main, args=(child_conn, memory_mb, cpu_seconds), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+# ===== POOL =====
+class MathWorkerPool:
+    """
+    Fixed set of SymPy worker processes. A query that exceeds its wall-clock
+    or CPU budget gets its worker killed and replaced.
+    """
+
+    def __init__(self, size=MATH_POOL_SIZE, wall_timeout=MATH_WALL_TIMEOUT,
+                 cpu_seconds=MATH_CPU_SECONDS, memory_mb=MATH_MEMORY_MB):
+        self.size = size
+        self.wall_timeout = wall_timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.timeouts = 0
+        self._timeouts_lock = threading.Lock()
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(self._new_worker())
+
+    def _new_worker(self) -> _Worker:
+        return _Worker(self.memory_mb, self.cpu_seconds)
+
+    def run(self, task: str, query: str, timeout: Optional[float] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Run a task on an idle worker. Returns (ok, result); ok is False with
+        result None when the budget ran out or the worker died.
+        """
+        timeout = timeout or self.wall_timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+        try:
+            worker.conn.send((task, query))
+            if worker.conn.poll(timeout):
+                ok, result = worker.conn.recv()
+                self._idle.put(worker)
+                if not ok and result is None:
+                    self._count_timeout()
+                return ok, result
+        except (EOFError, OSError):
+            pass  # killed by the CPU or memory limit
+        self._count_timeout()
+        worker.kill()
+        self._idle.put(self._new_worker())
+        return False, None
+
+    def _count_timeout(self):
+        with self._timeouts_lock:
+            self.timeouts += 1
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def start_pool() -> MathWorkerPool:
+    """
+    Start the workers now; init_services calls this so the first math
+    request does not pay for it.
+    """
+    return get_pool()
+
+def get_pool() -> MathWorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MathWorkerPool()
+    return _pool
+
+def solve(query: str) -> str:
+    """
+    Solve a math query within the budget, falling back to a numeric answer.
+    Answers are cached here, in the server process: the workers' own
+    caches are split between them and lost when one is killed.
+    """
+    from modules import math_cache  # imports SymPy; server.py imports this module at startup
+    key = math_cache.query_key(query)
+    answer = math_cache.lookup_answer(key)
+    if answer is not None:
+        return answer
+    pool = get_pool()
+    ok, result = pool.run("solve", query)
+    if ok:
+        math_cache.store_answer(key, result)
+        return result
+    if result is not None:
+        return f"Error parsing math expression: {result}"
+    ok, result = pool.run("numeric", query, timeout=MATH_FALLBACK_TIMEOUT)
+    return result if ok and result else TIMEOUT_REPLY
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
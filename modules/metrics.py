@@ -0,0 +1,190 @@
+# File: modules/metrics.py
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# ===== METRICS CONFIG =====
+# Both switches can be flipped at runtime with set_enabled / set_server_timing
+METRICS_ENABLED = os.environ.get("CHATMATE_METRICS", "1") == "1"
+SERVER_TIMING = os.environ.get("CHATMATE_SERVER_TIMING", "0") == "1"
+# Recent samples kept per (stage, label) for the p50/p95/p99 estimates
+SAMPLE_WINDOW = int(os.environ.get("CHATMATE_METRICS_WINDOW", 2048))
+QUANTILES = (0.5, 0.95, 0.99)
+
+class _Series:
+    """
+    Count, sum and error count since startup plus a sliding window of
+    recent durations for the quantiles.
+    """
+
+    __slots__ = ("count", "total", "errors", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+_series: Dict[tuple, _Series] = {}
+_lock = threading.Lock()
+_cache_sources: Dict[str, Callable[[], Dict]] = {}
+_startup_phases: Dict[str, float] = {}
+
+# Stage timings of the current request, for the Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[List]] = contextvars.ContextVar("request_timings", default=None)
+
+def set_enabled(enabled: bool):
+    global METRICS_ENABLED
+    METRICS_ENABLED = bool(enabled)
+
+def set_server_timing(enabled: bool):
+    global SERVER_TIMING
+    SERVER_TIMING = bool(enabled)
+
+# ===== Recording =====
+def record(stage: str, label: str, seconds: float, error: bool = False):
+    if not METRICS_ENABLED:
+        return
+    key = (stage, label or "")
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = _Series()
+        series.count += 1
+        series.total += seconds
+        series.samples.append(seconds)
+        if error:
+            series.errors += 1
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+class timed:
+    """
+    Context manager timing one stage. The label may be set inside the block
+    once it is known (e.g. the label predicted by the router).
+
+        with metrics.timed("nlp") as stage:
+            label, confidence = ...
+            stage.label = label
+    """
+
+    __slots__ = ("stage", "label", "_start")
+
+    def __init__(self, stage: str, label: str = ""):
+        self.stage = stage
+        self.label = label
+        self._start = 0.0
+
+    def __enter__(self):
+        if METRICS_ENABLED:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if METRICS_ENABLED and self._start:
+            record(self.stage, self.label, time.perf_counter() - self._start, error=exc_type is not None)
+        return False
+
+def register_cache(name: str, stats: Callable[[], Dict]):
+    """
+    Export a cache's stats() (hits, misses, hit_ratio) on /metrics.
+    """
+    _cache_sources[name] = stats
+
+# ===== Startup timing =====
+def record_startup(phase: str, seconds: float):
+    _startup_phases[phase] = seconds
+
+@contextmanager
+def startup_phase(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup(phase, time.perf_counter() - start)
+
+def startup_report() -> str:
+    total = sum(_startup_phases.values())
+    parts = [f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in _startup_phases.items()]
+    return ", ".join(parts + [f"total {total * 1000:.0f} ms"])
+
+# ===== Per-request Server-Timing =====
+def begin_request():
+    _request_timings.set([])
+
+def server_timing_header() -> Optional[str]:
+    timings = _request_timings.get()
+    if not SERVER_TIMING or not timings:
+        return None
+    return ", ".join(f"{stage.replace('.', '-')};dur={seconds * 1000:.1f}" for stage, seconds in timings)
+
+# ===== Export =====
+def _quantile(sorted_samples, q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+def snapshot() -> Dict:
+    """
+    Per (stage, label): count, errors, sum and quantiles in seconds.
+    """
+    with _lock:
+        items = [(key, s.count, s.total, s.errors, list(s.samples)) for key, s in _series.items()]
+    result = {}
+    for (stage, label), count, total, errors, samples in sorted(items):
+        samples.sort()
+        result[(stage, label)] = {
+            "count": count, "sum": total, "errors": errors,
+            "quantiles": {q: _quantile(samples, q) for q in QUANTILES},
+        }
+    return result
+
+def render_prometheus() -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    lines = [
+        "# HELP chatmate_stage_seconds Time spent in each /ask pipeline stage.",
+        "# TYPE chatmate_stage_seconds summary",
+    ]
+    snap = snapshot()
+    for (stage, label), s in snap.items():
+        tags = f'stage="{stage}",label="{label}"'
+        for q, value in s["quantiles"].items():
+            lines.append(f'chatmate_stage_seconds{{{tags},quantile="{q}"}} {value:.6f}')
+        lines.append(f"chatmate_stage_seconds_sum{{{tags}}} {s['sum']:.6f}")
+        lines.append(f"chatmate_stage_seconds_count{{{tags}}} {s['count']}")
+    lines += [
+        "# HELP chatmate_stage_errors_total Stage calls that raised.",
+        "# TYPE chatmate_stage_errors_total counter",
+    ]
+    for (stage, label), s in snap.items():
+        lines.append(f'chatmate_stage_errors_total{{stage="{stage}",label="{label}"}} {s["errors"]}')
+
+    cache_stats = {}
+    for name, stats in list(_cache_sources.items()):
+        try:
+            cache_stats[name] = stats()
+        except Exception:
+            continue
+    for metric, kind, field in (("chatmate_cache_hits_total", "counter", "hits"),
+                                ("chatmate_cache_misses_total", "counter", "misses"),
+                                ("chatmate_cache_hit_ratio", "gauge", "hit_ratio")):
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, stats in cache_stats.items():
+            value = stats.get(field, 0)
+            if field == "hits":
+                value += stats.get("near_hits", 0)
+            lines.append(f'{metric}{{cache="{name}"}} {value}')
+    lines.append("# TYPE chatmate_startup_seconds gauge")
+    for phase, seconds in list(_startup_phases.items()):
+        lines.append(f'chatmate_startup_seconds{{phase="{phase}"}} {seconds:.6f}')
+    lines.append("# TYPE chatmate_metrics_enabled gauge")
+    lines.append(f"chatmate_metrics_enabled {int(METRICS_ENABLED)}")
+    return "\n".join(lines) + "\n"
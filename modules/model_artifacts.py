@@ -0,0 +1,216 @@
+# File: modules/model_artifacts.py
+
+import json
+import os
+import re
+import shutil
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+# ===== ARTIFACT CONFIG =====
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MODEL_DIR = os.environ.get("CHATMATE_MODEL_DIR", os.path.join(_ROOT, "chatmate_model"))
+PICKLE_PATHS = {
+    "model": os.path.join(_ROOT, "chatmate_nlp_model.pkl"),
+    "vectorizer": os.path.join(_ROOT, "chatmate_vectorizer.pkl"),
+    "label_encoder": os.path.join(_ROOT, "chatmate_label_encoder.pkl"),
+}
+FORMAT_VERSION = 1
+
+# ===== Inference-only estimators =====
+class ArrayTfidfVectorizer:
+    """
+    TF-IDF transform rebuilt from a fitted sklearn TfidfVectorizer's arrays
+    (word analyzer only). transform() gives the same matrix as sklearn;
+    idf_ can be a read-only memory map.
+    """
+
+    def __init__(self, vocabulary: Sequence[str], idf, lowercase: bool = True,
+                 token_pattern: str = r"(?u)\b\w\w+\b", ngram_range=(1, 1), norm: Optional[str] = "l2",
+                 sublinear_tf: bool = False, stop_words: Optional[Sequence[str]] = None):
+        self.vocabulary_ = {str(term): i for i, term in enumerate(vocabulary)}
+        self.idf_ = idf
+        self.lowercase = lowercase
+        self.ngram_range = tuple(ngram_range)
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.stop_words = frozenset(stop_words or ())
+        self._token_re = re.compile(token_pattern)
+
+    def build_tokenizer(self):
+        return self._token_re.findall
+
+    def _analyze(self, text: str) -> List[str]:
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        if self.stop_words:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, texts) -> sparse.csr_matrix:
+        indptr, indices, counts = [0], [], []
+        for text in texts:
+            row = {}
+            for gram in self._analyze(text):
+                j = self.vocabulary_.get(gram)
+                if j is not None:
+                    row[j] = row.get(j, 0) + 1
+            indices.extend(row)
+            counts.extend(row.values())
+            indptr.append(len(indices))
+        X = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, len(self.vocabulary_)),
+        )
+        X.sort_indices()
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.idf_ is not None:
+            X.data *= np.asarray(self.idf_)[X.indices]
+        if self.norm in ("l1", "l2"):
+            row_lengths = np.diff(X.indptr)
+            rows = np.repeat(np.arange(X.shape[0]), row_lengths)
+            values = np.abs(X.data) if self.norm == "l1" else X.data ** 2
+            norms = np.bincount(rows, weights=values, minlength=X.shape[0])
+            if self.norm == "l2":
+                norms = np.sqrt(norms)
+            norms[norms == 0] = 1.0
+            X.data /= norms[rows]
+        return X
+
+class ArrayLinearClassifier:
+    """
+    predict_proba of a fitted sklearn LogisticRegression from coef_/intercept_.
+    """
+
+    def __init__(self, coef, intercept, multi_class: str = "multinomial"):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.multi_class = multi_class
+
+    def decision_function(self, X):
+        return np.asarray(X @ np.asarray(self.coef_).T) + np.asarray(self.intercept_)
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        if self.multi_class == "ovr":
+            probs = 1.0 / (1.0 + np.exp(-scores))
+            return probs / probs.sum(axis=1, keepdims=True)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        np.exp(scores, scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+class ArrayLabelEncoder:
+    def __init__(self, classes):
+        self.classes_ = classes
+
+    def inverse_transform(self, indices):
+        return np.asarray(self.classes_)[np.asarray(indices)]
+
+# ===== Export / Load =====
+def export_artifacts(model, vectorizer, label_encoder, out_dir: str = MODEL_DIR) -> str:
+    """
+    Write a fitted TfidfVectorizer + LogisticRegression + LabelEncoder as
+    .npy arrays plus meta.json. The new directory replaces out_dir in one rename.
+    """
+    if vectorizer.analyzer != "word" or callable(vectorizer.tokenizer) or callable(vectorizer.preprocessor):
+        raise ValueError("Only word-analyzer TfidfVectorizers without custom callables can be exported")
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    stop_words = vectorizer.get_stop_words()
+    multi_class = getattr(model, "multi_class", "auto")
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "norm": vectorizer.norm,
+        "sublinear_tf": bool(vectorizer.sublinear_tf),
+        "stop_words": sorted(stop_words) if stop_words else None,
+        "multi_class": "ovr" if multi_class == "ovr" else "multinomial",
+    }
+    arrays = {
+        # fixed-width unicode, so it loads without pickle and can be mapped
+        "vocabulary": np.array(terms, dtype=str),
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else None,
+        "coef": np.ascontiguousarray(model.coef_, dtype=np.float64),
+        "intercept": np.asarray(model.intercept_, dtype=np.float64),
+        "classes": np.asarray(label_encoder.classes_, dtype=str),
+    }
+
+    tmp_dir = out_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        if array is not None:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), array, allow_pickle=False)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    old_dir = out_dir.rstrip(os.sep) + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+def artifacts_current(model_dir: str = MODEL_DIR) -> bool:
+    """
+    True if exported artifacts exist and are not older than the pickles.
+    """
+    meta_path = os.path.join(model_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    exported = os.path.getmtime(meta_path)
+    return all(not os.path.exists(p) or os.path.getmtime(p) <= exported for p in PICKLE_PATHS.values())
+
+def load_artifacts(model_dir: str = MODEL_DIR, mmap: bool = True):
+    """
+    Load (model, vectorizer, label_encoder) without sklearn. With mmap=True
+    the arrays are read-only memory maps that forked workers share.
+    """
+    with open(os.path.join(model_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact version: {meta.get('format_version')}")
+    mode = "r" if mmap else None
+
+    def array(name):
+        path = os.path.join(model_dir, f"{name}.npy")
+        return np.load(path, mmap_mode=mode, allow_pickle=False) if os.path.exists(path) else None
+
+    vectorizer = ArrayTfidfVectorizer(
+        array("vocabulary"), array("idf"), lowercase=meta["lowercase"], token_pattern=meta["token_pattern"],
+        ngram_range=meta["ngram_range"], norm=meta["norm"], sublinear_tf=meta["sublinear_tf"],
+        stop_words=meta["stop_words"],
+    )
+    model = ArrayLinearClassifier(array("coef"), array("intercept"), meta["multi_class"])
+    label_encoder = ArrayLabelEncoder(np.asarray(array("classes")))
+    return model, vectorizer, label_encoder
+
+def load_pickles() -> Dict:
+    import joblib  # pulls in sklearn when unpickling
+    return {name: joblib.load(path) for name, path in PICKLE_PATHS.items()}
+
+# Convert the pickled router: python -m modules.model_artifacts
+if __name__ == "__main__":
+    pickles = load_pickles()
+    path = export_artifacts(pickles["model"], pickles["vectorizer"], pickles["label_encoder"])
+    model, vectorizer, _ = load_artifacts(path)
+    sample = list(pickles["vectorizer"].vocabulary_)[:200] + ["What is photosynthesis?", "integrate x^2", ""]
+    expected = pickles["model"].predict_proba(pickles["vectorizer"].transform(sample))
+    actual = model.predict_proba(vectorizer.transform(sample))
+    print(f"[INFO] Exported router to {path} (max probability difference {np.abs(expected - actual).max():.2e})")
@@ -1,7 +1,17 @@
 # File: modules/nlp_manager.py
 
-import joblib
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from modules import model_artifacts
+
+# "tfidf": offline-trained TF-IDF + LogisticRegression (default)
+# "online": HashingVectorizer + SGD, retrained from feedback (modules/online_router.py)
+# "distilbert": the fine-tuned checkpoint from nlp/, int8-quantized (modules/bert_router.py)
+ROUTER_BACKEND = os.environ.get("CHATMATE_ROUTER", "tfidf")
 
 class NLPManager:
     """
@@ -9,36 +19,82 @@ class NLPManager:
     Handles multi-label classification: math, gk, pdf.
     """
 
-    def __init__(self):
-        model_path = os.path.join(os.path.dirname(__file__), "../chatmate_nlp_model.pkl")
-        vectorizer_path = os.path.join(os.path.dirname(__file__), "../chatmate_vectorizer.pkl")
-        label_encoder_path = os.path.join(os.path.dirname(__file__), "../chatmate_label_encoder.pkl")
-        
+    def __init__(self, backend: str = None):
+        self.backend = backend or ROUTER_BACKEND
+        self.router_version = 0
+        self._router = (None, None, None)
         try:
-            self.model = joblib.load(model_path)
-            self.vectorizer = joblib.load(vectorizer_path)
-            self.label_encoder = joblib.load(label_encoder_path)
-            print("[INFO] NLPManager loaded trained model successfully!")
+            if self.backend == "online":
+                # HashingVectorizer + SGD checkpoints, updated with partial_fit and hot-swapped
+                from modules import online_router
+                router = online_router.load_latest()
+                if router is None:
+                    raise FileNotFoundError("no checkpoint in " + online_router.CHECKPOINT_DIR
+                                            + " (run `python -m modules.online_router fit`)")
+                self.swap_router(router.model, router.vectorizer, router.label_encoder, version=router.version)
+                print(f"[INFO] NLPManager loaded online router v{router.version} successfully!")
+            elif self.backend == "distilbert":
+                # Same predict_batch path: cached tokenizer, length-bucketed quantized forward passes
+                from modules import bert_router
+                self.swap_router(*bert_router.load_router())
+                print(f"[INFO] NLPManager loaded DistilBERT router from {bert_router.MODEL_DIR} successfully!")
+            elif model_artifacts.artifacts_current():
+                # Memory-mapped .npy arrays: no sklearn import, pages shared across workers
+                self.swap_router(*model_artifacts.load_artifacts())
+                print("[INFO] NLPManager loaded memory-mapped model artifacts successfully!")
+            else:
+                pickles = model_artifacts.load_pickles()
+                self.swap_router(pickles["model"], pickles["vectorizer"], pickles["label_encoder"])
+                print("[INFO] NLPManager loaded trained model successfully! "
+                      "(run `python -m modules.model_artifacts` for a faster, memory-mapped copy)")
         except Exception as e:
             print(f"[WARNING] Failed to load NLP model: {e}")
-            self.model = None
-            self.vectorizer = None
-            self.label_encoder = None
+
+    # model, vectorizer and label_encoder always change together, see swap_router
+    @property
+    def model(self):
+        return self._router[0]
+
+    @property
+    def vectorizer(self):
+        return self._router[1]
+
+    @property
+    def label_encoder(self):
+        return self._router[2]
+
+    def swap_router(self, model, vectorizer, label_encoder, version: int = 0):
+        """
+        Replace the classifier in one assignment; predictions already
+        running finish on the old one.
+        """
+        self._router = (model, vectorizer, label_encoder)
+        self.router_version = version
 
     def predict(self, text):
         """
         Predict label and confidence for a given user message.
         Returns (label_name, confidence)
         """
-        if self.model is None or self.vectorizer is None or self.label_encoder is None:
-            return None, 0.0
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts):
+        """
+        Predict labels for several messages with one vectorizer/model call.
+        Returns a list of (label_name, confidence) in input order.
+        """
+        model, vectorizer, label_encoder = self._router
+        if model is None or vectorizer is None or label_encoder is None:
+            return [(None, 0.0) for _ in texts]
+        if not texts:
+            return []
 
-        X_vec = self.vectorizer.transform([text])
-        probs = self.model.predict_proba(X_vec)[0]
-        idx = probs.argmax()
-        label_name = self.label_encoder.inverse_transform([idx])[0]
-        confidence = float(probs[idx])
-        return label_name, confidence
+        X_vec = vectorizer.transform(list(texts))
+        probs = model.predict_proba(X_vec)
+        idx = probs.argmax(axis=1)
+        label_names = label_encoder.inverse_transform(idx)
+        confidences = probs[range(len(idx)), idx]
+        return [(label, float(conf)) for label, conf in zip(label_names, confidences)]
 
     def get_response(self, predicted_label):
         """
@@ -59,6 +115,61 @@ class NLPManager:
         """
         return None
 
+# ===== MICRO-BATCHING QUEUE =====
+class BatchingPredictor:
+    """
+    Collects concurrent predict() calls for a few milliseconds (or until
+    max_batch items are waiting) and classifies them in one predict_batch call.
+    """
+
+    def __init__(self, manager, max_batch=32, max_wait_ms=5):
+        self.manager = manager
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="nlp-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text) -> Future:
+        """
+        Queue one message; the future resolves to (label_name, confidence).
+        """
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def predict(self, text, timeout=None):
+        """
+        Queue one message and block until its (label_name, confidence) is ready.
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                results = self.manager.predict_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
 # Test standalone
 if __name__ == "__main__":
     nlp = NLPManager()
@@ -0,0 +1,219 @@
+# File: modules/ocr.py
+
+import importlib.util
+import io
+import multiprocessing
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from modules import pdf_cache, metrics
+
+# Optional OCR stack: pytesseract + Pillow and the tesseract binary.
+# pdf2image (poppler) is only used for PDF pages without an embedded image.
+_OCR_LIBS_AVAILABLE = all(importlib.util.find_spec(m) is not None for m in ("pytesseract", "PIL"))
+_RASTERIZER_AVAILABLE = importlib.util.find_spec("pdf2image") is not None
+
+# ===== OCR CONFIG =====
+OCR_ENABLED = os.environ.get("CHATMATE_OCR", "1") == "1"
+TESSERACT_CMD = os.environ.get("CHATMATE_TESSERACT_CMD", "tesseract")
+OCR_LANG = os.environ.get("CHATMATE_OCR_LANG", "eng")
+OCR_WORKERS = int(os.environ.get("CHATMATE_OCR_WORKERS", os.cpu_count() or 2))
+OCR_MIN_CHARS = 20             # pages with less extractable text than this are treated as scans
+OCR_MAX_SIDE = 2500            # longer image sides are downscaled before OCR
+OCR_MIN_SIDE = 1000            # shorter ones (phone thumbnails) are upscaled
+OCR_DPI = 200                  # rasterization resolution for pdf2image
+MAX_SKEW_DEGREES = 5.0
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
+
+# Workers come from a forkserver (spawn where there is none), never forked from
+# the multithreaded server process with its SQLite, writer or torch locks held
+_ctx = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+_pool = None
+
+def is_available() -> bool:
+    return OCR_ENABLED and _OCR_LIBS_AVAILABLE and shutil.which(TESSERACT_CMD) is not None
+
+def is_image(file_path: str) -> bool:
+    return file_path.rsplit(".", 1)[-1].lower() in IMAGE_EXTENSIONS
+
+def needs_ocr(page_text: str) -> bool:
+    return len((page_text or "").strip()) < OCR_MIN_CHARS
+
+# ===== Preprocessing =====
+def otsu_threshold(pixels: np.ndarray) -> int:
+    """
+    Grey level that best separates ink from paper (Otsu's method).
+    """
+    hist = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    weight = np.cumsum(hist) / pixels.size
+    mean = np.cumsum(hist * np.arange(256)) / pixels.size
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean[-1] * weight - mean) ** 2 / (weight * (1.0 - weight))
+    return int(np.nanargmax(between))
+
+def estimate_skew(ink: np.ndarray, max_degrees: float = MAX_SKEW_DEGREES) -> float:
+    """
+    Angle (degrees, counter-clockwise) that makes text lines horizontal:
+    the shear whose row histogram of ink pixels is sharpest.
+    """
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > 50000:
+        keep = np.random.default_rng(0).choice(len(ys), 50000, replace=False)
+        ys, xs = ys[keep], xs[keep]
+
+    def sharpness(angle):
+        rows = np.round(ys - xs * np.tan(np.radians(angle))).astype(np.int64)
+        hist = np.bincount(rows - rows.min())
+        return float(np.sum(np.diff(hist.astype(np.float64)) ** 2))
+
+    coarse = np.arange(-max_degrees, max_degrees + 1e-9, 0.5)
+    best = max(coarse, key=sharpness)
+    fine = np.arange(best - 0.5, best + 0.5 + 1e-9, 0.1)
+    return float(max(fine, key=sharpness))
+
+def preprocess(image):
+    """
+    Greyscale, rescale, deskew and binarize a page image for tesseract.
+    """
+    from PIL import Image, ImageOps
+    image = ImageOps.exif_transpose(image).convert("L")
+    longest = max(image.size)
+    if longest > OCR_MAX_SIDE or longest < OCR_MIN_SIDE:
+        scale = (OCR_MAX_SIDE if longest > OCR_MAX_SIDE else OCR_MIN_SIDE) / longest
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+    pixels = np.asarray(image)
+    threshold = otsu_threshold(pixels)
+    # skew is measured on a quarter-size copy; ink is darker than the threshold
+    angle = estimate_skew(pixels[::4, ::4] <= threshold)
+    if abs(angle) >= 0.2:
+        image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        pixels = np.asarray(image)
+    return Image.fromarray(np.where(pixels > threshold, 255, 0).astype(np.uint8))
+
+# ===== Worker tasks (run in the OCR process pool) =====
+def _init_worker():
+    # one tesseract thread per process; the pool provides the parallelism
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+def _recognize(image) -> str:
+    import pytesseract
+    return pytesseract.image_to_string(preprocess(image), lang=OCR_LANG)
+
+def _pdf_page_image(file_path: str, page_index: int):
+    from PIL import Image
+    import PyPDF2
+    with open(file_path, "rb") as f:
+        page = PyPDF2.PdfReader(f).pages[page_index]
+        # Scanned pages are usually one embedded full-page image
+        best = None
+        for embedded in page.images:
+            try:
+                image = Image.open(io.BytesIO(embedded.data))
+                image.load()
+            except Exception:
+                continue
+            if best is None or image.width * image.height > best.width * best.height:
+                best = image
+    if best is None and _RASTERIZER_AVAILABLE:
+        from pdf2image import convert_from_path
+        rendered = convert_from_path(file_path, dpi=OCR_DPI, first_page=page_index + 1,
+                                     last_page=page_index + 1, grayscale=True)
+        best = rendered[0] if rendered else None
+    return best
+
+def _ocr_pdf_page(file_path: str, page_index: int) -> Tuple[str, float]:
+    start = time.perf_counter()
+    image = _pdf_page_image(file_path, page_index)
+    text = _recognize(image) if image is not None else ""
+    return text, time.perf_counter() - start
+
+def _ocr_image_file(file_path: str) -> Tuple[str, float]:
+    from PIL import Image
+    start = time.perf_counter()
+    with Image.open(file_path) as image:
+        text = _recognize(image)
+    return text, time.perf_counter() - start
+
+# ===== Pool =====
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(1, OCR_WORKERS), initializer=_init_worker, mp_context=_ctx)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _result(future, kind: str) -> str:
+    text, seconds = future.result()
+    metrics.record("ocr.page", kind, seconds)
+    return text
+
+# ===== Public API =====
+def ocr_image(file_path: str, sha256: Optional[str] = None) -> str:
+    """
+    Text of a PNG/JPEG upload, OCR'd once and then served from the cache.
+    """
+    if not is_available():
+        return ""
+    sha256 = sha256 or pdf_cache.file_sha256(file_path)
+    cached = pdf_cache.get_ocr_pages(sha256, [0])
+    if 0 in cached:
+        return cached[0]
+    text = _result(_get_pool().submit(_ocr_image_file, file_path), "image")
+    pdf_cache.put_ocr_page(sha256, 0, text)
+    return text
+
+def fill_blank_pages(file_path: str, pages: Iterator[str], start: int = 0) -> Iterator[str]:
+    """
+    Pass page texts through in order, replacing image-only pages (page
+    index start, start+1, ...) with their OCR text. Pages are OCR'd on the
+    process pool a bounded window ahead and stored in the OCR cache.
+    """
+    if not is_available():
+        yield from pages
+        return
+    sha256 = None
+    window = max(1, OCR_WORKERS) * 2
+    pending = deque()  # page text, or the future of its OCR
+    try:
+        for index, text in enumerate(pages, start=start):
+            if needs_ocr(text):
+                sha256 = sha256 or pdf_cache.file_sha256(file_path)
+                cached = pdf_cache.get_ocr_pages(sha256, [index]).get(index)
+                if cached is not None:
+                    text = cached
+                else:
+                    text = (index, _get_pool().submit(_ocr_pdf_page, file_path, index))
+            pending.append(text)
+            while len(pending) > window or (pending and isinstance(pending[0], str)):
+                yield _resolve(pending.popleft(), sha256)
+        while pending:
+            yield _resolve(pending.popleft(), sha256)
+    finally:
+        # pages not yet started are dropped when the reader stops early
+        for item in pending:
+            if not isinstance(item, str):
+                item[1].cancel()
+
+def _resolve(item, sha256: Optional[str]) -> str:
+    if isinstance(item, str):
+        return item
+    index, future = item
+    text = _result(future, "pdf")
+    pdf_cache.put_ocr_page(sha256, index, text)
+    return text
@@ -0,0 +1,300 @@
+# File: modules/online_router.py
+
+import contextlib
+import copy
+import csv
+import glob
+import importlib.util
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from modules.db import chatmate_db
+from modules.model_artifacts import ArrayLabelEncoder
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ===== ONLINE ROUTER CONFIG =====
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CHECKPOINT_DIR = os.environ.get("CHATMATE_ROUTER_CHECKPOINT_DIR", os.path.join(_ROOT, "chatmate_router"))
+# Hashed feature space; memory stays fixed however much text the router sees
+N_FEATURES = int(os.environ.get("CHATMATE_ROUTER_FEATURES", 2 ** 18))
+# Workers poll the checkpoint directory this often and hot-swap newer versions
+RELOAD_SECONDS = float(os.environ.get("CHATMATE_ROUTER_RELOAD_SECONDS", 30))
+KEEP_CHECKPOINTS = int(os.environ.get("CHATMATE_ROUTER_KEEP_CHECKPOINTS", 5))
+# Earlier training examples mixed into every feedback update so old routes are not forgotten
+REPLAY_SIZE = int(os.environ.get("CHATMATE_ROUTER_REPLAY_SIZE", 2000))
+CLASSES = ("gk", "math", "pdf")
+# Templates that generate the default training corpus (train_data_large.py)
+TEMPLATES_PATH = os.path.join(_ROOT, "data", "raw", "train_data_large.py")
+# Fewer labeled rows than this gives a router worse than the TF-IDF one
+MIN_FIT_ROWS = int(os.environ.get("CHATMATE_ROUTER_MIN_FIT_ROWS", 300))
+
+def make_vectorizer() -> HashingVectorizer:
+    # Same tokens and n-grams as the TF-IDF router; stateless, so it is never refit
+    return HashingVectorizer(n_features=N_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm="l2")
+
+class OnlineRouter:
+    """
+    HashingVectorizer + SGD logistic regression. Exposes the same
+    model / vectorizer / label_encoder triple as the TF-IDF router.
+    Updates return a new router, so the running one is never mutated.
+    """
+
+    def __init__(self, model: Optional[SGDClassifier] = None, classes: Sequence[str] = CLASSES,
+                 version: int = 0, replay: Optional[List[Tuple[str, str]]] = None, trained_samples: int = 0):
+        self.model = model or SGDClassifier(loss="log_loss", alpha=1e-5, random_state=0)
+        self.vectorizer = make_vectorizer()
+        self.label_encoder = ArrayLabelEncoder(np.asarray(classes))
+        self.version = version
+        self.replay = replay or []
+        self.trained_samples = trained_samples
+
+    def _encode(self, labels: Sequence[str]) -> np.ndarray:
+        index = {label: i for i, label in enumerate(self.label_encoder.classes_)}
+        unknown = set(labels) - set(index)
+        if unknown:
+            raise ValueError(f"Unknown router labels: {sorted(unknown)}")
+        return np.array([index[label] for label in labels])
+
+    def _remember(self, rows: List[Tuple[str, str]], rng: random.Random):
+        # Reservoir sample over everything trained on so far
+        for row in rows:
+            self.trained_samples += 1
+            if len(self.replay) < REPLAY_SIZE:
+                self.replay.append(row)
+            else:
+                j = rng.randrange(self.trained_samples)
+                if j < REPLAY_SIZE:
+                    self.replay[j] = row
+
+    def partial_fit(self, texts: Sequence[str], labels: Sequence[str], epochs: int = 1,
+                    replay_ratio: float = 1.0, seed: int = 0) -> "OnlineRouter":
+        """
+        A copy of this router updated on (texts, labels), mixed with up to
+        replay_ratio * len(texts) remembered examples.
+        """
+        rng = random.Random(seed + self.version)
+        rows = list(zip(texts, labels))
+        replayed = rng.sample(self.replay, min(len(self.replay), int(len(rows) * replay_ratio)))
+        updated = OnlineRouter(copy.deepcopy(self.model), self.label_encoder.classes_, self.version + 1,
+                               list(self.replay), self.trained_samples)
+        classes = np.arange(len(self.label_encoder.classes_))
+        for _ in range(epochs):
+            batch = rows + replayed
+            rng.shuffle(batch)
+            X = updated.vectorizer.transform([text for text, _ in batch])
+            updated.model.partial_fit(X, updated._encode([label for _, label in batch]), classes=classes)
+        updated._remember(rows, rng)
+        return updated
+
+    # ===== Checkpoints =====
+    def save(self, checkpoint_dir: str = CHECKPOINT_DIR) -> str:
+        """
+        Write router-<version>.joblib atomically and prune old checkpoints.
+        """
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        path = os.path.join(checkpoint_dir, f"router-{self.version:06d}.joblib")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump({
+            "model": self.model, "classes": list(self.label_encoder.classes_), "n_features": N_FEATURES,
+            "version": self.version, "replay": self.replay, "trained_samples": self.trained_samples,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+        for old in checkpoints(checkpoint_dir)[:-KEEP_CHECKPOINTS]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "OnlineRouter":
+        state = joblib.load(path)
+        if state["n_features"] != N_FEATURES:
+            raise ValueError(f"Checkpoint uses {state['n_features']} hashed features, expected {N_FEATURES}")
+        return cls(state["model"], state["classes"], state["version"], state["replay"], state["trained_samples"])
+
+def checkpoints(checkpoint_dir: str = CHECKPOINT_DIR) -> List[str]:
+    return sorted(glob.glob(os.path.join(checkpoint_dir, "router-*.joblib")))
+
+def latest_checkpoint(checkpoint_dir: str = CHECKPOINT_DIR) -> Optional[str]:
+    paths = checkpoints(checkpoint_dir)
+    return paths[-1] if paths else None
+
+def checkpoint_version(path: str) -> int:
+    return int(os.path.basename(path)[len("router-"):-len(".joblib")])
+
+def load_latest(checkpoint_dir: str = CHECKPOINT_DIR) -> Optional[OnlineRouter]:
+    path = latest_checkpoint(checkpoint_dir)
+    return OnlineRouter.load(path) if path else None
+
+# ===== Training =====
+def read_csv(paths: Sequence[str]) -> Tuple[List[str], List[str]]:
+    texts, labels = [], []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                texts.append(row["text"])
+                labels.append(row["label"].strip())
+    return texts, labels
+
+def generated_corpus(samples_per_label: int = 1000, seed: int = 0) -> Tuple[List[str], List[str]]:
+    """
+    (texts, labels) from the templates in data/raw/train_data_large.py.
+    """
+    spec = importlib.util.spec_from_file_location("train_data_large", TEMPLATES_PATH)
+    templates = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(templates)
+    rows = templates.generate_rows(num_samples=samples_per_label, rng=random.Random(seed))
+    return [text for text, _ in rows], [label for _, label in rows]
+
+def fit(texts: Sequence[str], labels: Sequence[str], epochs: int = 5,
+        min_rows: int = MIN_FIT_ROWS) -> OnlineRouter:
+    """
+    Initial router from a labeled corpus (version 1).
+    """
+    if len(texts) < min_rows:
+        raise ValueError(f"Only {len(texts)} training rows; the online router needs at least {min_rows}")
+    return OnlineRouter().partial_fit(texts, labels, epochs=epochs, replay_ratio=0.0)
+
+# ===== Feedback =====
+def record_feedback(user_id: Optional[int], text: str, label: str, predicted: Optional[str] = None):
+    """
+    Store a corrected label for a query the router got wrong.
+    """
+    if label not in CLASSES:
+        raise ValueError(f"Unknown router label: {label}")
+    chatmate_db.execute(
+        "INSERT INTO route_feedback (user_id, text, predicted, label, created_at) VALUES (?, ?, ?, ?, ?)",
+        (user_id, text, predicted, label, time.time()),
+    )
+
+def pending_feedback(limit: int = 10000) -> List[Tuple[int, str, str]]:
+    return chatmate_db.query_all(
+        "SELECT id, text, label FROM route_feedback WHERE applied = 0 ORDER BY id LIMIT ?", (limit,))
+
+_update_lock = threading.Lock()
+
+@contextlib.contextmanager
+def checkpoint_lock(checkpoint_dir: str = CHECKPOINT_DIR):
+    """
+    Exclusive lock on the checkpoint directory, held across processes
+    (gunicorn workers, the cron `update`) while a checkpoint is written.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(os.path.join(checkpoint_dir, ".lock"), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10 seconds; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def apply_feedback(manager=None, min_samples: int = 1, epochs: int = 3) -> Optional[OnlineRouter]:
+    """
+    partial_fit the latest checkpoint on pending feedback, save the next
+    checkpoint and swap it into `manager`. None if there was too little feedback.
+    """
+    # Feedback is read, trained on and marked applied under the same lock,
+    # so two processes never train the same rows or write the same version
+    with _update_lock, checkpoint_lock():
+        rows = pending_feedback()
+        if len(rows) < max(1, min_samples):
+            return None
+        current = load_latest()
+        if current is None:
+            raise RuntimeError("No online router checkpoint; run `python -m modules.online_router fit` first")
+        updated = current.partial_fit([text for _, text, _ in rows], [label for _, _, label in rows], epochs=epochs)
+        updated.save()
+        with chatmate_db.transaction() as conn:
+            conn.execute("UPDATE route_feedback SET applied = 1 WHERE applied = 0 AND id <= ?", (rows[-1][0],))
+        if manager is not None:
+            manager.swap_router(updated.model, updated.vectorizer, updated.label_encoder, version=updated.version)
+        print(f"[INFO] Online router v{updated.version} trained on {len(rows)} feedback example(s)")
+        return updated
+
+# ===== Hot reload =====
+class CheckpointWatcher:
+    """
+    Polls the checkpoint directory and swaps newer router versions into
+    the running NLPManager (checkpoints written by other workers or the CLI).
+    """
+
+    def __init__(self, manager, checkpoint_dir: str = CHECKPOINT_DIR, interval: float = RELOAD_SECONDS):
+        self.manager = manager
+        self.checkpoint_dir = checkpoint_dir
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="router-watcher", daemon=True)
+
+    def start(self):
+        if self.interval > 0:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self) -> bool:
+        path = latest_checkpoint(self.checkpoint_dir)
+        if path is None or checkpoint_version(path) <= self.manager.router_version:
+            return False
+        router = OnlineRouter.load(path)
+        self.manager.swap_router(router.model, router.vectorizer, router.label_encoder, version=router.version)
+        print(f"[INFO] Hot-swapped online router v{router.version}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[WARNING] Router reload failed: {e}")
+
+def evaluate(router: OnlineRouter, texts: Sequence[str], labels: Sequence[str]) -> Dict:
+    probs = router.model.predict_proba(router.vectorizer.transform(list(texts)))
+    predicted = router.label_encoder.inverse_transform(probs.argmax(axis=1))
+    return {"samples": len(labels), "accuracy": float(np.mean(predicted == np.asarray(labels))) if labels else 0.0}
+
+# python -m modules.online_router fit [train.csv ...]   -> first checkpoint (default: generated corpus)
+# python -m modules.online_router update                -> partial_fit on stored feedback (cron-able)
+if __name__ == "__main__":
+    import sys
+
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("update", [])
+    if command == "fit":
+        texts, labels = read_csv(args) if args else generated_corpus()
+        router = fit(texts, labels)
+        with checkpoint_lock():
+            path = router.save()
+        print(f"[INFO] Saved {path} (training accuracy {evaluate(router, texts, labels)['accuracy']:.3f})")
+    elif command == "update":
+        if apply_feedback() is None:
+            print("[INFO] No pending router feedback")
+    else:
+        print("usage: python -m modules.online_router fit [train.csv ...] | update")
+        sys.exit(2)
@@ -0,0 +1,40 @@
+# File: modules/password_service.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# ===== HASHING CONFIG =====
+# werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+PASSWORD_HASH_METHOD = os.environ.get("CHATMATE_PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_SALT_LENGTH = int(os.environ.get("CHATMATE_PASSWORD_SALT_LENGTH", 16))
+# hashlib's scrypt/pbkdf2 release the GIL, so these threads hash in parallel.
+# The pool caps how many hashes run at once (and so CPU and scrypt memory);
+# the request thread still waits for its own hash to finish
+PASSWORD_HASH_WORKERS = int(os.environ.get("CHATMATE_PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def hash_password(password: str) -> str:
+    """
+    Hash a password on the dedicated hashing executor, blocking until it is
+    done; the executor only bounds how many hashes run concurrently.
+    """
+    return _executor.submit(
+        generate_password_hash, password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH
+    ).result()
+
+def verify_password(stored_hash: str, password: str) -> bool:
+    """
+    Check a password against its stored hash (blocking, like hash_password).
+    """
+    return _executor.submit(check_password_hash, stored_hash, password).result()
+
+def needs_rehash(stored_hash: str) -> bool:
+    """
+    True when a stored hash was made with a different method or cost than
+    the configured one, so it should be replaced after a successful login.
+    """
+    method = stored_hash.split("$", 1)[0]
+    return method != PASSWORD_HASH_METHOD
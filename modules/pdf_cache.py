@@ -0,0 +1,181 @@
+# File: modules/pdf_cache.py
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from modules.db import Database
+
+# Sidecar database next to chatmate.db, shared by all users
+CACHE_DB_PATH = os.environ.get("CHATMATE_PDF_CACHE_DB", "pdf_cache.db")
+# Total extracted text kept in the cache before LRU eviction kicks in
+MAX_CACHE_BYTES = int(os.environ.get("CHATMATE_PDF_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+# ===== SCHEMA MIGRATIONS (pdf_cache.db) =====
+MIGRATIONS = [
+    # 1: one row per distinct file content, extracted text one row per page
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS pdf_documents (
+            sha256 TEXT PRIMARY KEY,
+            num_pages INTEGER NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS pdf_pages (
+            sha256 TEXT NOT NULL,
+            page_no INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (sha256, page_no)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_pdf_documents_last_used ON pdf_documents(last_used)",
+    ],
+    # 2: OCR text of scanned pages and image uploads, kept per page so that
+    # page-range queries and later full passes never OCR a page twice
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS ocr_pages (
+            sha256 TEXT NOT NULL,
+            page_no INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (sha256, page_no)
+        )
+        ''',
+    ],
+]
+
+cache_db = Database(CACHE_DB_PATH, MIGRATIONS)
+
+DIGEST_MEMO_SIZE = 256         # files whose digest is remembered by (path, size, mtime)
+_digests: "OrderedDict[tuple, str]" = OrderedDict()
+_digests_lock = threading.Lock()
+
+_counts = {"hits": 0, "misses": 0}
+_counts_lock = threading.Lock()
+
+def _count(hit: bool):
+    with _counts_lock:
+        _counts["hits" if hit else "misses"] += 1
+
+def stats() -> Dict:
+    with _counts_lock:
+        lookups = _counts["hits"] + _counts["misses"]
+        return {"hits": _counts["hits"], "misses": _counts["misses"],
+                "hit_ratio": _counts["hits"] / lookups if lookups else 0.0}
+
+# ===== Hashing =====
+def file_sha256(file_path: str) -> str:
+    """
+    SHA-256 of the file contents, read in 1 MB blocks. Remembered per
+    (path, size, mtime), so repeat questions about an upload do not rehash it.
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        known = _digests.get(key)
+        if known is not None:
+            _digests.move_to_end(key)
+            return known
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    with _digests_lock:
+        _digests[key] = digest.hexdigest()
+        while len(_digests) > DIGEST_MEMO_SIZE:
+            _digests.popitem(last=False)
+    return digest.hexdigest()
+
+# ===== Lookup / Store =====
+def get_pages(sha256: str, start: int = 0, stop: Optional[int] = None) -> Optional[List[str]]:
+    """
+    Return cached page texts [start, stop) (0-based) for a digest, or None on a miss.
+    """
+    with cache_db.connection() as conn:
+        if conn.execute("SELECT 1 FROM pdf_documents WHERE sha256=?", (sha256,)).fetchone() is None:
+            _count(False)
+            return None
+        _count(True)
+        conn.execute("UPDATE pdf_documents SET last_used=? WHERE sha256=?", (time.time(), sha256))
+        conn.commit()
+    return read_pages(sha256, start, stop)
+
+def read_pages(sha256: str, start: int = 0, stop: Optional[int] = None) -> List[str]:
+    """
+    Page texts [start, stop) of a cached document, without touching its LRU entry.
+    """
+    rows = cache_db.query_all(
+        "SELECT text FROM pdf_pages WHERE sha256=? AND page_no >= ? AND page_no < ? ORDER BY page_no",
+        (sha256, start, stop if stop is not None else 2 ** 62)
+    )
+    return [row[0] for row in rows]
+
+def put_pages(sha256: str, pages: List[str]):
+    """
+    Store page texts for a digest and evict least recently used entries
+    until the cache is back under MAX_CACHE_BYTES.
+    """
+    size_bytes = sum(len(p.encode('utf-8')) for p in pages)
+    if size_bytes > MAX_CACHE_BYTES:
+        return
+    with cache_db.transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM pdf_pages WHERE sha256=?", (sha256,))
+        cursor.executemany(
+            "INSERT INTO pdf_pages (sha256, page_no, text) VALUES (?, ?, ?)",
+            [(sha256, i, text) for i, text in enumerate(pages)]
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO pdf_documents (sha256, num_pages, size_bytes, last_used) VALUES (?, ?, ?, ?)",
+            (sha256, len(pages), size_bytes, time.time())
+        )
+        _evict(cursor)
+
+def _evict(cursor):
+    cursor.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM pdf_documents")
+    total = cursor.fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    cursor.execute("SELECT sha256, size_bytes FROM pdf_documents ORDER BY last_used ASC")
+    for sha256, size_bytes in cursor.fetchall():
+        if total <= MAX_CACHE_BYTES:
+            break
+        cursor.execute("DELETE FROM pdf_pages WHERE sha256=?", (sha256,))
+        cursor.execute("DELETE FROM ocr_pages WHERE sha256=?", (sha256,))
+        cursor.execute("DELETE FROM pdf_documents WHERE sha256=?", (sha256,))
+        total -= size_bytes
+
+def get_ocr_pages(sha256: str, page_nos: List[int]) -> Dict[int, str]:
+    """
+    OCR text already stored for the given 0-based page numbers of a digest.
+    """
+    if not page_nos:
+        return {}
+    marks = ",".join("?" * len(page_nos))
+    with cache_db.connection() as conn:
+        rows = conn.execute(f"SELECT page_no, text FROM ocr_pages WHERE sha256=? AND page_no IN ({marks})",
+                            (sha256, *page_nos)).fetchall()
+    return {page_no: text for page_no, text in rows}
+
+def put_ocr_page(sha256: str, page_no: int, text: str):
+    with cache_db.transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO ocr_pages (sha256, page_no, text, created_at) VALUES (?, ?, ?, ?)",
+                     (sha256, page_no, text, time.time()))
+
+def get_or_extract(file_path: str, extractor) -> List[str]:
+    """
+    Return page texts for a file, calling extractor(file_path) only on a miss.
+    """
+    sha256 = file_sha256(file_path)
+    pages = get_pages(sha256)
+    if pages is None:
+        pages = list(extractor(file_path))
+        put_pages(sha256, pages)
+    return pages
@@ -1,8 +1,30 @@
 # File: modules/pdf_helper.py
 
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import re
 import PyPDF2
+from modules import ocr, pdf_cache, pdf_index, pdf_summary, metrics
+
+# ===== EXTRACTION CONFIG =====
+PREVIEW_CHARS = 1000          # replies never show more than this much text
+PARALLEL_MIN_PAGES = 32       # smaller documents are parsed inline
+PAGES_PER_TASK = 8            # pages handed to one worker process at a time
+PDF_WORKERS = int(os.environ.get("CHATMATE_PDF_WORKERS", os.cpu_count() or 2))
+MAX_RANGE_PAGES = int(os.environ.get("CHATMATE_PDF_MAX_RANGE_PAGES", 100))  # longest page range one question may read
+CACHE_READ_PAGES = 32         # cached pages loaded per query while a reader keeps going
+SCAN_CHECK_PAGES = 3          # leading pages looked at to tell a scan from a text PDF
+OCR_UNAVAILABLE_REPLY = ("This file is a scan or an image, and OCR is not available on this server, "
+                         "so its text cannot be read. Please upload a PDF with selectable text.")
+
+# Workers come from a forkserver (spawn where there is none), never forked from
+# the multithreaded server process with its SQLite, writer or torch locks held
+_ctx = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+_pool = None
 
 def clean_pdf_text(text: str) -> str:
     """
@@ -14,34 +36,255 @@ def clean_pdf_text(text: str) -> str:
         text = text[:1000].rstrip() + "..."
     return text
 
-def extract_text_from_pdf(file_path: str) -> str:
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=_ctx)
+    return _pool
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """
+    Worker task: extract pages [start, stop) of a PDF.
+    """
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _stream_pages_parallel(file_path: str, num_pages: int, first: int = 0) -> Iterator[str]:
+    """
+    Yield pages first.. in order while page ranges are extracted on the
+    process pool. One range is in flight at first; the window doubles (up to
+    PDF_WORKERS * 2) each time the reader finishes a range, so a short
+    preview does not occupy the whole pool. Closing the generator cancels
+    queued ranges.
+    """
+    pool = _get_pool()
+    ranges = iter([(start, min(start + PAGES_PER_TASK, num_pages))
+                   for start in range(first, num_pages, PAGES_PER_TASK)])
+    pending = deque()
+    window = 1
+    try:
+        while True:
+            while len(pending) < window:
+                next_range = next(ranges, None)
+                if next_range is None:
+                    break
+                pending.append(pool.submit(_extract_page_range, file_path, *next_range))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+            window = min(window * 2, PDF_WORKERS * 2)
+    finally:
+        for future in pending:
+            future.cancel()
+
+def _stream_text_layer(file_path: str, first: int = 0) -> Iterator[str]:
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        num_pages = len(reader.pages)
+        if num_pages - first < PARALLEL_MIN_PAGES:
+            for i in range(first, num_pages):
+                yield reader.pages[i].extract_text() or ""
+            return
+    yield from _stream_pages_parallel(file_path, num_pages, first)
+
+def _stream_pages(file_path: str, first: int = 0) -> Iterator[str]:
+    """
+    Page texts from page index first on. Image uploads are one OCR'd page;
+    PDF pages without a text layer (scans) are OCR'd when ocr is available.
+    """
+    if ocr.is_image(file_path):
+        if first == 0:
+            yield ocr.ocr_image(file_path)
+        return
+    pages = _stream_text_layer(file_path, first)
+    try:
+        yield from ocr.fill_blank_pages(file_path, pages, first)
+    finally:
+        pages.close()
+
+def _block_stop(start: int, stop: Optional[int]) -> int:
+    return start + CACHE_READ_PAGES if stop is None else min(start + CACHE_READ_PAGES, stop)
+
+def _cached_pages(sha256: str, first_block: List[str], start: int, stop: Optional[int]) -> Iterator[str]:
+    # Later blocks are only read if the caller keeps going
+    block = first_block
+    while True:
+        yield from block
+        start += len(block)
+        if len(block) < CACHE_READ_PAGES or (stop is not None and start >= stop):
+            return
+        block = pdf_cache.read_pages(sha256, start, _block_stop(start, stop))
+
+def iter_pdf_pages(file_path: str, max_chars: Optional[int] = None,
+                   max_pages: Optional[int] = None, first_page: int = 1) -> Iterator[str]:
     """
-    Extract text from a PDF file using PyPDF2.
+    Yield the text of each page from first_page on, stopping once max_chars
+    characters or max_pages pages have been produced. Cached documents are
+    served from pdf_cache a block of pages at a time; a full pass over an
+    uncached document populates it.
     """
-    text = ""
+    sha256 = pdf_cache.file_sha256(file_path)
+    start = first_page - 1
+    stop = start + max_pages if max_pages is not None else None
+    cached = pdf_cache.get_pages(sha256, start, _block_stop(start, stop))
+    if cached is not None:
+        source = _cached_pages(sha256, cached, start, stop)
+    else:
+        source = _stream_pages(file_path, start)
+    full_pass = cached is None and first_page == 1
+    seen = []
+    chars = 0
     try:
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                page_text = page.extract_text() or ""
-                text += page_text + " "
+        for page_no, page_text in enumerate(source, start=1):
+            if full_pass:
+                seen.append(page_text)
+            yield page_text
+            chars += len(page_text)
+            if (max_pages is not None and page_no >= max_pages) or \
+               (max_chars is not None and chars >= max_chars):
+                return
+        # Scanned pages passed through blank (no OCR here) must not be cached
+        # as their final text: they are OCR'd once OCR becomes available
+        if full_pass and (ocr.is_available() or not any(ocr.needs_ocr(p) for p in seen)):
+            pdf_cache.put_pages(sha256, seen)
+    finally:
+        source.close()
+
+def count_pdf_pages(file_path: str) -> int:
+    if ocr.is_image(file_path):
+        return 1
+    with open(file_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+def needs_unavailable_ocr(file_path: str, pages: Optional[Tuple[int, int]] = None) -> bool:
+    """
+    True when the file (or page range) is an image or starts with scanned
+    pages and OCR is not available, so there is no text to work with.
+    """
+    if ocr.is_available():
+        return False
+    if ocr.is_image(file_path):
+        return True
+    first = pages[0] if pages else 1
+    leading = list(iter_pdf_pages(file_path, first_page=first, max_pages=SCAN_CHECK_PAGES))
+    return bool(leading) and all(ocr.needs_ocr(p) for p in leading)
+
+def page_range(text: str) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) 1-based page numbers from "pages 10-25", "pages 10 to 25",
+    "p. 10-25" or "page 12"; ranges are capped at MAX_RANGE_PAGES pages.
+    """
+    match = re.search(r"\b(?:pages?|pp?\.?)\s*(\d+)(?:\s*(?:-|–|to)\s*(\d+))?", (text or "").lower())
+    if not match:
+        return None
+    first = max(1, int(match.group(1)))
+    last = max(first, int(match.group(2) or first))
+    return first, min(last, first + MAX_RANGE_PAGES - 1)
+
+def _range_pages(file_path: str, pages: Tuple[int, int]):
+    first, last = pages
+    return lambda: iter_pdf_pages(file_path, first_page=first, max_pages=last - first + 1)
+
+def get_pdf_pages(file_path: str) -> List[str]:
+    """
+    All page texts for a PDF.
+    """
+    return list(iter_pdf_pages(file_path))
+
+def extract_text_from_pdf(file_path: str, max_chars: Optional[int] = PREVIEW_CHARS,
+                          pages: Optional[Tuple[int, int]] = None) -> str:
+    """
+    Extract text from a PDF file, reading only as many pages as max_chars needs.
+    """
+    first, last = pages or (1, None)
+    try:
+        with metrics.timed("pdf.extract"):
+            text = " ".join(iter_pdf_pages(file_path, max_chars=max_chars, first_page=first,
+                                           max_pages=last - first + 1 if last else None))
     except Exception as e:
         text = f"Error reading PDF: {e}"
     return clean_pdf_text(text)
 
-def summarize_text(text: str) -> str:
+def count_pdf_words(file_path: str, pages: Optional[Tuple[int, int]] = None) -> int:
+    """
+    Word count over the whole document (or a page range).
+    """
+    source = _range_pages(file_path, pages)() if pages else iter_pdf_pages(file_path)
+    return sum(len(page_text.split()) for page_text in source)
+
+def ingest_pdf(file_path: str) -> Optional[str]:
     """
-    Simple dummy summarization (can be replaced with real NLP model later)
+    Extract (and cache) every page of an upload and build its passage index.
     """
-    sentences = text.split('.')
-    summary = '. '.join(sentences[:min(3, len(sentences))]).strip()
-    if not summary.endswith('.'):
-        summary += '.'
-    return summary
+    with metrics.timed("pdf.ingest"):
+        return pdf_index.index_pdf(file_path, get_pdf_pages(file_path))
 
-def handle_pdf_query(user_message: str, file_path: str = None) -> Dict:
+def answer_pdf_question(file_path: str, question: str, pages: Optional[Tuple[int, int]] = None) -> Optional[str]:
+    """
+    Answer a free-form question with the best matching passages and their pages.
+    With a page range only those pages are read, through a throwaway index.
     """
-    Handle PDF-related queries.
+    if pages:
+        with metrics.timed("pdf.search", "range"):
+            index = pdf_index.build_index(list(_range_pages(file_path, pages)()))
+            passages = index.search(question) if index is not None else []
+        return " ".join(f"[Page {p['page'] + pages[0] - 1}] {p['text']}" for p in passages) or None
+    with metrics.timed("pdf.search"):
+        passages = pdf_index.search_pdf(file_path, question)
+    if passages is None and ingest_pdf(file_path):
+        with metrics.timed("pdf.search"):
+            passages = pdf_index.search_pdf(file_path, question)
+    if not passages:
+        return None
+    return " ".join(f"[Page {p['page']}] {p['text']}" for p in passages)
+
+def summarize_text(text: str, max_sentences: int = 3) -> str:
+    """
+    Extractive summary of a piece of text (TextRank over its sentences).
+    """
+    return pdf_summary.summarize_text(text, max_sentences=max_sentences, max_chars=PREVIEW_CHARS) or text
+
+def summary_options(user_message: str) -> Dict:
+    """
+    Length and section options from the request wording: "in 4 sentences",
+    "brief", "detailed", "by chapter" / "each section".
+    """
+    lower_msg = user_message.lower()
+    options = {"max_sentences": 5, "by_section": False}
+    count = re.search(r"\b(\d{1,2})\s+(?:sentences|points|lines)\b", lower_msg)
+    if count:
+        options["max_sentences"] = max(1, int(count.group(1)))
+    elif re.search(r"\b(?:brief|short|quick)\b", lower_msg):
+        options["max_sentences"] = 3
+    elif re.search(r"\b(?:detailed|long|full)\b", lower_msg):
+        options["max_sentences"] = 10
+    if re.search(r"\b(?:by|each|every|per)\s+(?:chapter|section|unit)s?\b|chapter[- ]wise", lower_msg):
+        options["by_section"] = True
+    return options
+
+def summarize_pdf(file_path: str, max_sentences: int = 5, by_section: bool = False,
+                  pages: Optional[Tuple[int, int]] = None) -> str:
+    """
+    Extractive summary of the whole document (or a page range), optionally one
+    part per chapter/section heading. Pages are streamed; see modules/pdf_summary.py.
+    """
+    source = _range_pages(file_path, pages) if pages else lambda: iter_pdf_pages(file_path)
+    with metrics.timed("pdf.summarize"):
+        parts = pdf_summary.summarize(source, max_sentences=max_sentences,
+                                      max_chars=PREVIEW_CHARS, by_section=by_section)
+    if not parts:
+        return "The PDF has no extractable text to summarize."
+    return " ".join(
+        (f"{part['title']}: " if part["title"] else "") + " ".join(part["sentences"])
+        for part in parts if part["sentences"]
+    )
+
+def handle_pdf_query(user_message: str, file_path: str = None,
+                     pages: Optional[Tuple[int, int]] = None) -> Dict:
+    """
+    Handle PDF-related queries. pages (or "pages 10-25" in the message)
+    limits the query to a page range, so a scan is only OCR'd there.
     """
     user_message = (user_message or "").strip()
     if not user_message:
@@ -51,17 +294,19 @@ def handle_pdf_query(user_message: str, file_path: str = None) -> Dict:
     if file_path is None:
         reply = "Please upload a PDF file to process."
         return {"handled": True, "reply": reply}
-
-    pdf_text = extract_text_from_pdf(file_path)
+    pages = page_range(user_message) or pages
+    if needs_unavailable_ocr(file_path, pages):
+        return {"handled": True, "reply": OCR_UNAVAILABLE_REPLY}
 
     if any(keyword in lower_msg for keyword in ["summarize", "summary", "research paper"]):
-        reply = summarize_text(pdf_text)
+        reply = summarize_pdf(file_path, pages=pages, **summary_options(user_message))
     elif any(keyword in lower_msg for keyword in ["extract", "text", "read"]):
-        reply = pdf_text
+        reply = extract_text_from_pdf(file_path, pages=pages)
     elif any(keyword in lower_msg for keyword in ["analyze"]):
-        reply = f"Analysis: The PDF contains {len(pdf_text.split())} words and covers key concepts. (Simulated)"
+        reply = f"Analysis: The PDF contains {count_pdf_words(file_path, pages)} words and covers key concepts. (Simulated)"
     else:
-        reply = "I can help summarize, extract text, or analyze PDFs. Please rephrase your request."
+        reply = answer_pdf_question(file_path, user_message, pages) or \
+            "I can help summarize, extract text, analyze, or answer questions about PDFs. Please rephrase your request."
 
     reply = clean_pdf_text(reply)
     return {"handled": True, "reply": reply}
@@ -0,0 +1,152 @@
+# File: modules/pdf_index.py
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from modules import pdf_cache
+
+# ===== INDEX CONFIG =====
+CHUNK_WORDS = 120        # words per passage
+CHUNK_OVERLAP = 40       # words shared by neighbouring passages
+TOP_K = 3
+MAX_LOADED_INDEXES = 16  # indexes kept in memory after first use
+INDEX_DIRNAME = ".index"
+
+_loaded = OrderedDict()
+_lock = threading.Lock()
+
+class PDFIndex:
+    """
+    TF-IDF index over overlapping passages of one document.
+    Rows of the matrix are L2-normalised, so a dot product is cosine similarity.
+    """
+
+    def __init__(self, vectorizer, matrix, chunks):
+        self.vectorizer = vectorizer
+        self.matrix = matrix.tocsr()
+        self.chunks = chunks  # list of {"page": int, "text": str}
+
+    def search(self, question: str, top_k: int = TOP_K) -> List[Dict]:
+        """
+        Return the top_k passages for a question as dicts with page, text and score.
+        """
+        query_vec = self.vectorizer.transform([question])
+        scores = (self.matrix @ query_vec.T).toarray().ravel()
+        if not scores.any():
+            return []
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [dict(self.chunks[i], score=float(scores[i])) for i in best if scores[i] > 0]
+
+# ===== CHUNKING =====
+def chunk_pages(pages: List[str], chunk_words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[Dict]:
+    """
+    Split each page into overlapping word windows tagged with a 1-based page number.
+    """
+    step = max(1, chunk_words - overlap)
+    chunks = []
+    for page_no, page_text in enumerate(pages, start=1):
+        words = page_text.split()
+        for start in range(0, len(words), step):
+            chunks.append({"page": page_no, "text": " ".join(words[start:start + chunk_words])})
+            if start + chunk_words >= len(words):
+                break
+    return chunks
+
+# ===== BUILD / SAVE / LOAD =====
+def index_dir_for(file_path: str, sha256: Optional[str] = None) -> str:
+    """
+    Index location for an uploaded file: uploads/<user_id>/.index/<sha256>/
+    """
+    sha256 = sha256 or pdf_cache.file_sha256(file_path)
+    return os.path.join(os.path.dirname(file_path), INDEX_DIRNAME, sha256)
+
+def build_index(pages: List[str]) -> Optional[PDFIndex]:
+    chunks = chunk_pages(pages)
+    if not chunks:
+        return None
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, stop_words="english")
+    try:
+        matrix = vectorizer.fit_transform([c["text"] for c in chunks])
+    except ValueError:
+        # Only stopwords / no usable tokens in the document
+        return None
+    return PDFIndex(vectorizer, matrix, chunks)
+
+def save_index(index: PDFIndex, index_dir: str):
+    """
+    Write the index into a temporary directory next to index_dir and rename
+    it into place, so a crash or a concurrent ingest never leaves a partial
+    index that load_index would accept.
+    """
+    parent = os.path.dirname(index_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{os.path.basename(index_dir)}.", dir=parent)
+    try:
+        joblib.dump(index.vectorizer, os.path.join(tmp_dir, "vectorizer.pkl"))
+        sparse.save_npz(os.path.join(tmp_dir, "matrix.npz"), index.matrix)
+        with open(os.path.join(tmp_dir, "chunks.json"), "w", encoding="utf-8") as f:
+            json.dump(index.chunks, f)
+        try:
+            os.replace(tmp_dir, index_dir)
+        except OSError:
+            # Another ingest of the same file (same sha256) got there first
+            if not os.path.exists(os.path.join(index_dir, "chunks.json")):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def load_index(index_dir: str) -> Optional[PDFIndex]:
+    """
+    Load an index from disk, keeping the most recently used ones in memory.
+    """
+    with _lock:
+        if index_dir in _loaded:
+            _loaded.move_to_end(index_dir)
+            return _loaded[index_dir]
+    if not os.path.exists(os.path.join(index_dir, "chunks.json")):
+        return None
+    vectorizer = joblib.load(os.path.join(index_dir, "vectorizer.pkl"))
+    matrix = sparse.load_npz(os.path.join(index_dir, "matrix.npz"))
+    with open(os.path.join(index_dir, "chunks.json"), encoding="utf-8") as f:
+        chunks = json.load(f)
+    index = PDFIndex(vectorizer, matrix, chunks)
+    with _lock:
+        _loaded[index_dir] = index
+        while len(_loaded) > MAX_LOADED_INDEXES:
+            _loaded.popitem(last=False)
+    return index
+
+def index_pdf(file_path: str, pages: List[str]) -> Optional[str]:
+    """
+    Build and store the index for an uploaded file unless it already exists.
+    Returns the index directory, or None if the document has no indexable text.
+    """
+    index_dir = index_dir_for(file_path)
+    if os.path.exists(os.path.join(index_dir, "chunks.json")):
+        return index_dir
+    index = build_index(pages)
+    if index is None:
+        return None
+    save_index(index, index_dir)
+    return index_dir
+
+def search_pdf(file_path: str, question: str, top_k: int = TOP_K) -> Optional[List[Dict]]:
+    """
+    Top passages for a question about an uploaded file, or None if it has no index.
+    """
+    index = load_index(index_dir_for(file_path))
+    if index is None:
+        return None
+    return index.search(question, top_k)
@@ -0,0 +1,114 @@
+# File: modules/pdf_jobs.py
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from modules import pdf_helper, pdf_index
+from modules.db import chatmate_db
+
+# ===== JOB CONFIG =====
+PDF_JOB_WORKERS = int(os.environ.get("CHATMATE_PDF_JOB_WORKERS", 2))
+JOB_RETENTION = 24 * 3600      # finished jobs older than this are deleted
+PROGRESS_INTERVAL = 0.5        # seconds between pages_done writes
+HEARTBEAT_INTERVAL = 10        # seconds between updated_at touches of this process's unfinished jobs
+# An unfinished job whose owning process has not touched it for this long
+# belongs to a worker that died; queued jobs of a live worker are never stale
+STALE_AFTER = float(os.environ.get("CHATMATE_PDF_JOB_STALE_SECONDS", 60))
+
+_executor = ThreadPoolExecutor(max_workers=PDF_JOB_WORKERS, thread_name_prefix="pdf-ingest")
+_owned = set()                 # unfinished job ids queued or running in this process
+_owned_lock = threading.Lock()
+_heartbeat = None
+
+# Job state lives in chatmate.db (pdf_jobs table) so any worker process can
+# answer a poll for a job another worker is running
+_COLUMNS = ("job_id", "user_id", "file_path", "status", "pages_done", "total_pages",
+            "error", "created_at", "updated_at", "finished_at")
+
+def submit_ingest(user_id, file_path: str) -> str:
+    """
+    Queue extraction, caching and indexing of an uploaded PDF.
+    Returns a job id that can be polled with get_job().
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with chatmate_db.transaction() as conn:
+        conn.execute("DELETE FROM pdf_jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                     (now - JOB_RETENTION,))
+        conn.execute(
+            "INSERT INTO pdf_jobs (job_id, user_id, file_path, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, user_id, file_path, now, now)
+        )
+    with _owned_lock:
+        _owned.add(job_id)
+    _start_heartbeat()
+    _executor.submit(_run_ingest, job_id, file_path)
+    return job_id
+
+def get_job(job_id: str, user_id=None) -> Optional[Dict]:
+    """
+    Snapshot of a job, or None if unknown or owned by another user.
+    """
+    row = chatmate_db.query_one(f"SELECT {', '.join(_COLUMNS)} FROM pdf_jobs WHERE job_id=?", (job_id,))
+    if row is None:
+        return None
+    job = dict(zip(_COLUMNS, row))
+    if user_id is not None and job["user_id"] != user_id:
+        return None
+    if job["status"] in ("queued", "running") and time.time() - job["updated_at"] > STALE_AFTER:
+        job.update(status="failed", error="processing was interrupted, please upload the file again")
+    job.pop("updated_at")
+    return job
+
+def is_ready(job: Optional[Dict]) -> bool:
+    return job is None or job["status"] in ("done", "failed")
+
+def _start_heartbeat():
+    global _heartbeat
+    with _owned_lock:
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_beat, name="pdf-job-heartbeat", daemon=True)
+            _heartbeat.start()
+
+def _beat():
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        with _owned_lock:
+            job_ids = list(_owned)
+        if not job_ids:
+            continue
+        try:
+            chatmate_db.execute(
+                f"UPDATE pdf_jobs SET updated_at=? WHERE job_id IN ({','.join('?' * len(job_ids))})",
+                (time.time(), *job_ids)
+            )
+        except Exception as e:
+            print(f"[WARNING] PDF job heartbeat failed: {e}")
+
+def _update(job_id: str, **fields):
+    fields["updated_at"] = time.time()
+    assignments = ", ".join(f"{name}=?" for name in fields)
+    chatmate_db.execute(f"UPDATE pdf_jobs SET {assignments} WHERE job_id=?", (*fields.values(), job_id))
+
+def _run_ingest(job_id: str, file_path: str):
+    try:
+        _update(job_id, status="running", total_pages=pdf_helper.count_pdf_pages(file_path))
+        pages = []
+        last_write = time.monotonic()
+        for page_text in pdf_helper.iter_pdf_pages(file_path):
+            pages.append(page_text)
+            if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+                _update(job_id, pages_done=len(pages))
+                last_write = time.monotonic()
+        pdf_index.index_pdf(file_path, pages)
+        _update(job_id, status="done", pages_done=len(pages), finished_at=time.time())
+    except Exception as e:
+        _update(job_id, status="failed", error=str(e), finished_at=time.time())
+    finally:
+        with _owned_lock:
+            _owned.discard(job_id)
@@ -0,0 +1,244 @@
+# File: modules/pdf_summary.py
+
+import re
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+# ===== SUMMARY CONFIG =====
+N_FEATURES = 2 ** 18
+MIN_SENTENCE_WORDS = 6
+MAX_SENTENCE_CHARS = 400       # longer "sentences" are usually tables or run-on extraction noise
+VECTORIZE_BATCH = 2048         # sentences hashed per vectorizer call
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 30
+REDUNDANCY_THRESHOLD = 0.5     # skip a sentence this similar (cosine) to one already chosen
+
+# Tokens ending in "." that do not end a sentence
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "cf", "al", "fig", "figs",
+    "eq", "eqs", "no", "vol", "pp", "p", "ch", "sec", "approx", "inc", "ltd", "co", "jan", "feb", "mar", "apr",
+    "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+_BOUNDARY_RE = re.compile(r"[.!?]+[\"')\]]*(?=\s+[\"'(\[]?[A-Z0-9])|\n\s*\n")
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\s*\n\s*(\w)")
+_NON_LETTER_RE = re.compile(r"[\W\d_]+")
+_HEADING_RE = re.compile(r"^\s*((?:chapter|section|unit|part|lesson)\s+(?:\d+|[ivxlc]+)\b[^\n]{0,80})",
+                         re.IGNORECASE | re.MULTILINE)
+
+_vectorizer = HashingVectorizer(n_features=N_FEATURES, stop_words="english", alternate_sign=False,
+                                norm=None, dtype=np.float32)
+
+class SentenceRef(NamedTuple):
+    page: int       # 1-based
+    start: int      # character span in the page text
+    end: int
+    score: float
+
+# ===== Sentence splitting =====
+def split_sentences(text: str) -> List[tuple]:
+    """
+    (start, end) spans of the sentences in text. Splits after . ! ? followed
+    by a capitalised word, and at blank lines; abbreviations, initials and
+    decimals do not end a sentence.
+    """
+    spans = []
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        end = match.end()
+        if match.group().strip():
+            before = text[start:match.start()].split()
+            word = before[-1].lower().lstrip("(\"'") if before else ""
+            if word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                continue
+        if text[start:end].strip():
+            spans.append((start, end))
+        start = end
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+def clean_sentence(text: str) -> str:
+    if "-" in text:
+        text = _HYPHEN_BREAK_RE.sub(r"\1\2", text)  # words hyphenated across lines
+    return " ".join(text.split())
+
+def _keep(sentence: str) -> bool:
+    return len(sentence) <= MAX_SENTENCE_CHARS and sentence.count(" ") + 1 >= MIN_SENTENCE_WORDS \
+        and len(_NON_LETTER_RE.sub("", sentence)) > len(sentence) / 2
+
+# ===== Scoring =====
+def _tfidf_rows(counts: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    Sublinear TF-IDF with document frequency taken over the sentences, rows L2-normalised.
+    """
+    X = counts.tocsr(copy=True)
+    n = X.shape[0]
+    df = np.bincount(X.indices, minlength=X.shape[1])
+    idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+    X.data = (1.0 + np.log(X.data)) * idf[X.indices]
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sparse.diags(1.0 / norms) @ X).tocsr()
+
+def centrality_scores(X: sparse.csr_matrix) -> np.ndarray:
+    """
+    Cosine similarity of each sentence to the document centroid.
+    """
+    centroid = np.asarray(X.mean(axis=0)).ravel()
+    return np.asarray(X @ centroid).ravel()
+
+def textrank_scores(X: sparse.csr_matrix, damping: float = TEXTRANK_DAMPING,
+                    iterations: int = TEXTRANK_ITERATIONS) -> np.ndarray:
+    """
+    PageRank over the cosine-similarity graph S = XX^T - I without building
+    S: every step is two sparse matrix-vector products, O(nnz).
+    """
+    n = X.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    XT = X.T.tocsr()
+    degree = np.asarray(X @ (XT @ np.ones(n))).ravel() - 1.0
+    degree[degree <= 1e-12] = 1.0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        weighted = rank / degree
+        rank = (1 - damping) / n + damping * (np.asarray(X @ (XT @ weighted)).ravel() - weighted)
+    return rank
+
+def select(X: sparse.csr_matrix, scores: np.ndarray, lengths: np.ndarray, max_sentences: int,
+           max_chars: Optional[int]) -> List[int]:
+    """
+    Highest scoring rows that are not near-duplicates of rows already chosen,
+    within the sentence and character budgets; returned in document order.
+    """
+    chosen, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        if len(chosen) >= max_sentences:
+            break
+        if max_chars is not None and chosen and used + lengths[i] + 1 > max_chars:
+            continue
+        if chosen and (X[chosen] @ X[i].T).max() > REDUNDANCY_THRESHOLD:
+            continue
+        chosen.append(int(i))
+        used += int(lengths[i]) + 1
+    return sorted(chosen)
+
+# ===== Streaming pass =====
+class DocumentVectors:
+    """
+    Hashed term counts and locations of every kept sentence of a document,
+    built page by page. Sentence text is not retained.
+    """
+
+    def __init__(self):
+        self.blocks: List[sparse.csr_matrix] = []
+        self.pages: List[int] = []
+        self.spans: List[tuple] = []
+        self.lengths: List[int] = []
+        self.sections: List[int] = []
+        self.section_titles: List[str] = []
+        self._batch: List[str] = []
+
+    def add_page(self, page_no: int, text: str):
+        headings = [(m.start(1), m.end(1), clean_sentence(m.group(1))) for m in _HEADING_RE.finditer(text)]
+        for start, end in split_sentences(text):
+            while headings and headings[0][0] < end:
+                _, heading_end, title = headings.pop(0)
+                self.section_titles.append(title)
+                start = max(start, min(heading_end, end))  # the heading line is not part of the sentence
+            sentence = clean_sentence(text[start:end])
+            if not _keep(sentence):
+                continue
+            self.pages.append(page_no)
+            self.spans.append((start, end))
+            self.lengths.append(len(sentence))
+            self.sections.append(len(self.section_titles))
+            self._batch.append(sentence)
+        self.section_titles.extend(title for _, _, title in headings)
+        if len(self._batch) >= VECTORIZE_BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self.blocks.append(_vectorizer.transform(self._batch))
+            self._batch = []
+
+    def matrix(self) -> sparse.csr_matrix:
+        self._flush()
+        if not self.blocks:
+            return sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        X = sparse.vstack(self.blocks, format="csr")
+        self.blocks = [X]
+        return X
+
+def _rank(counts: sparse.csr_matrix, method: str) -> tuple:
+    X = _tfidf_rows(counts)
+    scores = textrank_scores(X) if method == "textrank" else centrality_scores(X)
+    return X, scores
+
+def summarize_pages(pages: Iterable[str], max_sentences: int = 5, max_chars: Optional[int] = 1000,
+                    method: str = "textrank", by_section: bool = False,
+                    per_section: int = 2) -> List[Dict]:
+    """
+    Pick summary sentences from a stream of page texts.
+    Returns [{"title": str or None, "sentences": [SentenceRef, ...]}]: one
+    entry for the whole document, or one per detected chapter/section heading
+    with by_section=True.
+    """
+    doc = DocumentVectors()
+    for page_no, text in enumerate(pages, start=1):
+        doc.add_page(page_no, text)
+    counts = doc.matrix()
+    if counts.shape[0] == 0:
+        return []
+    lengths = np.asarray(doc.lengths)
+    sections = np.asarray(doc.sections)
+
+    def refs(rows, scores):
+        return [SentenceRef(doc.pages[r], doc.spans[r][0], doc.spans[r][1], float(scores[k]))
+                for k, r in rows]
+
+    if not by_section or not doc.section_titles:
+        X, scores = _rank(counts, method)
+        rows = select(X, scores, lengths, max_sentences, max_chars)
+        return [{"title": None, "sentences": refs([(r, r) for r in rows], scores)}]
+
+    results = []
+    budget = None if max_chars is None else max(1, max_chars // (len(doc.section_titles) + 1))
+    for section in np.unique(sections):
+        members = np.flatnonzero(sections == section)
+        X, scores = _rank(counts[members], method)
+        local = select(X, scores, lengths[members], per_section, budget)
+        title = doc.section_titles[section - 1] if section > 0 else None
+        results.append({"title": title, "sentences": refs([(k, members[k]) for k in local], scores)})
+    return results
+
+def resolve(summary: List[Dict], pages: Iterable[str]) -> List[Dict]:
+    """
+    Fill in sentence text with a second pass over the pages, keeping only
+    the pages that contribute a sentence.
+    """
+    wanted = {ref.page for part in summary for ref in part["sentences"]}
+    texts = {}
+    for page_no, text in enumerate(pages, start=1):
+        if page_no in wanted:
+            texts[page_no] = text
+            if len(texts) == len(wanted):
+                break
+    return [{"title": part["title"],
+             "sentences": [clean_sentence(texts[ref.page][ref.start:ref.end]) for ref in part["sentences"]
+                           if ref.page in texts]}
+            for part in summary]
+
+def summarize(page_source: Callable[[], Iterable[str]], **options) -> List[Dict]:
+    """
+    summarize_pages + resolve; page_source() is called once per pass.
+    """
+    return resolve(summarize_pages(page_source(), **options), page_source())
+
+def summarize_text(text: str, max_sentences: int = 3, max_chars: Optional[int] = 1000) -> str:
+    parts = summarize(lambda: [text], max_sentences=max_sentences, max_chars=max_chars)
+    return " ".join(s for part in parts for s in part["sentences"])
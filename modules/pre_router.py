@@ -0,0 +1,227 @@
+# File: modules/pre_router.py
+
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from modules import unit_converter
+
+# ===== PRE-ROUTER CONFIG =====
+PRE_ROUTER_ENABLED = os.environ.get("CHATMATE_PRE_ROUTER", "1") == "1"
+# Optional JSON file replacing rule groups: {"math": {"label": "math", "keywords": [...], "patterns": [...]}, ...}
+RULES_PATH = os.environ.get("CHATMATE_PRE_ROUTER_RULES", "")
+# Reported with rule decisions, which skip the classifier's probabilities
+RULE_CONFIDENCE = float(os.environ.get("CHATMATE_PRE_ROUTER_CONFIDENCE", 1.0))
+
+# ===== DEFAULT RULES =====
+# Cues the helpers already act on (math_helper.is_math_query, unit_converter,
+# pdf_helper.handle_pdf_query), tightened so that only unambiguous inputs match
+_OPERAND = r"(?:[-+\d(.]|[xyz]\b|(?:sin|cos|tan|ln|log|exp|sqrt)\s*\()"
+# An operation word counts only when a math operand follows it: "integrate x^2",
+# not "the integral role of the UN" or "expand my vocabulary"
+_MATH_OPERATIONS = ["solve", "derivative", "differentiate", "integral", "integrate", "simplify",
+                    "factor", "factorise", "factorize", "expand", "evaluate", "square root", "cube root"]
+_MATH_KEYWORDS = []
+_MATH_PATTERNS = [
+    r"\b(?:" + "|".join(_MATH_OPERATIONS) + r")\s+(?:(?:of|the|for [xyz]:?)\s+)*" + _OPERAND,
+    r"\b(?:\d*[xyz]|e)\s*\^\s*[\dxyz(]",                      # x^2, 2x^3, e^x
+    r"\b\d+[xyz]\b",                                           # 3x
+    r"\b(?:sin|cos|tan|ln|log|exp|sqrt)\s*\(",                 # sin(x)
+    r"\bd/d[xyz]\b",
+    r"\broots? of\s+[-\dxyz(]",
+    r"\b[xyz]\s*[-+*/^=]\s*(?:\d|[xyz]\b|\()",                 # x + 1, but not x-ray
+    r"[\d)]\s*[-+*/^=]\s*[xyz]\b",
+    r"^[\d\s.()+\-*/^=]*\d\s*[+*/^=]\s*\d[\d\s.()+\-*/^=]*\??$",  # plain arithmetic (not "1939-1945")
+]
+# The user's own document ("the pdf", "this research paper", "my uploaded file"),
+# not the format: "who created the pdf format", "what does pdf stand for"
+# "document" and "file" need more than "the": "the file size limit of gmail"
+_DOC_REF = (r"\b(?:(?:the|this|that|my|your)\s+(?:(?:uploaded|attached)\s+)?(?:pdf|research paper)s?"
+            r"|(?:this|my|your|(?:the\s+)?uploaded|(?:the\s+)?attached)\s+(?:document|file)s?)\b"
+            r"(?!\s+(?:format|file format|standard|specification|reader|viewer|editor)\b)")
+# A PDF question names something to do with that document
+_DOC_ACTIONS = ["summarize", "summarise", "summary", "extract", "analyze", "analyse", "read",
+                "what does", "what is", "which page", "how many", "key points", "list", "find"]
+_PDF_PATTERNS = [
+    r"\b(?:" + "|".join(_DOC_ACTIONS) + r")\b.*" + _DOC_REF,
+    r"\b(?:pages?|chapter|section)\s+\d+.*\bof\s+" + _DOC_REF,
+    r"\b(?:uploaded|attached)\s+(?:pdf|document|file|research paper)s?\b",
+]
+_GK_PATTERNS = [
+    r"^(?:who|when|where)\b",
+    r"\b(?:capital|president|currency|prime minister|population) of\b",
+    r"\b(?:invented|discovered)\b",
+    r"\bhow does .+ work\b",
+]
+
+def _conversion_pattern() -> str:
+    # "<number> <unit> to|in|into|as <unit>" with every alias the unit converter knows
+    units = "|".join(re.escape(alias) for alias in sorted(unit_converter.UNITS, key=len, reverse=True))
+    return (r"[-+]?(?:\d+\.?\d*|\.\d+)\s*°?(?:" + units + r")(?![a-z])\s+(?:to|in|into|as)\s+°?(?:"
+            + units + r")(?![a-z])")
+
+def default_rules() -> Dict[str, Dict]:
+    return {
+        "math": {"label": "math", "keywords": _MATH_KEYWORDS, "patterns": _MATH_PATTERNS},
+        "conversion": {"label": "math", "keywords": [], "patterns": [_conversion_pattern()]},
+        "pdf": {"label": "pdf", "keywords": [], "patterns": _PDF_PATTERNS},
+        "gk": {"label": "gk", "keywords": [], "patterns": _GK_PATTERNS},
+    }
+
+def load_rules(path: str = RULES_PATH) -> Dict[str, Dict]:
+    rules = default_rules()
+    if path:
+        with open(path, encoding="utf-8") as f:
+            rules.update(json.load(f))
+    return rules
+
+class PreRouter:
+    """
+    All rule groups compiled into one regex (one named group per rule
+    group). A query is routed only when every group that matches agrees
+    on the label; conflicts and misses go to the classifier.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Dict]] = None):
+        self.rules = rules if rules is not None else load_rules()
+        self._group_labels: Dict[str, Tuple[str, str]] = {}
+        alternatives = []
+        for i, (name, rule) in enumerate(self.rules.items()):
+            parts = list(rule.get("patterns", []))
+            if rule.get("keywords"):
+                parts.append(r"\b(?:" + "|".join(re.escape(k.lower()) for k in rule["keywords"]) + r")\b")
+            if parts:
+                group = f"g{i}"
+                self._group_labels[group] = (name, rule["label"])
+                alternatives.append(f"(?P<{group}>" + "|".join(f"(?:{p})" for p in parts) + ")")
+        self._automaton = re.compile("|".join(alternatives), re.MULTILINE) if alternatives else None
+        self._counts = {"rule": 0, "conflict": 0, "model": 0}
+        self._by_rule = {name: 0 for name in self.rules}
+        self._counts_lock = threading.Lock()
+
+    def matches(self, text: str) -> List[Tuple[str, str]]:
+        """
+        (rule group, label) for every match in the lowercased text.
+        """
+        if self._automaton is None:
+            return []
+        found = []
+        for match in self._automaton.finditer(text.lower().strip()):
+            found.append(self._group_labels[match.lastgroup])
+        return found
+
+    def _decide(self, text: str) -> Tuple[Optional[str], str, Optional[str]]:
+        found = self.matches(text)
+        labels = {label for _, label in found}
+        if len(labels) == 1:
+            return labels.pop(), "rule", found[0][0]
+        return None, "conflict" if labels else "model", None
+
+    def classify(self, text: str) -> Tuple[Optional[str], str]:
+        """
+        (label or None, path) without touching the counters; path is "rule", "conflict" or "model".
+        """
+        label, path, _ = self._decide(text)
+        return label, path
+
+    def route(self, text: str) -> Optional[Tuple[str, float]]:
+        """
+        (label, confidence) when the rules decide, None to fall back to the classifier.
+        """
+        label, path, rule = self._decide(text)
+        with self._counts_lock:
+            self._counts[path] += 1
+            if rule is not None:
+                self._by_rule[rule] += 1
+        return (label, RULE_CONFIDENCE) if label is not None else None
+
+    def stats(self) -> Dict:
+        """
+        Path counters; "hits" are rule decisions, "misses" classifier fallbacks.
+        """
+        with self._counts_lock:
+            counts, by_rule = dict(self._counts), dict(self._by_rule)
+        total = sum(counts.values())
+        return {"hits": counts["rule"], "misses": counts["conflict"] + counts["model"],
+                "hit_ratio": counts["rule"] / total if total else 0.0, "paths": counts, "rules": by_rule}
+
+pre_router = PreRouter()
+
+def route(text: str) -> Optional[Tuple[str, float]]:
+    return pre_router.route(text) if PRE_ROUTER_ENABLED else None
+
+# ===== Offline evaluation =====
+def evaluate(texts: List[str], labels: List[str], manager=None, router: Optional[PreRouter] = None) -> Dict:
+    """
+    Score the rules against labeled data: coverage, precision of rule
+    decisions and, with an NLPManager, accuracy of model-only vs rules+model.
+    """
+    router = router or pre_router
+    decided = correct = 0
+    errors = []
+    decisions = []
+    for text, label in zip(texts, labels):
+        predicted, _ = router.classify(text)
+        decisions.append(predicted)
+        if predicted is not None:
+            decided += 1
+            if predicted == label:
+                correct += 1
+            else:
+                errors.append((text, label, predicted))
+    report = {
+        "samples": len(labels),
+        "coverage": decided / len(labels) if labels else 0.0,
+        "rule_precision": correct / decided if decided else 1.0,
+        "rule_errors": errors[:20],
+    }
+    if manager is not None:
+        model_labels = [label for label, _ in manager.predict_batch(texts)]
+        combined = [rule or model for rule, model in zip(decisions, model_labels)]
+        report["model_accuracy"] = sum(p == l for p, l in zip(model_labels, labels)) / len(labels) if labels else 0.0
+        report["combined_accuracy"] = sum(p == l for p, l in zip(combined, labels)) / len(labels) if labels else 0.0
+    return report
+
+# Offline check: python -m modules.pre_router [train.csv ...] [--generated N] [--no-model]
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import importlib.util
+
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    parser = argparse.ArgumentParser(description="Evaluate the rule-based pre-router")
+    # pre_router_eval.csv: hand-written queries, including near misses for every rule group
+    parser.add_argument("csv", nargs="*", default=[os.path.join(root, "data", "raw", "train_data.csv"),
+                                                   os.path.join(root, "data", "raw", "pre_router_eval.csv")])
+    parser.add_argument("--generated", type=int, default=0,
+                        help="also score N samples per label from data/raw/train_data_large.py")
+    parser.add_argument("--no-model", action="store_true", help="skip the classifier comparison")
+    args = parser.parse_args()
+
+    rows = []
+    for path in args.csv:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows += [(row["text"], row["label"].strip()) for row in csv.DictReader(f)]
+    if args.generated:
+        spec = importlib.util.spec_from_file_location(
+            "train_data_large", os.path.join(root, "data", "raw", "train_data_large.py"))
+        templates = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(templates)
+        import random
+        rows += templates.generate_rows(args.generated, random.Random(0))
+
+    manager = None
+    if not args.no_model:
+        from modules.nlp_manager import NLPManager
+        manager = NLPManager()
+    report = evaluate([t for t, _ in rows], [l for _, l in rows], manager)
+    print(f"Samples:            {report['samples']}")
+    print(f"Rule coverage:      {report['coverage']:.1%} (classifier skipped)")
+    print(f"Rule precision:     {report['rule_precision']:.1%}")
+    if "model_accuracy" in report:
+        print(f"Model accuracy:     {report['model_accuracy']:.1%}")
+        print(f"Rules + model:      {report['combined_accuracy']:.1%}")
+    for text, label, predicted in report["rule_errors"]:
+        print(f"  rule error: {text!r} labeled {label}, routed {predicted}")
@@ -0,0 +1,77 @@
+# File: modules/rate_limiter.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ===== LIMITER CONFIG =====
+# Buckets live in each worker process's memory, so with N workers a client
+# can get up to N times these limits before every worker has seen it
+# Per username: burst of 5 attempts, then one more per minute
+LOGIN_USER_CAPACITY = float(os.environ.get("CHATMATE_LOGIN_USER_CAPACITY", 5))
+LOGIN_USER_REFILL_PER_SEC = float(os.environ.get("CHATMATE_LOGIN_USER_REFILL_PER_SEC", 1 / 60))
+# Per client IP: burst of 20 attempts, then ten per minute
+LOGIN_IP_CAPACITY = float(os.environ.get("CHATMATE_LOGIN_IP_CAPACITY", 20))
+LOGIN_IP_REFILL_PER_SEC = float(os.environ.get("CHATMATE_LOGIN_IP_REFILL_PER_SEC", 10 / 60))
+MAX_TRACKED_KEYS = int(os.environ.get("CHATMATE_RATE_LIMIT_MAX_KEYS", 100000))
+
+class TokenBucketLimiter:
+    """
+    In-memory token bucket per key. Each attempt takes one token; tokens
+    refill continuously up to capacity. The least recently seen keys are
+    dropped beyond max_keys (a dropped key simply starts with a full bucket).
+    """
+
+    def __init__(self, capacity: float, refill_per_sec: float, max_keys: int = MAX_TRACKED_KEYS):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_per_sec)
+
+    def _set(self, key, tokens, now):
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def allow(self, key) -> bool:
+        """
+        Take one token for key; False if the bucket is empty.
+        """
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                self.rejected += 1
+                self._set(key, tokens, now)
+                return False
+            self._set(key, tokens - 1, now)
+            return True
+
+    def consume(self, key, count: float, age_seconds: float = 0.0):
+        """
+        Remove tokens for attempts that happened age_seconds ago
+        (used to seed state from the logins table at startup).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now) - count + age_seconds * self.refill_per_sec
+            self._set(key, max(0.0, min(self.capacity, tokens)), now)
+
+user_limiter = TokenBucketLimiter(LOGIN_USER_CAPACITY, LOGIN_USER_REFILL_PER_SEC)
+ip_limiter = TokenBucketLimiter(LOGIN_IP_CAPACITY, LOGIN_IP_REFILL_PER_SEC)
+
+def allow_ip(ip) -> bool:
+    return ip_limiter.allow(ip)
+
+def allow_user(username) -> bool:
+    return user_limiter.allow((username or "").lower())
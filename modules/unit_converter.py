@@ -0,0 +1,169 @@
+# File: modules/unit_converter.py
+
+import re
+from typing import Dict, NamedTuple, Optional
+
+class Unit(NamedTuple):
+    dimension: str
+    factor: float        # multiply to reach the dimension's base unit
+    offset: float = 0.0  # added after scaling (only temperatures use it)
+    symbol: str = ""
+
+# ===== UNIT REGISTRY =====
+# alias -> Unit; every alias is lowercase with multi-word forms normalised by _normalize_unit
+UNITS: Dict[str, Unit] = {}
+
+def _register(dimension, factor, symbol, *aliases, offset=0.0):
+    unit = Unit(dimension, factor, offset, symbol)
+    for alias in (symbol.lower(),) + aliases:
+        UNITS[alias] = unit
+
+# SI prefixes that survive lowercasing of the query
+_SI_PREFIXES = [
+    ("k", "kilo", 1e3), ("h", "hecto", 1e2), ("da", "deca", 1e1), ("d", "deci", 1e-1),
+    ("c", "centi", 1e-2), ("m", "milli", 1e-3), ("u", "micro", 1e-6), ("µ", "micro", 1e-6), ("n", "nano", 1e-9),
+]
+
+def _register_si(dimension, base_factor, symbol, names):
+    _register(dimension, base_factor, symbol, *names)
+    for short, long, scale in _SI_PREFIXES:
+        _register(dimension, base_factor * scale, short + symbol, *[long + n for n in names])
+
+# Length (base: metre)
+_register_si("length", 1.0, "m", ["meter", "meters", "metre", "metres"])
+_register("length", 0.0254, "in", "inch", "inches")
+_register("length", 0.3048, "ft", "foot", "feet")
+_register("length", 0.9144, "yd", "yard", "yards")
+_register("length", 1609.344, "mi", "mile", "miles")
+_register("length", 1852.0, "nmi", "nautical mile", "nautical miles")
+
+# Length units that also form areas, volumes and speeds
+_LENGTHS = [
+    ("m", 1.0, ["meter", "meters", "metre", "metres"]),
+    ("km", 1e3, ["kilometer", "kilometers", "kilometre", "kilometres"]),
+    ("cm", 1e-2, ["centimeter", "centimeters", "centimetre", "centimetres"]),
+    ("mm", 1e-3, ["millimeter", "millimeters", "millimetre", "millimetres"]),
+    ("in", 0.0254, ["inch", "inches"]),
+    ("ft", 0.3048, ["foot", "feet"]),
+    ("yd", 0.9144, ["yard", "yards"]),
+    ("mi", 1609.344, ["mile", "miles"]),
+]
+_TIMES = [
+    ("s", 1.0, ["sec", "second"]),
+    ("min", 60.0, ["minute"]),
+    ("h", 3600.0, ["hr", "hour"]),
+]
+
+# Mass (base: kilogram)
+_register_si("mass", 1e-3, "g", ["gram", "grams", "gramme", "grammes"])
+_register("mass", 1000.0, "t", "tonne", "tonnes", "ton", "tons", "metric ton")
+_register("mass", 0.45359237, "lb", "lbs", "pound", "pounds")
+_register("mass", 0.028349523125, "oz", "ounce", "ounces")
+_register("mass", 6.35029318, "st", "stone", "stones")
+
+# Time (base: second)
+_register_si("time", 1.0, "s", ["second", "seconds", "sec", "secs"])
+_register("time", 60.0, "min", "mins", "minute", "minutes")
+_register("time", 3600.0, "h", "hr", "hrs", "hour", "hours")
+_register("time", 86400.0, "day", "days")
+_register("time", 604800.0, "week", "weeks", "wk")
+_register("time", 31557600.0, "year", "years", "yr", "yrs")
+
+# Temperature (base: kelvin)
+_register("temperature", 1.0, "°C", "c", "celsius", "centigrade", offset=273.15)
+_register("temperature", 5 / 9, "°F", "f", "fahrenheit", offset=459.67 * 5 / 9)
+_register("temperature", 1.0, "K", "kelvin", "kelvins")
+
+# Area (base: square metre)
+for _sym, _len, _names in _LENGTHS:
+    _register("area", _len ** 2, _sym + "²", _sym + "2", _sym + "^2", "sq" + _sym, *["sq" + n for n in _names])
+_register("area", 1e4, "ha", "hectare", "hectares")
+_register("area", 4046.8564224, "acre", "acres")
+
+# Volume (base: cubic metre)
+_register_si("volume", 1e-3, "l", ["liter", "liters", "litre", "litres"])
+for _sym, _len, _names in _LENGTHS:
+    _register("volume", _len ** 3, _sym + "³", _sym + "3", _sym + "^3", "cu" + _sym, *["cu" + n for n in _names])
+_register("volume", 1e-6, "cc")
+_register("volume", 3.785411784e-3, "gal", "gallon", "gallons")
+_register("volume", 9.46352946e-4, "qt", "quart", "quarts")
+_register("volume", 4.73176473e-4, "pt", "pint", "pints")
+_register("volume", 2.365882365e-4, "cup", "cups")
+_register("volume", 2.95735295625e-5, "fl oz", "floz", "fluid ounce", "fluid ounces")
+
+# Speed (base: metre per second); every length/time pair plus common shorthands
+for _lsym, _len, _lnames in _LENGTHS:
+    for _tsym, _time, _tnames in _TIMES:
+        _register("speed", _len / _time, f"{_lsym}/{_tsym}",
+                  *[f"{l}/{t}" for l in [_lsym] + _lnames for t in [_tsym] + _tnames])
+_register("speed", 1.0, "m/s", "mps")
+_register("speed", 1 / 3.6, "km/h", "kmh", "kmph", "kph")
+_register("speed", 0.44704, "mph")
+_register("speed", 0.3048, "ft/s", "fps")
+_register("speed", 1852 / 3600, "kn", "knot", "knots")
+
+# Data sizes (base: byte); decimal and binary multiples
+_register("data", 1.0, "B", "byte", "bytes")
+_register("data", 0.125, "bit", "bits")
+for _i, (_short, _long) in enumerate((("k", "kilo"), ("m", "mega"), ("g", "giga"), ("t", "tera"), ("p", "peta")), start=1):
+    _register("data", 1000.0 ** _i, _short.upper() + "B", _long + "byte", _long + "bytes")
+    _register("data", 1024.0 ** _i, _short.upper() + "iB", _long[:2] + "bibyte", _long[:2] + "bibytes")
+    _register("data", 1000.0 ** _i / 8, _short + "bit", _long + "bit", _long + "bits")
+
+# ===== QUERY PARSER =====
+_UNIT_WORD = r"°?[a-zµ][a-zµ0-9²³^/]*"
+_QUERY_RE = re.compile(
+    r"(?P<value>[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?)\s*"
+    r"(?P<src>" + _UNIT_WORD + r"(?:\s+" + _UNIT_WORD + r"){0,2})\s*"
+    r"\b(?:to|in|into|as)\s+"
+    r"(?P<dst>" + _UNIT_WORD + r"(?:\s+" + _UNIT_WORD + r"){0,2})"
+)
+_NORMALIZE_RE = re.compile(r"\s*\bper\b\s*|\s*/\s*")
+_ARTICLE_RE = re.compile(r"/an?\s+")  # "km per an hour"
+_SQUARE_RE = re.compile(r"^(?:square|sq\.?)\s*(.+)$")
+_CUBIC_RE = re.compile(r"^(?:cubic|cu\.?)\s*(.+)$")
+
+def _normalize_unit(text: str) -> str:
+    text = text.strip().lstrip("°").strip()
+    text = _NORMALIZE_RE.sub("/", text)
+    text = _ARTICLE_RE.sub("/", text)
+    text = _SQUARE_RE.sub(r"sq\1", text)
+    text = _CUBIC_RE.sub(r"cu\1", text)
+    return text
+
+def lookup_unit(text: str) -> Optional[Unit]:
+    """
+    Resolve a unit name or symbol, trying the longest leading phrase first
+    so trailing words ("5 km to m please") are ignored.
+    """
+    words = text.split()
+    for n in range(len(words), 0, -1):
+        unit = UNITS.get(_normalize_unit(" ".join(words[:n])))
+        if unit is not None:
+            return unit
+    return None
+
+def convert(value: float, src: Unit, dst: Unit) -> float:
+    base = value * src.factor + src.offset
+    return (base - dst.offset) / dst.factor
+
+def _fmt(value: float) -> str:
+    return f"{value:.10g}"
+
+def convert_query(query: str) -> Dict:
+    """
+    Find "<number> <unit> to|in <unit>" in a query and convert it.
+    Returns {"handled": bool, "reply": str|None} like the other helpers.
+    """
+    match = _QUERY_RE.search(query.lower())
+    if not match:
+        return {"handled": False, "reply": None}
+    src = lookup_unit(match.group("src"))
+    dst = lookup_unit(match.group("dst"))
+    if src is None or dst is None:
+        return {"handled": False, "reply": None}
+    if src.dimension != dst.dimension:
+        return {"handled": True, "reply": f"Cannot convert {src.dimension} ({src.symbol}) to {dst.dimension} ({dst.symbol})."}
+    value = float(match.group("value"))
+    result = convert(value, src, dst)
+    return {"handled": True, "reply": f"{_fmt(value)} {src.symbol} = {_fmt(result)} {dst.symbol}"}
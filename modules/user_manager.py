@@ -1,38 +1,16 @@
 import sqlite3
 import re
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timezone
+from modules import db
+from modules.db import chatmate_db, BatchWriter
+from modules import password_service
+from modules import rate_limiter
 
-DB_PATH = "chatmate.db"
+# Login audit rows are committed in batches off the request thread
+audit_writer = BatchWriter(chatmate_db, name="login-audit")
 
-# ===== Create Tables =====
-def create_tables():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Logins table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS logins (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            success INTEGER
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
+HISTORY_PAGE_SIZE = 50
+RATE_LIMIT_REPLY = "Too many login attempts. Please try again later."
 
 # ===== Validate Email =====
 def validate_email(email):
@@ -45,77 +23,141 @@ def validate_password(password):
     return bool(pattern.match(password))
 
 # ===== Signup User =====
-def signup_user(username, email, password):
+def signup_user(username, email, password, ip=None):
+    if not rate_limiter.allow_ip(ip):
+        return False, RATE_LIMIT_REPLY, None
     if not validate_email(email):
         return False, "Invalid email format", None
     if not validate_password(password):
         return False, "Password must be 8+ chars with upper, lower, digit, special char", None
     
-    hashed_pw = generate_password_hash(password)
+    hashed_pw = password_service.hash_password(password)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, password) VALUES (?, ?, ?)",
-            (username, email, hashed_pw)
-        )
-        conn.commit()
-        user_id = cursor.lastrowid  # <-- get new user ID
-        conn.close()
+        with chatmate_db.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO users (username, email, password) VALUES (?, ?, ?)",
+                (username, email, hashed_pw)
+            )
+            user_id = cursor.lastrowid  # <-- get new user ID
         user_data = {"id": user_id, "username": username, "email": email}
         return True, "Signup successful", user_data
     except sqlite3.IntegrityError:
         return False, "Username or Email already exists", None
 
 # ===== Login User =====
-def login_user(username_or_email, password):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, username, email, password FROM users WHERE username=? OR email=?", 
+def login_user(username_or_email, password, ip=None):
+    # Rate limits are checked before any password hashing is done
+    if not rate_limiter.allow_ip(ip):
+        return False, RATE_LIMIT_REPLY, None
+    result = chatmate_db.query_one(
+        "SELECT id, username, email, password FROM users WHERE username=? OR email=?",
         (username_or_email, username_or_email)
     )
-    result = cursor.fetchone()
 
     if result:
         user_id, username, email, stored_password = result
-        if check_password_hash(stored_password, password):
-            # Record successful login
-            cursor.execute(
-                "INSERT INTO logins (username, success) VALUES (?, ?)",
-                (username, 1)
-            )
-            conn.commit()
-            conn.close()
+        if not rate_limiter.allow_user(username):
+            return False, RATE_LIMIT_REPLY, None
+        success = password_service.verify_password(stored_password, password)
+        # Record login attempt (timestamped now, written by the audit writer)
+        record_login(username, success)
+        if success:
+            if password_service.needs_rehash(stored_password):
+                # Move old hashes to the configured method/cost transparently
+                chatmate_db.execute(
+                    "UPDATE users SET password=? WHERE id=?",
+                    (password_service.hash_password(password), user_id)
+                )
             user_data = {"id": user_id, "username": username, "email": email}
             return True, "Login successful", user_data
-        else:
-            # Record failed login
-            cursor.execute(
-                "INSERT INTO logins (username, success) VALUES (?, ?)",
-                (username, 0)
-            )
-            conn.commit()
-            conn.close()
-            return False, "Incorrect password", None
+        return False, "Incorrect password", None
     else:
-        conn.close()
         return False, "User not found", None  
 
+# ===== Login Audit =====
+def record_login(username, success):
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")  # same format as CURRENT_TIMESTAMP
+    audit_writer.submit(
+        "INSERT INTO logins (username, timestamp, success) VALUES (?, ?, ?)",
+        (username, timestamp, 1 if success else 0)
+    )
+
+def seed_rate_limiter(window_minutes=60):
+    """
+    Replay recent failed logins into the per-username buckets so a restart
+    does not hand attackers a fresh allowance.
+    """
+    rows = chatmate_db.query_all('''
+        SELECT username, COUNT(*), (julianday('now') - julianday(MAX(timestamp))) * 86400
+        FROM logins
+        WHERE success = 0 AND timestamp >= datetime('now', ?)
+        GROUP BY username
+    ''', (f"-{int(window_minutes)} minutes",))
+    for username, failures, age_seconds in rows:
+        rate_limiter.user_limiter.consume(username.lower(), failures, max(0.0, age_seconds or 0.0))
+
 # ===== Fetch Login History =====
-def get_login_history():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT username, timestamp, success
+def get_login_history(limit=HISTORY_PAGE_SIZE, before=None, username=None, success=None):
+    """
+    One page of login attempts, newest first.
+    before is the cursor returned with the previous page: (timestamp, id).
+    Returns (records, next_cursor); next_cursor is None on the last page.
+    """
+    where, params = [], []
+    if username:
+        where.append("username = ?")
+        params.append(username)
+    if success is not None:
+        where.append("success = ?")
+        params.append(1 if success else 0)
+    if before:
+        where.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+        params.extend([before[0], before[0], before[1]])
+    sql = "SELECT id, username, timestamp, success FROM logins"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    rows = chatmate_db.query_all(sql, params)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][2], rows[-1][0])
+    records = [(username, timestamp, success) for _, username, timestamp, success in rows]
+    return records, next_cursor
+
+# ===== Login Statistics =====
+def get_login_counts_per_day(days=30, username=None):
+    """
+    [(day, attempts, successes)] for the last `days` days.
+    """
+    sql = '''
+        SELECT date(timestamp) AS day, COUNT(*), SUM(success)
         FROM logins
-        ORDER BY timestamp DESC
-    ''')
-    records = cursor.fetchall()
-    conn.close()
-    return records
+        WHERE timestamp >= datetime('now', ?)
+    '''
+    params = [f"-{int(days)} days"]
+    if username:
+        sql += " AND username = ?"
+        params.append(username)
+    sql += " GROUP BY day ORDER BY day DESC"
+    return chatmate_db.query_all(sql, params)
+
+def get_login_counts_per_user(limit=50, days=None):
+    """
+    [(username, attempts, successes, last_attempt)] ordered by attempts.
+    """
+    sql = "SELECT username, COUNT(*), SUM(success), MAX(timestamp) FROM logins"
+    params = []
+    if days:
+        sql += " WHERE timestamp >= datetime('now', ?)"
+        params.append(f"-{int(days)} days")
+    sql += " GROUP BY username ORDER BY COUNT(*) DESC LIMIT ?"
+    params.append(limit)
+    return chatmate_db.query_all(sql, params)
 
 # ===== Initialize Tables =====
 if __name__ == "__main__":
-    create_tables()
+    db.migrate()
     print("Users and Logins tables ready.")
@@ -10,6 +10,9 @@ call venv\Scripts\activate
 :: Step 3: Install dependencies
 pip install --upgrade pip
 pip install Flask==2.3.3 sympy==1.12 transformers==4.44.2 torch==2.3.1 sentencepiece==0.1.99
+pip install asgiref a2wsgi uvicorn
+:: OCR for scanned PDFs and image uploads also needs the Tesseract binary on PATH (or CHATMATE_TESSERACT_CMD)
+pip install pytesseract pillow
 
 :: Step 4: Run server
 python server.py
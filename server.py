@@ -1,24 +1,140 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+import time
+_import_start = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, session
 from flask_cors import CORS
+from modules import db
 from modules import user_manager
-from modules import math_helper
-from modules import gk_helper
-from modules.nlp_manager import NLPManager
-from modules import pdf_helper
+from modules.lazy import LazyModule
+from modules.nlp_manager import NLPManager, BatchingPredictor
+from modules.llm_service import LLM_WARMUP
+from modules import chat_store
+from modules import executors
+from modules import math_pool
+from modules import pdf_cache
+from modules import metrics
+from modules import pre_router
+import asyncio
+import json
 import os
+import threading
 from werkzeug.utils import secure_filename
 
+# ===== LAZY HELPER MODULES =====
+# SymPy, PyPDF2, sklearn and transformers load on the first request that needs
+# them, or at startup for the names listed in CHATMATE_PRELOAD ("math,gk,pdf" or "all")
+PRELOAD = os.environ.get("CHATMATE_PRELOAD", "")
+
+def _on_math_loaded(module):
+    from modules import math_cache
+    metrics.register_cache("math_parse", math_cache.parse_cache.stats)
+    metrics.register_cache("math_answer", math_cache.answer_cache.stats)
+
+def _on_gk_loaded(module):
+    metrics.register_cache("gk_answer", module.answer_cache.stats)
+
+math_helper = LazyModule("modules.math_helper", on_load=_on_math_loaded)
+gk_helper = LazyModule("modules.gk_helper", on_load=_on_gk_loaded)
+pdf_helper = LazyModule("modules.pdf_helper")
+pdf_jobs = LazyModule("modules.pdf_jobs")
+LAZY_MODULES = {"math": [math_helper], "gk": [gk_helper], "pdf": [pdf_helper, pdf_jobs]}
+
+metrics.record_startup("imports", time.perf_counter() - _import_start)
+
 app = Flask(__name__)
 app.secret_key = "supersecretkey"
 
+# Behind a reverse proxy every client shares the proxy's remote_addr. Trust this
+# many X-Forwarded-For hops so the login rate limiter and the localhost-only
+# endpoints see the real client; leave at 0 when clients connect directly
+TRUSTED_PROXIES = int(os.environ.get("CHATMATE_TRUSTED_PROXIES", 0))
+if TRUSTED_PROXIES > 0:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
 # Enable CORS
 CORS(app)
 
-# Create tables if not exists
-user_manager.create_tables()
+# ===== STARTUP / SHUTDOWN =====
+# Set by init_services(), once per worker process
+nlp_manager = None
+nlp_batcher = None
+router_watcher = None
+_services_lock = threading.Lock()
+
+def init_services():
+    """
+    Migrate the schema and load the models. Runs once per worker process:
+    from the gunicorn post_worker_init hook, the ASGI lifespan startup in
+    asgi.py, or lazily on the first request under any other server.
+    """
+    global nlp_manager, nlp_batcher, router_watcher
+    with _services_lock:
+        if nlp_batcher is not None:
+            return
+        # Create or migrate the chatmate.db schema
+        with metrics.startup_phase("migrate"):
+            db.migrate()
+        # Carry recent failed logins over into the login rate limiter
+        with metrics.startup_phase("rate_limiter"):
+            user_manager.seed_rate_limiter()
+        with metrics.startup_phase("nlp_model"):
+            nlp_manager = NLPManager()
+        # The online router picks up checkpoints written by other workers or the CLI
+        if nlp_manager.backend == "online":
+            from modules import online_router
+            router_watcher = online_router.CheckpointWatcher(nlp_manager).start()
+        if nlp_manager.backend == "distilbert" and nlp_manager.vectorizer is not None:
+            metrics.register_cache("bert_tokens", nlp_manager.vectorizer.stats)
+        # Start the SymPy workers before request threads exist
+        if math_pool.MATH_POOL_ENABLED:
+            with metrics.startup_phase("math_pool"):
+                math_pool.start_pool()
 
-# ===== INIT NLP MANAGER =====
-nlp_manager = NLPManager()  # Loads tokenized dataset & model
+        # Explicit warm-up of the lazily imported helpers
+        names = LAZY_MODULES if PRELOAD.strip() == "all" else [n.strip() for n in PRELOAD.split(",") if n.strip()]
+        for name in names:
+            with metrics.startup_phase(f"preload_{name}"):
+                for module in LAZY_MODULES.get(name, []):
+                    module.load()
+        # Optionally load flan-t5 now so the first GK question does not pay for it
+        if LLM_WARMUP:
+            with metrics.startup_phase("llm_warmup"):
+                gk_helper.warm_up()
+
+        # Concurrent /ask requests are classified together in small batches
+        nlp_batcher = BatchingPredictor(nlp_manager, max_batch=32, max_wait_ms=5)
+        print(f"[INFO] Startup timing: {metrics.startup_report()}")
+
+def shutdown_services():
+    """
+    Finish queued writes and stop helper pools before the worker exits.
+    """
+    if router_watcher is not None:
+        router_watcher.stop()
+    executors.shutdown(wait=True)
+    chat_store.chat_writer.flush()
+    user_manager.audit_writer.flush()
+    math_pool.shutdown_pool()
+    if pdf_helper.loaded:
+        pdf_helper.ocr.shutdown_pool()
+
+@app.before_request
+def _ensure_services():
+    if nlp_batcher is None:
+        init_services()
+    metrics.begin_request()
+
+@app.after_request
+def _add_server_timing(response):
+    header = metrics.server_timing_header()
+    if header:
+        response.headers['Server-Timing'] = header
+    return response
+
+# ===== METRICS =====
+metrics.register_cache("pdf_pages", pdf_cache.stats)
+metrics.register_cache("pre_router", pre_router.pre_router.stats)
 
 # ===== UPLOAD CONFIG =====
 BASE_UPLOAD_FOLDER = "uploads"
@@ -26,7 +142,7 @@ os.makedirs(BASE_UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = BASE_UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB max file size
 
-ALLOWED_EXTENSIONS = {'pdf'}
+ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}  # images are OCR'd (modules/ocr.py)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -41,7 +157,7 @@ def login():
     if request.method == 'POST':
         username_email = request.form['username_email']
         password = request.form['password']
-        success, message, user_data = user_manager.login_user(username_email, password)
+        success, message, user_data = user_manager.login_user(username_email, password, ip=request.remote_addr)
         if success:
             session['user_id'] = user_data['id']
             session['username'] = user_data['username']
@@ -56,7 +172,7 @@ def signup():
         username = request.form['username']
         email = request.form['email']
         password = request.form['password']
-        success, message, user_data = user_manager.signup_user(username, email, password)
+        success, message, user_data = user_manager.signup_user(username, email, password, ip=request.remote_addr)
         if success:
             session['user_id'] = user_data['id']
             session['username'] = user_data['username']
@@ -76,45 +192,97 @@ def logout():
     session.clear()
     return redirect(url_for('login'))
 
+def _login_history_page():
+    """
+    Read ?user=&success=&before_ts=&before_id= and fetch one history page.
+    """
+    username = request.args.get('user') or None
+    success = request.args.get('success')
+    success = None if success in (None, '') else success == '1'
+    before = None
+    if request.args.get('before_ts') and request.args.get('before_id', '').isdigit():
+        before = (request.args['before_ts'], int(request.args['before_id']))
+    records, next_cursor = user_manager.get_login_history(before=before, username=username, success=success)
+    return records, next_cursor, username, success
+
 @app.route('/login_history')
 def login_history():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    records = user_manager.get_login_history()
-    return render_template('login_history.html', records=records)
+    records, next_cursor, username, success = _login_history_page()
+    return render_template('login_history.html', records=records, next_cursor=next_cursor,
+                           filter_user=username or '', filter_success=success)
+
+@app.route('/api/login_history')
+def api_login_history():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "reply": "Please login first."})
+    records, next_cursor, _, _ = _login_history_page()
+    return jsonify({
+        "success": True,
+        "records": [{"username": u, "timestamp": t, "success": bool(ok)} for u, t, ok in records],
+        "next_cursor": {"before_ts": next_cursor[0], "before_id": next_cursor[1]} if next_cursor else None,
+    })
+
+@app.route('/api/login_stats')
+def api_login_stats():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "reply": "Please login first."})
+    days = request.args.get('days', '30')
+    days = int(days) if days.isdigit() else 30
+    username = request.args.get('user') or None
+    return jsonify({
+        "success": True,
+        "per_day": [{"day": d, "attempts": n, "successes": ok or 0}
+                    for d, n, ok in user_manager.get_login_counts_per_day(days, username)],
+        "per_user": [{"username": u, "attempts": n, "successes": ok or 0, "last_attempt": last}
+                     for u, n, ok, last in user_manager.get_login_counts_per_user(days=days)],
+    })
 
 # ===== CHATMATE API =====
+async def _route_reply(predicted_label: str, user_message: str) -> str:
+    if predicted_label == "math":
+        # handle_math_query tries unit conversion first, exactly once
+        math_result = await executors.run("math", math_helper.handle_math_query, user_message)
+        return math_result["reply"] if math_result.get("handled") else "I cannot solve this math problem."
+    if predicted_label == "gk":
+        gk_result = await executors.run("gk", gk_helper.handle_gk_query, user_message)
+        return gk_result["reply"] if gk_result.get("handled") else "I cannot answer this GK question."
+    if predicted_label == "pdf":
+        return "Please upload a PDF file to process this query."
+    return nlp_manager.get_response(predicted_label)
+
+async def _classify(user_message: str):
+    # Obvious math / conversion / PDF / GK inputs never reach the classifier
+    routed = pre_router.route(user_message)
+    if routed is not None:
+        return routed
+    return await asyncio.wrap_future(nlp_batcher.submit(user_message))
+
 @app.route('/ask', methods=['POST'])
-def ask():
+async def ask():
     if 'user_id' not in session:
         return jsonify({"success": False, "reply": "Please login first."})
 
     user_message = request.json.get("message", "").strip()
+    conversation_id = str(request.json.get("conversation_id") or "")[:64]
     if not user_message:
         return jsonify({"success": False, "reply": "Please enter a question."})
 
     try:
-        predicted_label, confidence = nlp_manager.predict(user_message)
+        with metrics.timed("ask") as ask_stage:
+            with metrics.timed("nlp") as nlp_stage:
+                predicted_label, confidence = await _classify(user_message)
+                ask_stage.label = nlp_stage.label = predicted_label or "none"
 
-        if predicted_label is None:
-            return jsonify({"success": True, "reply": "Sorry, I cannot answer that right now."})
-
-        reply_text = ""
-        if predicted_label == "math":
-            conv_result = math_helper.handle_conversion(user_message)
-            if conv_result.get("handled"):
-                reply_text = conv_result["reply"]
-            else:
-                math_result = math_helper.handle_math_query(user_message)
-                reply_text = math_result["reply"] if math_result.get("handled") else "I cannot solve this math problem."
-        elif predicted_label == "gk":
-            gk_result = gk_helper.handle_gk_query(user_message)
-            reply_text = gk_result["reply"] if gk_result.get("handled") else "I cannot answer this GK question."
-        elif predicted_label == "pdf":
-            reply_text = "Please upload a PDF file to process this query."
-        else:
-            reply_text = nlp_manager.get_response(predicted_label)
+            if predicted_label is None:
+                return jsonify({"success": True, "reply": "Sorry, I cannot answer that right now."})
 
+            with metrics.timed("dispatch", predicted_label):
+                reply_text = await _route_reply(predicted_label, user_message)
+
+        # Queued for the background writer; the reply is not held up by it
+        chat_store.append_exchange(session['user_id'], conversation_id, user_message, reply_text, confidence)
         return jsonify({
             "success": True,
             "reply": f"{reply_text} (Confidence: {confidence:.2f})"
@@ -123,33 +291,227 @@ def ask():
     except Exception as e:
         return jsonify({"success": False, "reply": f"Error processing your query: {e}"})
 
+# ===== STREAMING /ask (Server-Sent Events) =====
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def _sse_response(events) -> Response:
+    return Response(events, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/ask_stream', methods=['POST'])
+async def ask_stream():
+    """
+    /ask as Server-Sent Events: "meta" with the route, "delta" events with
+    reply text as it is produced (GK answers token by token), then "done"
+    with the full reply.
+    """
+    if 'user_id' not in session:
+        return _sse_response([_sse("done", {"success": False, "reply": "Please login first."})])
+
+    payload = request.get_json(silent=True) or {}
+    user_message = str(payload.get("message", "")).strip()
+    conversation_id = str(payload.get("conversation_id") or "")[:64]
+    user_id = session['user_id']
+    if not user_message:
+        return _sse_response([_sse("done", {"success": False, "reply": "Please enter a question."})])
+
+    start = time.perf_counter()
+    try:
+        with metrics.timed("nlp") as nlp_stage:
+            predicted_label, confidence = await _classify(user_message)
+            nlp_stage.label = predicted_label or "none"
+        if predicted_label is None:
+            return _sse_response([_sse("done", {"success": True, "reply": "Sorry, I cannot answer that right now."})])
+        if predicted_label != "gk":
+            with metrics.timed("dispatch", predicted_label):
+                reply_text = await _route_reply(predicted_label, user_message)
+    except Exception as e:
+        return _sse_response([_sse("done", {"success": False, "reply": f"Error processing your query: {e}"})])
+
+    def events():
+        meta = {"label": predicted_label, "confidence": confidence}
+        yield _sse("meta", meta)
+        if predicted_label == "gk":
+            pieces = []
+            try:
+                for piece in gk_helper.stream_gk_query(user_message):
+                    pieces.append(piece)
+                    yield _sse("delta", {"text": piece})
+            except Exception as e:
+                yield _sse("error", {"reply": f"Error processing your query: {e}"})
+                return
+            reply = "".join(pieces)
+        else:
+            reply = reply_text
+            yield _sse("delta", {"text": reply})
+        metrics.record("ask_stream", predicted_label, time.perf_counter() - start)
+        chat_store.append_exchange(user_id, conversation_id, user_message, reply, confidence)
+        yield _sse("done", {"success": True, "reply": reply, **meta})
+
+    return _sse_response(events())
+
 # ===== PDF UPLOAD & PROCESS =====
 @app.route('/ask_pdf', methods=['POST'])
-def ask_pdf():
+async def ask_pdf():
     if 'user_id' not in session:
         return jsonify({"success": False, "reply": "Please login first."})
 
     user_message = request.form.get("message", "").strip()
+    conversation_id = request.form.get("conversation_id", "")[:64]
     pdf_file = request.files.get("pdf_file", None)
+    run_async = request.form.get("async", "").lower() in ("1", "true", "yes")
+    # A page range ("pages": "10-25", or "pages 10-25" in the message) reads and
+    # OCRs only those pages instead of ingesting the whole file first
+    pages = pdf_helper.page_range("pages " + request.form.get("pages", "")) or pdf_helper.page_range(user_message)
     pdf_path = None
 
     if pdf_file:
+        if allowed_file(pdf_file.filename) and pdf_helper.ocr.is_image(pdf_file.filename) \
+                and not pdf_helper.ocr.is_available():
+            return jsonify({"success": False, "reply": pdf_helper.OCR_UNAVAILABLE_REPLY})
         if allowed_file(pdf_file.filename):
             user_folder = os.path.join(app.config['UPLOAD_FOLDER'], str(session['user_id']))
             os.makedirs(user_folder, exist_ok=True)
             filename = secure_filename(pdf_file.filename)
             pdf_path = os.path.join(user_folder, filename)
             pdf_file.save(pdf_path)
+            session['pdf_path'] = pdf_path
+            session.pop('pdf_job_id', None)
+            if run_async and pages is None:
+                # Ingest in the background; the client polls /pdf_jobs/<job_id>
+                job_id = pdf_jobs.submit_ingest(session['user_id'], pdf_path)
+                session['pdf_job_id'] = job_id
+                return jsonify({"success": True, "job_id": job_id,
+                                "reply": "Your PDF is being processed. Ask your question once it is ready."}), 202
+            elif pages is None:
+                # Extract, cache and index once so later questions are a sparse lookup
+                await executors.run("pdf", pdf_helper.ingest_pdf, pdf_path)
         else:
-            return jsonify({"success": False, "reply": "Only PDF files are allowed."})
+            return jsonify({"success": False, "reply": "Only PDF or image (PNG/JPEG) files are allowed."})
+    elif session.get('pdf_path') and os.path.exists(session['pdf_path']):
+        # Follow-up question about the last uploaded PDF (served from the extraction cache)
+        pdf_path = session['pdf_path']
+        job = pdf_jobs.get_job(session.get('pdf_job_id'), session['user_id']) if session.get('pdf_job_id') else None
+        if not pdf_jobs.is_ready(job) and pages is None:
+            return jsonify({"success": True, "job_id": job["job_id"],
+                            "reply": f"Still processing your PDF ({job['pages_done']}/{job['total_pages'] or '?'} pages)."})
 
     try:
-        pdf_result = pdf_helper.handle_pdf_query(user_message, pdf_path)
+        with metrics.timed("ask_pdf", "pdf"):
+            pdf_result = await executors.run("pdf", pdf_helper.handle_pdf_query, user_message, pdf_path, pages)
         reply_text = pdf_result["reply"] if pdf_result.get("handled") else "Cannot process this PDF request."
+        chat_store.append_exchange(session['user_id'], conversation_id, user_message, reply_text)
         return jsonify({"success": True, "reply": reply_text})
     except Exception as e:
         return jsonify({"success": False, "reply": f"Error processing PDF query: {e}"})
 
+@app.route('/pdf_jobs/<job_id>')
+def pdf_job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({"success": False, "reply": "Please login first."})
+    job = pdf_jobs.get_job(job_id, session['user_id'])
+    if job is None:
+        return jsonify({"success": False, "reply": "Unknown job."}), 404
+    job.pop("file_path", None)
+    job.pop("user_id", None)
+    return jsonify({"success": True, "job": job})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/metrics/config', methods=['POST'])
+def metrics_config():
+    """
+    Runtime switches, local callers only: {"enabled": bool, "server_timing": bool}.
+    """
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"success": False, "reply": "Forbidden."}), 403
+    options = request.get_json(silent=True) or {}
+    if "enabled" in options:
+        metrics.set_enabled(options["enabled"])
+    if "server_timing" in options:
+        metrics.set_server_timing(options["server_timing"])
+    return jsonify({"success": True, "enabled": metrics.METRICS_ENABLED, "server_timing": metrics.SERVER_TIMING})
+
+# ===== CHAT HISTORY API =====
+@app.route('/api/conversations')
+def api_conversations():
+    if 'user_id' not in session:
+        return jsonify({"success": False, "reply": "Please login first."})
+    before = None
+    if request.args.get('before_ts') and request.args.get('before_id'):
+        try:
+            before = (float(request.args['before_ts']), request.args['before_id'])
+        except ValueError:
+            pass
+    conversations, next_cursor = chat_store.list_conversations(session['user_id'], before=before)
+    return jsonify({
+        "success": True,
+        "conversations": conversations,
+        "next_cursor": {"before_ts": next_cursor[0], "before_id": next_cursor[1]} if next_cursor else None,
+    })
+
+@app.route('/api/conversations/<conversation_id>/messages')
+def api_conversation_messages(conversation_id):
+    if 'user_id' not in session:
+        return jsonify({"success": False, "reply": "Please login first."})
+    before_id = request.args.get('before_id', '')
+    messages, next_before_id = chat_store.get_messages(
+        session['user_id'], conversation_id, before_id=int(before_id) if before_id.isdigit() else None
+    )
+    return jsonify({"success": True, "messages": messages, "next_before_id": next_before_id})
+
+@app.route('/api/conversations/<conversation_id>', methods=['DELETE'])
+def api_delete_conversation(conversation_id):
+    if 'user_id' not in session:
+        return jsonify({"success": False, "reply": "Please login first."})
+    chat_store.delete_conversation(session['user_id'], conversation_id)
+    return jsonify({"success": True})
+
+# ===== ROUTER FEEDBACK =====
+@app.route('/api/router/feedback', methods=['POST'])
+def api_router_feedback():
+    """
+    Correct the route of a misclassified question: {"message": str, "label": "math"|"gk"|"pdf"}.
+    Stored for the online router's next partial_fit.
+    """
+    if 'user_id' not in session:
+        return jsonify({"success": False, "reply": "Please login first."})
+    from modules import online_router
+    payload = request.get_json(silent=True) or {}
+    message = str(payload.get("message", "")).strip()[:1000]
+    label = payload.get("label")
+    if not message or label not in online_router.CLASSES:
+        return jsonify({"success": False, "reply": "A message and a label (math, gk or pdf) are required."})
+    predicted, _ = nlp_manager.predict(message)
+    online_router.record_feedback(session['user_id'], message, label, predicted)
+    return jsonify({"success": True, "predicted": predicted})
+
+@app.route('/api/router/update', methods=['POST'])
+async def api_router_update():
+    """
+    Train the online router on pending feedback and hot-swap it, local callers only.
+    """
+    if request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"success": False, "reply": "Forbidden."}), 403
+    from modules import online_router
+    payload = request.get_json(silent=True)
+    min_samples = payload.get("min_samples", 1) if isinstance(payload, dict) else 1
+    if isinstance(min_samples, bool) or not isinstance(min_samples, int) or min_samples < 1:
+        return jsonify({"success": False, "reply": "min_samples must be a positive integer."}), 400
+    manager = nlp_manager if nlp_manager.backend == "online" else None
+    try:
+        router = await asyncio.to_thread(online_router.apply_feedback, manager, min_samples)
+    except Exception as e:
+        return jsonify({"success": False, "reply": f"Router update failed: {e}"})
+    if router is None:
+        return jsonify({"success": True, "updated": False})
+    return jsonify({"success": True, "updated": True, "version": router.version})
+
 if __name__ == '__main__':
+    # Development server; see README "Production serving" for gunicorn / uvicorn
+    init_services()
     print("🚀 Starting ChatMate server on http://127.0.0.1:5000")
     app.run(host="127.0.0.1", port=5000, debug=True)
@@ -0,0 +1,39 @@
+# File: tests/test_faq_engine.py
+
+import pytest
+
+from modules.faq_engine import FAQEngine
+
+FAQ_ROWS = [
+    ("what is the capital of india", "The capital of India is New Delhi."),
+    ("who is the president of usa", "As of 2025, the President of the USA is Joe Biden."),
+    ("who discovered gravity", "Sir Isaac Newton is credited with discovering the laws of gravity."),
+    ("what is the boiling point of water", "The boiling point of water is 100°C (212°F) at standard atmospheric pressure."),
+    ("who wrote hamlet", "William Shakespeare wrote the play 'Hamlet'."),
+]
+
+@pytest.fixture
+def engine(tmp_path):
+    source = tmp_path / "faq.csv"
+    lines = ["question,answer"] + [f'{q},"{a}"' for q, a in FAQ_ROWS]
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return FAQEngine(source=str(source), reload_interval=3600)
+
+@pytest.mark.parametrize("question", [
+    "what is the capital of france",
+    "who is the president of france",
+    "who wrote macbeth",
+    "who discovered penicillin",
+    "boiling point of milk",
+])
+def test_unrelated_questions_do_not_match(engine, question):
+    assert engine.lookup(question) is None
+
+@pytest.mark.parametrize("question, answer_index", [
+    ("What is the capital of India?", 0),
+    ("india capital?", 0),
+    ("boiling point water", 3),
+    ("who wrote the play hamlet", 4),
+])
+def test_paraphrases_match(engine, question, answer_index):
+    assert engine.lookup(question) == FAQ_ROWS[answer_index][1]